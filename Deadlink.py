@@ -0,0 +1,292 @@
+"""Dead-link verifier: re-check company links concurrently and classify them.
+
+Every link gets a HEAD request first. Links answering 404/410 are gone
+without downloading anything; only a 200 (or a server refusing HEAD) costs
+a ranged GET of the first RANGE_BYTES, enough to tell a real listing from a
+soft 404 or an empty template. Redirects are followed, and a link that
+lands on another page is reported as a redirect.
+
+Results go to CHECKS_FILE with a next-check time per link, so a rerun (or
+--watch) only rechecks what is due: dead links back off from a day to a
+month, live ones are rechecked monthly, timeouts and errors within the hour.
+
+Usage:
+    python Deadlink.py [INPUT ...] [--only-dead] [--concurrency N] [--all] [--report FILE] [--watch SECONDS]
+"""
+import argparse
+import asyncio
+import csv
+import re
+import sqlite3
+import time
+from collections import Counter, namedtuple
+
+import aiohttp
+from tqdm import tqdm
+
+import metrics
+from frontier import BASE_URL, canonicalize
+from http_client import HEADERS
+from result_store import read_tables
+
+LINKS_FILE = "Reults/Deadlinks.xlsx"
+CHECKS_FILE = "link_checks.sqlite"
+REPORT_FILE = "deadlink_report.csv"
+CONCURRENCY = 20
+REQUEST_TIMEOUT = 15
+MAX_REDIRECTS = 5
+RANGE_BYTES = 131072  # Bytes of a page read to find the listing
+SAVE_EVERY = 200  # Results per commit
+
+DAY = 86400
+RECHECK_ALIVE = 30 * DAY
+RECHECK_DEAD = DAY  # Doubled for every further dead result in a row
+RECHECK_DEAD_MAX = 30 * DAY
+RECHECK_ERROR = 3600
+
+ALIVE = "alive"
+GONE = "gone"  # 404/410 or a "not found" page
+REDIRECT = "redirect"  # Sent to a different page
+EMPTY = "empty"  # 200 with the site template but no listing
+TIMEOUT = "timeout"
+ERROR = "error"  # 5xx, 429, refused connections, ...
+DEAD_CLASSES = (GONE, REDIRECT, EMPTY)
+
+GONE_STATUSES = {404, 410}
+HEAD_UNSUPPORTED = {403, 405, 501}
+LISTING_MARKER = b"listingTitle"  # Title block every company page has
+SOFT_404 = re.compile(rb"page not found|no longer (?:listed|available|exists)|404 not found|error 404", re.IGNORECASE)
+
+LinkCheck = namedtuple("LinkCheck", "url result http_status final_url detail")
+
+
+def next_check(result, dead_streak, now):
+    if result == ALIVE:
+        return now + RECHECK_ALIVE
+    if result in DEAD_CLASSES:
+        return now + min(RECHECK_DEAD * 2 ** max(0, dead_streak - 1), RECHECK_DEAD_MAX)
+    return now + RECHECK_ERROR
+
+
+class CheckStore:
+    """SQLite record of the latest check of every link and when it is due again."""
+
+    def __init__(self, path=CHECKS_FILE):
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        with self.conn:
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS links (
+                    url TEXT PRIMARY KEY,
+                    result TEXT,
+                    http_status INTEGER,
+                    final_url TEXT,
+                    detail TEXT,
+                    checked_at REAL,
+                    next_check REAL NOT NULL DEFAULT 0,
+                    dead_streak INTEGER NOT NULL DEFAULT 0
+                )""")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS links_due ON links (next_check)")
+
+    def add(self, urls):
+        """Track new links (due at once); returns how many were new."""
+        with self.conn:
+            before = self.conn.total_changes
+            self.conn.executemany("INSERT OR IGNORE INTO links (url) VALUES (?)", [(url,) for url in urls])
+            return self.conn.total_changes - before
+
+    def due(self, now=None):
+        now = time.time() if now is None else now
+        rows = self.conn.execute("SELECT url FROM links WHERE next_check <= ? ORDER BY next_check", (now,))
+        return [url for (url,) in rows]
+
+    def next_due(self):
+        return self.conn.execute("SELECT MIN(next_check) FROM links").fetchone()[0]
+
+    def previous(self, urls):
+        """url -> (result, dead_streak) before this round."""
+        marks = ", ".join("?" * len(urls))
+        rows = self.conn.execute(f"SELECT url, result, dead_streak FROM links WHERE url IN ({marks})", urls)
+        return {url: (result, streak) for url, result, streak in rows}
+
+    def record(self, checks):
+        """Store a round of checks; returns the links that were dead before and are alive now."""
+        now = time.time()
+        previous = self.previous([check.url for check in checks])
+        rows = []
+        revived = []
+        for check in checks:
+            result, streak = previous.get(check.url, (None, 0))
+            if check.result == ALIVE:
+                streak = 0
+                if result in DEAD_CLASSES:
+                    revived.append(check.url)
+            elif check.result in DEAD_CLASSES:
+                streak += 1
+            rows.append((check.result, check.http_status, check.final_url, check.detail, now,
+                         next_check(check.result, streak, now), streak, check.url))
+        with self.conn:
+            self.conn.executemany(
+                "UPDATE links SET result = ?, http_status = ?, final_url = ?, detail = ?, checked_at = ?, "
+                "next_check = ?, dead_streak = ? WHERE url = ?",
+                rows,
+            )
+        return revived
+
+    def counts(self):
+        rows = self.conn.execute("SELECT COALESCE(result, 'unchecked'), COUNT(*) FROM links GROUP BY 1").fetchall()
+        return dict(rows)
+
+    def export_csv(self, path):
+        rows = self.conn.execute(
+            "SELECT url, result, http_status, final_url, detail, datetime(checked_at, 'unixepoch'), "
+            "dead_streak FROM links ORDER BY result, url"
+        ).fetchall()
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(["Company Link", "Result", "HTTP Status", "Final URL", "Detail", "Checked At", "Dead Streak"])
+            writer.writerows(rows)
+        return len(rows)
+
+    def close(self):
+        self.conn.close()
+
+
+def redirected(url, res):
+    final_url = str(res.url)
+    if res.history and canonicalize(final_url) != canonicalize(url):
+        return final_url
+    return None
+
+
+async def probe(session, url):
+    """HEAD, then a ranged GET if the page has to be looked at."""
+    start = time.perf_counter()
+    try:
+        async with session.head(url, allow_redirects=True, max_redirects=MAX_REDIRECTS) as res:
+            metrics.observe("http_ttfb_seconds", time.perf_counter() - start)
+            metrics.inc("http_responses", status=res.status)
+            status = res.status
+            final_url = redirected(url, res)
+        if status in GONE_STATUSES:
+            return LinkCheck(url, GONE, status, final_url, "")
+        if final_url:
+            return LinkCheck(url, REDIRECT, status, final_url, f"{status} after redirect")
+        if status != 200 and status not in HEAD_UNSUPPORTED:
+            return LinkCheck(url, ERROR, status, None, "HEAD")
+
+        headers = {"Range": f"bytes=0-{RANGE_BYTES - 1}"}
+        async with session.get(url, headers=headers, allow_redirects=True, max_redirects=MAX_REDIRECTS) as res:
+            metrics.inc("http_responses", status=res.status)
+            final_url = redirected(url, res)
+            if res.status in GONE_STATUSES:
+                return LinkCheck(url, GONE, res.status, final_url, "")
+            if final_url:
+                return LinkCheck(url, REDIRECT, res.status, final_url, f"{res.status} after redirect")
+            if res.status not in (200, 206):
+                return LinkCheck(url, ERROR, res.status, None, "GET")
+            body = b""
+            async for chunk in res.content.iter_chunked(16384):
+                body += chunk
+                if LISTING_MARKER in body or len(body) >= RANGE_BYTES:
+                    break  # Leaving the block drops the rest of the page
+        if LISTING_MARKER in body:
+            return LinkCheck(url, ALIVE, res.status, None, "")
+        if SOFT_404.search(body):
+            return LinkCheck(url, GONE, res.status, None, "soft 404")
+        return LinkCheck(url, EMPTY, res.status, None, f"no listing in first {len(body)} bytes")
+    except asyncio.TimeoutError:
+        return LinkCheck(url, TIMEOUT, None, None, f"> {REQUEST_TIMEOUT}s")
+    except aiohttp.TooManyRedirects:
+        return LinkCheck(url, REDIRECT, None, None, "redirect loop")
+    except aiohttp.ClientError as e:
+        return LinkCheck(url, ERROR, None, None, f"{type(e).__name__}: {e}"[:200])
+
+
+async def verify(urls, store, concurrency=CONCURRENCY):
+    """Check urls with `concurrency` requests in flight; returns (results per class, revived links)."""
+    queue = asyncio.Queue()
+    for url in urls:
+        queue.put_nowait(url)
+    pending = []
+    revived = []
+    counts = Counter()
+    progress = tqdm(total=len(urls), desc="Checking links")
+
+    def save():
+        revived.extend(store.record(pending))
+        pending.clear()
+
+    async def worker(session):
+        while True:
+            try:
+                url = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            check = await probe(session, url)
+            metrics.inc("link_checks", result=check.result)
+            counts[check.result] += 1
+            pending.append(check)
+            progress.update(1)
+            if len(pending) >= SAVE_EVERY:
+                save()
+
+    connector = aiohttp.TCPConnector(limit=concurrency, limit_per_host=concurrency)
+    timeout = aiohttp.ClientTimeout(total=REQUEST_TIMEOUT)
+    async with aiohttp.ClientSession(headers=HEADERS, connector=connector, timeout=timeout) as session:
+        await asyncio.gather(*(worker(session) for _ in range(concurrency)))
+    save()
+    progress.close()
+    return counts, revived
+
+
+def load_links(inputs, base_url, only_dead=False):
+    """Canonical links of the inputs; only_dead keeps rows the scrapers gave up on ("Dead Link")."""
+    links = []
+    for table in read_tables(inputs):
+        emails = table.column("Email").to_pylist()
+        for link, email in zip(table.column("Company Link").to_pylist(), emails):
+            if link and (not only_dead or email in (None, "Dead Link")):
+                links.append(canonicalize(link, base_url))
+    return links
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("inputs", nargs="*", default=[LINKS_FILE], help="link lists (.xlsx, .csv, Parquet)")
+    parser.add_argument("--checks", default=CHECKS_FILE, help="SQLite file with every link's last check")
+    parser.add_argument("--base-url", default=BASE_URL)
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY)
+    parser.add_argument("--all", action="store_true", help="recheck every link, not only the due ones")
+    parser.add_argument("--only-dead", action="store_true", help="take only rows marked 'Dead Link' from the inputs")
+    parser.add_argument("--report", default=REPORT_FILE)
+    parser.add_argument("--watch", type=float, default=None, help="keep running, waking at most every N seconds")
+    args = parser.parse_args()
+
+    store = CheckStore(args.checks)
+    added = store.add(load_links(args.inputs, args.base_url, args.only_dead))
+    print(f"Tracking {sum(store.counts().values())} links ({added} new).")
+
+    while True:
+        urls = store.due(float("inf") if args.all else None)
+        args.all = False
+        if urls:
+            start_time = time.time()
+            counts, revived = asyncio.run(verify(urls, store, args.concurrency))
+            elapsed = time.time() - start_time
+            print(f"\n✅ Checked {len(urls)} links in {elapsed:.1f} seconds: {dict(counts)}")
+            if revived:
+                print(f"🔁 {len(revived)} links dead before are alive again.")
+            exported = store.export_csv(args.report)
+            print(f"📊 {store.counts()}. {exported} links in {args.report}.")
+        if args.watch is None:
+            break
+        next_due = store.next_due()
+        wait = args.watch if next_due is None else min(args.watch, max(0.0, next_due - time.time()))
+        print(f"⏳ Next check in {wait / 60:.1f} minutes.")
+        time.sleep(wait)
+    store.close()
+
+
+if __name__ == "__main__":
+    main()
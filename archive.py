@@ -0,0 +1,85 @@
+"""Append-only archive of raw page bodies in WARC-like gzip segments.
+
+Each record is its own gzip member, so segments can be appended to safely
+and read back one record at a time.
+"""
+import gzip
+import os
+import threading
+from datetime import datetime, timezone
+
+ARCHIVE_DIR = "page_archive"
+SEGMENT_BYTES = 64 * 1024 ** 2  # Start a new segment after ~64 MiB compressed
+SEGMENT_PREFIX = "segment-"
+SEGMENT_SUFFIX = ".warc.gz"
+
+
+def list_segments(directory=ARCHIVE_DIR):
+    if not os.path.isdir(directory):
+        return []
+    names = sorted(n for n in os.listdir(directory) if n.startswith(SEGMENT_PREFIX) and n.endswith(SEGMENT_SUFFIX))
+    return [os.path.join(directory, n) for n in names]
+
+
+class PageArchive:
+    def __init__(self, directory=ARCHIVE_DIR, segment_bytes=SEGMENT_BYTES):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self.segment_number = len(list_segments(directory))  # Never append to a segment from an older run
+        self.file = None
+
+    def open_next_segment(self):
+        if self.file is not None:
+            self.file.close()
+        self.segment_number += 1
+        path = os.path.join(self.directory, f"{SEGMENT_PREFIX}{self.segment_number:05d}{SEGMENT_SUFFIX}")
+        self.file = open(path, "ab")
+
+    def add(self, url, body, content_type="text/html"):
+        """Append one page body (bytes) as a WARC-style response record."""
+        header = (
+            "WARC/1.0\r\n"
+            "WARC-Type: response\r\n"
+            f"WARC-Target-URI: {url}\r\n"
+            f"WARC-Date: {datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            "\r\n"
+        ).encode("utf-8")
+        record = gzip.compress(header + body + b"\r\n\r\n", compresslevel=6)
+
+        with self.lock:
+            if self.file is None or self.file.tell() >= self.segment_bytes:
+                self.open_next_segment()
+            self.file.write(record)
+            self.file.flush()
+
+    def close(self):
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+
+
+def iter_records(segment_path):
+    """Yield (url, content_type, body) for every record in a segment."""
+    with gzip.open(segment_path, "rb") as f:
+        while True:
+            line = f.readline()
+            if not line:
+                return
+            if not line.startswith(b"WARC/"):
+                continue  # Skip the blank separator lines between records
+
+            fields = {}
+            while True:
+                line = f.readline().rstrip(b"\r\n")
+                if not line:
+                    break
+                name, _, value = line.decode("utf-8").partition(":")
+                fields[name.strip()] = value.strip()
+
+            body = f.read(int(fields.get("Content-Length", 0)))
+            yield fields.get("WARC-Target-URI"), fields.get("Content-Type"), body
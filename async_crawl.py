@@ -0,0 +1,267 @@
+"""Asyncio crawl engine: batch links -> listing pages -> company pages.
+
+Listing pages from every batch and all company pages share one work queue
+drained by CONCURRENCY workers, so throughput is set by the concurrency cap
+instead of thread count and per-batch barriers. Requests are paced by
+http_client's per-host rate controller and served from its response cache,
+like the threaded scrapers.
+
+A job whose page keeps failing is queued again after RETRY_DELAY, up to
+JOB_ATTEMPTS times, and then written to FAILED_FILE instead of the results;
+a batch with a failed listing page is listed there as incomplete.
+
+Usage: python async_crawl.py [--concurrency N] [--base-url URL] [--cache FILE] [--metrics-port PORT]
+"""
+import argparse
+import asyncio
+import csv
+import os
+import time
+
+import aiohttp
+from tqdm import tqdm
+
+import http_client
+import metrics
+from crawl_state import GONE_STATUSES
+from extractor import extract_batch_links, extract_company_info, extract_company_links
+from frontier import Frontier, canonicalize
+from http_cache import build_response
+from http_client import HEADERS
+
+BASE_URL = "https://www.construction.co.uk"
+RESULTS_FILE = "construction_companies.csv"
+CONCURRENCY = 20
+MAX_RETRIES = 3
+SAVE_EVERY = 200  # Flush results to CSV every 200 companies
+REQUEST_TIMEOUT = 30
+JOB_ATTEMPTS = 3  # Rounds of MAX_RETRIES a listing or company job gets before it is given up
+RETRY_DELAY = 10  # Seconds a failed job waits, outside the workers, before it is queued again
+FAILED_FILE = "failed_urls.csv"  # Jobs given up, for a later run; never in RESULTS_FILE
+HTTP_CACHE_FILE = "http_cache.sqlite"
+
+
+class FetchFailed(Exception):
+    """A page still failed after MAX_RETRIES attempts."""
+
+
+def append_results(data, results_file=RESULTS_FILE):
+    file_exists = os.path.isfile(results_file)
+    with open(results_file, "a", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        if not file_exists:
+            writer.writerow(["Company Name", "Email", "Source URL"])
+        writer.writerows(data)
+
+
+class AsyncCrawler:
+    def __init__(self, base_url=BASE_URL, concurrency=CONCURRENCY, results_file=RESULTS_FILE, failed_file=FAILED_FILE):
+        self.base_url = base_url
+        self.concurrency = concurrency
+        self.results_file = results_file
+        self.failed_file = failed_file
+        self.queue = None
+        self.session = None
+        self.pending_results = []
+        self.companies_done = 0
+        self.pages_fetched = 0
+        self.progress = None
+        self.frontier = Frontier(None, base_url)  # Companies listed in several batches are fetched once
+        self.rate = http_client.rate_controller()
+        self.cache = http_client.response_cache()
+        self.delayed = set()  # Retry tasks waiting out RETRY_DELAY
+        self.failed = []  # (kind, url, error) of jobs given up
+
+    def absolute(self, href):
+        return canonicalize(href, self.base_url)
+
+    async def fetch(self, url):
+        """GET a page's text through the rate controller and response cache.
+
+        Returns None for a gone page (404/410); raises FetchFailed after MAX_RETRIES failures.
+        """
+        cached, headers = None, {}
+        if self.cache is not None:
+            cached, fresh = await asyncio.to_thread(self.cache.lookup, url)
+            if cached is not None and fresh:
+                await asyncio.to_thread(self.cache.touch, url)
+                metrics.inc("http_cache_hits")
+                return cached.text
+            if cached is not None and "ETag" in cached.headers:
+                headers["If-None-Match"] = cached.headers["ETag"]
+            if cached is not None and "Last-Modified" in cached.headers:
+                headers["If-Modified-Since"] = cached.headers["Last-Modified"]
+
+        for attempt in range(MAX_RETRIES):
+            if attempt:
+                metrics.inc("retries", reason="async_fetch")
+            try:
+                async with self.rate.async_slot(url) as outcome:
+                    start = time.perf_counter()
+                    async with self.session.get(url, headers=headers) as res:
+                        headers_at = time.perf_counter()
+                        outcome.update(status=res.status, latency=headers_at - start,
+                                       retry_after=res.headers.get("Retry-After"))
+                        metrics.observe("http_ttfb_seconds", headers_at - start)
+                        metrics.inc("http_responses", status=res.status)
+                        if res.status == 304 and cached is not None:
+                            await asyncio.to_thread(self.cache.touch, url, True)
+                            return cached.text
+                        if res.status == 200:
+                            self.pages_fetched += 1
+                            body = await res.read()
+                            html = await res.text()
+                            metrics.observe("http_download_seconds", time.perf_counter() - headers_at)
+                            if self.cache is not None:
+                                stored = build_response(url, res.status, dict(res.headers), body)
+                                await asyncio.to_thread(self.cache.store, url, stored)
+                            return html
+                        if res.status in GONE_STATUSES:
+                            return None
+                        print(f"⚠️ Bad response {res.status} for {url} (attempt {attempt + 1})")
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                metrics.inc("http_responses", status="error")
+                print(f"⚠️ Error on {url} (attempt {attempt + 1}): {e!r}")
+            await asyncio.sleep(2 ** attempt)
+        raise FetchFailed(f"{url} failed {MAX_RETRIES} times")
+
+    async def handle_listing(self, batch_url, page_num):
+        page_url = batch_url if page_num == 1 else f"{batch_url}?pagenum={page_num}"
+        html = await self.fetch(page_url)
+        if html is None:
+            # Not the end of the batch (that is an empty page), so later pages would be lost
+            raise FetchFailed(f"{page_url} is gone")
+
+        block_count, links = extract_company_links(html)
+        if not block_count:
+            return  # No more companies in this batch
+
+        self.queue.put_nowait(("listing", batch_url, page_num + 1, 0))
+        company_urls = self.frontier.add_many(links)
+        for company_url in company_urls:
+            self.queue.put_nowait(("company", company_url, None, 0))
+        self.progress.total += len(company_urls)
+        self.progress.refresh()
+
+    async def handle_company(self, company_url):
+        html = await self.fetch(company_url)  # A failure raises, so it is retried and never saved
+        if html is None:
+            company_name, email = "N/A", "N/A"  # Gone page (404/410)
+        else:
+            company_name, email, _ = extract_company_info(html)
+
+        self.pending_results.append((company_name, email, company_url))
+        self.companies_done += 1
+        self.progress.update(1)
+        if len(self.pending_results) >= SAVE_EVERY:
+            self.flush()
+
+    def flush(self):
+        if self.pending_results:
+            append_results(self.pending_results, self.results_file)
+            self.pending_results = []
+
+    async def requeue(self, job):
+        await asyncio.sleep(RETRY_DELAY)
+        self.queue.put_nowait(job)
+
+    def retry_or_give_up(self, job, error):
+        """Queue a failed job again after RETRY_DELAY, or record it as failed after JOB_ATTEMPTS."""
+        kind, url, page_num, attempt = job
+        if attempt + 1 < JOB_ATTEMPTS:
+            print(f"🔁 {kind} {url} failed ({error}); retrying after {RETRY_DELAY} seconds...")
+            task = asyncio.create_task(self.requeue((kind, url, page_num, attempt + 1)))
+            self.delayed.add(task)
+            task.add_done_callback(self.delayed.discard)
+            return
+        print(f"⚠️ Giving up on {kind} {url}: {error}")
+        if kind == "listing":
+            self.failed.append(("incomplete batch", url, f"page {page_num}: {error}"))
+        else:
+            self.failed.append(("company", url, str(error)))
+            self.progress.update(1)
+
+    async def worker(self):
+        while True:
+            job = await self.queue.get()
+            metrics.set_gauge("queue_depth", self.queue.qsize(), stage="async")
+            try:
+                if job[0] == "listing":
+                    await self.handle_listing(job[1], job[2])
+                else:
+                    await self.handle_company(job[1])
+            except Exception as e:
+                self.retry_or_give_up(job, e)
+            finally:
+                self.queue.task_done()
+
+    def save_failed(self):
+        with open(self.failed_file, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(["Kind", "URL", "Error"])
+            writer.writerows(self.failed)
+
+    async def run(self):
+        self.queue = asyncio.Queue()
+        self.progress = tqdm(total=0, desc="Scraping Companies")
+        connector = aiohttp.TCPConnector(limit=self.concurrency, limit_per_host=self.concurrency)
+        timeout = aiohttp.ClientTimeout(total=REQUEST_TIMEOUT)
+
+        async with aiohttp.ClientSession(headers=HEADERS, connector=connector, timeout=timeout) as session:
+            self.session = session
+            html = await self.fetch(f"{self.base_url}/construction_directory.aspx")
+            if html is None:
+                raise FetchFailed("The batch directory is gone.")
+
+            batch_links = extract_batch_links(html)
+            print(f"Found {len(batch_links)} batch links.")
+            for href in batch_links:
+                self.queue.put_nowait(("listing", self.absolute(href), 1, 0))
+
+            workers = [asyncio.create_task(self.worker()) for _ in range(self.concurrency)]
+            while True:
+                await self.queue.join()
+                if not self.delayed:
+                    break
+                await asyncio.wait(set(self.delayed))  # Retries go back on the queue
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+        self.flush()
+        if self.failed:
+            self.save_failed()
+        self.progress.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY)
+    parser.add_argument("--base-url", default=BASE_URL)
+    parser.add_argument("--output", default=RESULTS_FILE)
+    parser.add_argument("--failed", default=FAILED_FILE, help="CSV of pages given up after JOB_ATTEMPTS")
+    parser.add_argument("--cache", default=HTTP_CACHE_FILE, help="HTTP response cache ('' to disable)")
+    parser.add_argument("--metrics-port", type=int, default=None, help="serve Prometheus metrics on this port")
+    args = parser.parse_args()
+
+    if args.metrics_port is not None:
+        metrics.serve(args.metrics_port)
+
+    if args.cache:
+        http_client.enable_cache(args.cache)
+    crawler = AsyncCrawler(args.base_url, args.concurrency, args.output, args.failed)
+    start_time = time.time()
+    asyncio.run(crawler.run())
+    elapsed = time.time() - start_time
+
+    print(f"\n✅ Scraped {crawler.companies_done} companies ({crawler.pages_fetched} pages) in {elapsed:.1f} seconds")
+    print(f"⚡ {crawler.pages_fetched / elapsed:.1f} pages/s. Data saved to {args.output}.")
+    print(f"⏭️ Frontier: {crawler.frontier.stats()}")
+    print(f"🚦 Request rate: {http_client.rate_stats()}")
+    if crawler.failed:
+        print(f"⚠️ {len(crawler.failed)} pages given up; listed in {args.failed} and left out of {args.output}.")
+    metrics.write_summary()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,4 @@
-import requests
+import http_client
 from bs4 import BeautifulSoup
 import pandas as pd
 import time
@@ -12,7 +12,7 @@ HEADERS = {
 # Fetch the page
 def fetch_batch_links():
     print("Fetching batch links...")
-    res = requests.get(BASE_URL, headers=HEADERS, timeout=15)
+    res = http_client.get(BASE_URL, headers=HEADERS, timeout=15)
     
     if res.status_code != 200:
         raise Exception(f"Failed to fetch main page: Status code {res.status_code}")
@@ -0,0 +1,354 @@
+"""Benchmarks against the local mock site (mock_site.py).
+
+Usage:
+    python bench.py session [--pages N] [--threads N]
+    python bench.py window [--pages N] [--threads N] [--slow-rate F] [--empty-rate F] [--retry-delay S]
+    python bench.py emrp [--strings N] [--distinct N]
+    python bench.py parse [--pages N] [--threads N] [--processes N ...] [--chunk N ...]
+    python bench.py pipelines [--scripts NAME ...] [--batches N] [--pages-per-batch N] [--latency S] [--error-rate F]
+"""
+import argparse
+import contextlib
+import importlib.util
+import io
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+import pandas as pd
+
+try:
+    import resource
+except ImportError:  # Windows -> psutil, if installed
+    resource = None
+try:
+    import psutil
+except ImportError:
+    psutil = None
+import requests
+
+import email_List
+import emrp
+import http_client
+from extractor import extract_company_info, stream_company_info
+from mock_site import COMPANIES_PER_PAGE, company_page, start_mock_site
+from parse_pool import ParsePool
+from sliding_window import RetryLater, run_sliding_window
+
+
+def run_fetches(server, fetch, pages, threads):
+    server.reset_counters()
+    urls = [f"{server.base_url}/company/{i}" for i in range(pages)]
+    start = time.time()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        list(executor.map(lambda url: stream_company_info(fetch(url)), urls))
+    elapsed = time.time() - start
+    return {
+        "pages/s": pages / elapsed,
+        "handshakes/page": server.connections / pages,
+    }
+
+
+def bench_session(args):
+    server = start_mock_site()
+
+    def fetch(url):
+        return http_client.get(url, stream=True)
+
+    # The pooled session against requests.get on equal terms, with the rate controller out of the way;
+    # the paced row shows what the controller's ramp-up costs against a fresh host
+    results = {"requests.get": run_fetches(server, lambda url: requests.get(url, stream=True, timeout=15),
+                                           args.pages, args.threads)}
+    http_client.configure(pool_size=args.threads, rate_control=False)
+    results["http_client"] = run_fetches(server, fetch, args.pages, args.threads)
+    http_client.configure(pool_size=args.threads)
+    results["http_client paced"] = run_fetches(server, fetch, args.pages, args.threads)
+    server.shutdown()
+
+    print(f"{'fetch':<20}{'pages/s':>10}{'handshakes/page':>18}")
+    for name, stats in results.items():
+        print(f"{name:<20}{stats['pages/s']:>10.1f}{stats['handshakes/page']:>18.3f}")
+
+
+def lockstep(links, fetch, threads, retries, retry_delay):
+    """The old email_List.py scheduler: groups of `threads` futures, sleeping retries inside workers."""
+    def fetch_with_sleep(link):
+        for attempt in range(retries):
+            try:
+                return fetch(link)
+            except RetryLater:
+                if attempt < retries - 1:
+                    time.sleep(retry_delay)
+        return None
+
+    results = []
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        for i in range(0, len(links), threads):
+            futures = [executor.submit(fetch_with_sleep, link) for link in links[i:i + threads]]
+            wait(futures)
+            results.extend(f.result() for f in futures)
+    return results
+
+
+def bench_window(args):
+    server = start_mock_site(latency=args.latency, slow_rate=args.slow_rate, slow_latency=args.slow_latency,
+                             empty_rate=args.empty_rate)
+    http_client.configure(pool_size=args.threads)
+    email_List.RETRY_DELAY = args.retry_delay
+    links = [f"{server.base_url}/company/{i}" for i in range(args.pages)]
+
+    schedulers = {
+        "lock-step": lambda: lockstep(links, email_List.fetch_company_info, args.threads, 3, args.retry_delay),
+        "sliding window": lambda: list(run_sliding_window(
+            links, email_List.fetch_company_info, window=args.threads, retry_delay=args.retry_delay,
+            on_give_up=email_List.dead_link)),
+    }
+
+    print(f"{'scheduler':<16}{'pages/s':>10}{'seconds':>10}")
+    for name, run in schedulers.items():
+        start = time.time()
+        with contextlib.redirect_stdout(io.StringIO()):  # Mute the per-retry prints
+            run()
+        elapsed = time.time() - start
+        print(f"{name:<16}{args.pages / elapsed:>10.1f}{elapsed:>10.1f}")
+    server.shutdown()
+
+
+def decode_emrp_loop(text):
+    """The original character-by-character decoder, as a baseline."""
+    decoded = ''
+    for char in text:
+        if char == '/':
+            decoded += '.'
+        elif char == 'A':
+            decoded += '@'
+        else:
+            decoded += chr(ord(char) - 1)
+    return decoded
+
+
+def bench_emrp(args):
+    emails = [f"info{i}@company-{i}.co.uk" for i in range(args.distinct)]
+    texts = [emrp.encode_emrp(random.choice(emails)) for _ in range(args.strings)]
+
+    decoders = {
+        "string loop": lambda: [decode_emrp_loop(t) for t in texts],
+        "translate": lambda: [emrp.decode_emrp.__wrapped__(t) for t in texts],
+        "translate+memo": lambda: [emrp.decode_emrp(t) for t in texts],
+        "decode_many": lambda: emrp.decode_many(texts),
+    }
+
+    print(f"{'decoder':<16}{'strings/s':>14}")
+    for name, run in decoders.items():
+        emrp.decode_emrp.cache_clear()
+        start = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - start
+        print(f"{name:<16}{args.strings / elapsed:>14,.0f}")
+
+
+def bench_parse(args):
+    """Extraction throughput: parsing in the fetch threads vs handing bytes to a ParsePool."""
+    bodies = [company_page(i).encode("utf-8") for i in range(args.pages)]
+
+    print(f"{'parse stage':<28}{'pages/s':>10}")
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.threads) as executor:
+        list(executor.map(extract_company_info, bodies))
+    print(f"{f'{args.threads} threads, in-thread':<28}{args.pages / (time.perf_counter() - start):>10.0f}")
+
+    for processes in args.processes:
+        for chunk in args.chunk:
+            with ParsePool(processes, chunk) as pool:
+                list(map(pool.extract, bodies[:processes * chunk]))  # Start and warm up the workers
+                start = time.perf_counter()
+                with ThreadPoolExecutor(max_workers=args.threads) as executor:
+                    list(executor.map(pool.extract, bodies))
+                elapsed = time.perf_counter() - start
+            print(f"{f'{processes} processes, chunk {chunk}':<28}{args.pages / elapsed:>10.0f}")
+
+
+PIPELINE_SCRIPTS = ("main.py", "main-thread.py", "email_List.py", "Company.py")
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def load_script(name):
+    """Import a top-level script by file name (works for main-thread.py too)."""
+    spec = importlib.util.spec_from_file_location(name.replace("-", "_")[:-3], os.path.join(REPO_DIR, name))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def prepare_inputs(script, base_url, batches, pages_per_batch):
+    """Write the spreadsheet a script reads, pointing at the mock site."""
+    if script == "Company.py":
+        pd.DataFrame({"Batch Link": [f"{base_url}/batch/{b}" for b in range(batches)]}).to_excel(
+            "batch_links.xlsx", index=False)
+    elif script == "email_List.py":
+        links = [f"/company/{b * 1000 + i}" for b in range(batches) for i in range(pages_per_batch * COMPANIES_PER_PAGE)]
+        pd.DataFrame({"CompanyLink": links}).to_excel("company_links.xlsx", index=False)
+
+
+def run_script(args):
+    """Child side of `pipelines`: run one script's main() here and write CPU/RSS to args.result."""
+    sys.path.insert(0, REPO_DIR)
+    os.chdir(args.workdir)
+    prepare_inputs(args.script, args.base_url, args.batches, args.pages_per_batch)
+    module = load_script(args.script)
+    module.BASE_URL = args.base_url
+    if hasattr(module, "METRICS_PORT"):
+        module.METRICS_PORT = None
+
+    with ChildUsage() as children:
+        module.main()
+
+    with open(args.result, "w") as f:
+        json.dump(process_usage(children), f)
+
+
+class ChildUsage:
+    """Without resource, samples psutil for the CPU and peak RSS of child processes
+    (main-thread.py's parse pool) while they run, since they are gone afterwards."""
+
+    INTERVAL = 0.2
+
+    def __init__(self):
+        self.seen = {}  # pid -> (cpu seconds, peak rss bytes)
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.sample_loop, daemon=True)
+
+    def sample(self):
+        for child in psutil.Process().children(recursive=True):
+            try:
+                with child.oneshot():
+                    times = child.cpu_times()
+                    rss = child.memory_info().rss
+            except psutil.Error:
+                continue
+            _, peak = self.seen.get(child.pid, (0.0, 0))
+            self.seen[child.pid] = (times.user + times.system, max(peak, rss))
+
+    def sample_loop(self):
+        while not self.stopped.wait(self.INTERVAL):
+            self.sample()
+
+    def __enter__(self):
+        if resource is None and psutil is not None:
+            self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stopped.set()
+        if self.thread.is_alive():
+            self.thread.join()
+
+
+def process_usage(children):
+    """CPU seconds and peak RSS (KB) of this process plus its child processes; None where unmeasurable."""
+    if resource is not None:
+        # RUSAGE_CHILDREN covers child processes already waited for, e.g. a closed ParsePool;
+        # its ru_maxrss is the largest child's, added to ours as the peak of both at once
+        own = resource.getrusage(resource.RUSAGE_SELF)
+        reaped = resource.getrusage(resource.RUSAGE_CHILDREN)
+        return {"cpu": own.ru_utime + own.ru_stime + reaped.ru_utime + reaped.ru_stime,
+                "peak_rss_kb": own.ru_maxrss + reaped.ru_maxrss}
+    if psutil is not None:
+        me = psutil.Process()
+        times = me.cpu_times()
+        memory = me.memory_info()
+        own_peak = getattr(memory, "peak_wset", memory.rss)  # Peak working set on Windows
+        return {"cpu": times.user + times.system + sum(cpu for cpu, _ in children.seen.values()),
+                "peak_rss_kb": (own_peak + sum(peak for _, peak in children.seen.values())) // 1024}
+    return {"cpu": None, "peak_rss_kb": None}
+
+
+def bench_pipelines(args):
+    server = start_mock_site(batches=args.batches, pages_per_batch=args.pages_per_batch, latency=args.latency,
+                             error_rate=args.error_rate, empty_rate=args.empty_rate)
+
+    print(f"{'script':<16}{'pages':>8}{'pages/s':>10}{'CPU ms/page':>13}{'peak RSS MB':>13}")
+    for script in args.scripts:
+        with tempfile.TemporaryDirectory() as workdir:
+            result_file = os.path.join(workdir, "bench_result.json")
+            command = [sys.executable, os.path.abspath(__file__), "script", script, "--base-url", server.base_url,
+                       "--workdir", workdir, "--result", result_file, "--batches", str(args.batches),
+                       "--pages-per-batch", str(args.pages_per_batch)]
+            server.reset_counters()
+            start = time.time()
+            proc = subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+            elapsed = time.time() - start
+            if proc.returncode != 0 or not os.path.exists(result_file):
+                print(f"{script:<16} failed: {proc.stderr.strip().splitlines()[-1:]}")
+                continue
+            with open(result_file) as f:
+                usage = json.load(f)
+
+        pages = server.requests
+        cpu = "n/a" if usage["cpu"] is None else f"{1000 * usage['cpu'] / max(pages, 1):.2f}"
+        rss = "n/a" if usage["peak_rss_kb"] is None else f"{usage['peak_rss_kb'] / 1024:.1f}"
+        print(f"{script:<16}{pages:>8}{pages / elapsed:>10.1f}{cpu:>13}{rss:>13}")
+    server.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    sub = parser.add_subparsers(dest="bench", required=True)
+
+    session = sub.add_parser("session", help="bare requests.get vs pooled shared session")
+    session.add_argument("--pages", type=int, default=2000)
+    session.add_argument("--threads", type=int, default=20)
+    session.set_defaults(func=bench_session)
+
+    window = sub.add_parser("window", help="lock-step groups vs sliding window under tail latency")
+    window.add_argument("--pages", type=int, default=1000)
+    window.add_argument("--threads", type=int, default=20)
+    window.add_argument("--latency", type=float, default=0.02)
+    window.add_argument("--slow-rate", type=float, default=0.02)
+    window.add_argument("--slow-latency", type=float, default=2.0)
+    window.add_argument("--empty-rate", type=float, default=0.02)
+    window.add_argument("--retry-delay", type=float, default=1.0)
+    window.set_defaults(func=bench_window)
+
+    decoder = sub.add_parser("emrp", help="emrp decoder microbenchmark")
+    decoder.add_argument("--strings", type=int, default=200000)
+    decoder.add_argument("--distinct", type=int, default=20000)
+    decoder.set_defaults(func=bench_emrp)
+
+    parse = sub.add_parser("parse", help="in-thread parsing vs the process-pool parse stage")
+    parse.add_argument("--pages", type=int, default=5000)
+    parse.add_argument("--threads", type=int, default=20)
+    parse.add_argument("--processes", type=int, nargs="+", default=sorted({1, 2, 4, os.cpu_count() or 1}))
+    parse.add_argument("--chunk", type=int, nargs="+", default=[1, 16])
+    parse.set_defaults(func=bench_parse)
+
+    pipelines = sub.add_parser("pipelines", help="run the scraper scripts end to end against the mock site")
+    pipelines.add_argument("--scripts", nargs="+", default=list(PIPELINE_SCRIPTS), choices=PIPELINE_SCRIPTS)
+    pipelines.add_argument("--batches", type=int, default=10)
+    pipelines.add_argument("--pages-per-batch", type=int, default=3)
+    pipelines.add_argument("--latency", type=float, default=0.01)
+    pipelines.add_argument("--error-rate", type=float, default=0.0)
+    pipelines.add_argument("--empty-rate", type=float, default=0.0)
+    pipelines.set_defaults(func=bench_pipelines)
+
+    script = sub.add_parser("script", help="(used by pipelines) run one script in this process")
+    script.add_argument("script", choices=PIPELINE_SCRIPTS)
+    script.add_argument("--base-url", required=True)
+    script.add_argument("--workdir", required=True)
+    script.add_argument("--result", required=True)
+    script.add_argument("--batches", type=int, required=True)
+    script.add_argument("--pages-per-batch", type=int, required=True)
+    script.set_defaults(func=run_script)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,327 @@
+import csv
+import os
+import sqlite3
+import threading
+import time
+
+from frontier import canonicalize
+
+STATE_FILE = "crawl_state.sqlite"
+COMMIT_EVERY = 100  # Results buffered before one transaction
+MAX_ATTEMPTS = 5  # Failed fetches of one company before it is given up as failed
+GONE_STATUSES = (404, 410)  # HTTP statuses that make a company page dead
+
+PENDING = "pending"
+IN_FLIGHT = "in_flight"
+DONE = "done"
+DEAD = "dead"
+FAILED = "failed"  # Fetch kept failing (timeouts, 5xx, proxies) MAX_ATTEMPTS times
+VANISHED = "vanished"  # No longer listed in any batch after a refresh
+PAGINATED = "paginated"
+
+
+class CrawlState:
+    """Transactional crawl progress: per-batch and per-company status plus results.
+
+    Batches go pending -> paginated -> done; companies go pending -> in_flight
+    -> done/dead. Dead is kept for gone pages (404/410) and empty templates; a
+    fetch that fails goes back to pending, and its batch stays open, until it
+    has failed max_attempts times. On resume only batches and companies that
+    are not finished are handed out again, so nothing already fetched is
+    refetched.
+
+    Pending companies are handed out by priority (see frontier.company_priority),
+    and batch_stats() gives the email yield per batch for ordering batches.
+
+    Every company keeps the fingerprint of its listing block. A refresh
+    re-paginates all batches and sends back to pending only the companies
+    that are new or whose block changed; the ones no batch lists any more
+    become vanished when it finishes.
+    """
+
+    def __init__(self, path=STATE_FILE, commit_every=COMMIT_EVERY, max_attempts=MAX_ATTEMPTS):
+        self.path = path
+        self.commit_every = commit_every
+        self.max_attempts = max_attempts
+        self.lock = threading.Lock()
+        self.buffer = []
+        self.conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        with self.conn:
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS batches (
+                    url TEXT PRIMARY KEY,
+                    status TEXT NOT NULL DEFAULT 'pending',
+                    updated_at REAL
+                )""")
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS companies (
+                    url TEXT PRIMARY KEY,
+                    batch_url TEXT NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'pending',
+                    company_name TEXT,
+                    email TEXT,
+                    updated_at REAL
+                )""")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS companies_batch ON companies (batch_url, status)")
+            self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+            # Columns added for refreshes; state files from older runs get them here
+            for table, column in (("batches", "listed_gen INTEGER NOT NULL DEFAULT 0"),
+                                  ("companies", "fingerprint TEXT"),
+                                  ("companies", "listed_gen INTEGER NOT NULL DEFAULT 0"),
+                                  ("companies", "priority REAL NOT NULL DEFAULT 0"),
+                                  ("companies", "attempts INTEGER NOT NULL DEFAULT 0"),
+                                  ("companies", "scheme TEXT")):
+                existing = {row[1] for row in self.conn.execute(f"PRAGMA table_info({table})")}
+                if column.split()[0] not in existing:
+                    self.conn.execute(f"ALTER TABLE {table} ADD COLUMN {column}")
+        self.refresh_counts = {"new": 0, "changed": 0, "unchanged": 0}
+
+    # Batches
+
+    def add_batches(self, batch_urls):
+        with self.lock, self.conn:
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO batches (url, updated_at) VALUES (?, ?)",
+                [(url, time.time()) for url in batch_urls],
+            )
+
+    def import_checkpoint(self, checkpoint_file):
+        """Mark batches listed in an old batch_checkpoint.csv as done, once per state file.
+
+        Links are canonicalised (frontier.canonicalize) like every other URL in the state.
+        """
+        if not os.path.exists(checkpoint_file) or self.get_meta("checkpoint_imported") == "1":
+            return 0
+        with open(checkpoint_file, "r", encoding="utf-8") as f:
+            done = list(dict.fromkeys(canonicalize(line.strip()) for line in f if line.strip()))
+        with self.lock, self.conn:
+            self.conn.executemany(
+                "INSERT INTO batches (url, status, updated_at) VALUES (?, 'done', ?) "
+                "ON CONFLICT(url) DO UPDATE SET status = 'done'",
+                [(url, time.time()) for url in done],
+            )
+        self.set_meta("checkpoint_imported", 1)  # Later runs and refreshes must not force them back to done
+        return len(done)
+
+    def pending_batches(self):
+        with self.lock:
+            rows = self.conn.execute("SELECT url FROM batches WHERE status != ? ORDER BY rowid", (DONE,)).fetchall()
+        return [url for (url,) in rows]
+
+    def batch_stats(self):
+        """{batch_url: (companies with an email, finished companies)} over everything crawled so far."""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT batch_url, SUM(email LIKE '%@%'), COUNT(*) FROM companies WHERE status IN (?, ?) "
+                "GROUP BY batch_url", (DONE, DEAD)
+            ).fetchall()
+        return {batch_url: (emails, finished) for batch_url, emails, finished in rows}
+
+    def is_paginated(self, batch_url):
+        with self.lock:
+            row = self.conn.execute("SELECT status FROM batches WHERE url = ?", (batch_url,)).fetchone()
+        return row is not None and row[0] in (PAGINATED, DONE)
+
+    def mark_batch_done(self, batch_url):
+        """Close a batch whose companies have all been tried; returns False (and keeps it
+        open for the next run) while some of them are still pending after a failed fetch."""
+        self.flush()
+        with self.lock, self.conn:
+            return self.conn.execute(
+                "UPDATE batches SET status = ?, updated_at = ? WHERE url = ? AND NOT EXISTS "
+                "(SELECT 1 FROM companies WHERE batch_url = ? AND status IN (?, ?))",
+                (DONE, time.time(), batch_url, batch_url, PENDING, IN_FLIGHT),
+            ).rowcount > 0
+
+    # Refresh
+
+    def get_meta(self, key, default=None):
+        with self.lock:
+            row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return default if row is None else row[0]
+
+    def set_meta(self, key, value):
+        with self.lock, self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, str(value)))
+
+    @property
+    def generation(self):
+        return int(self.get_meta("generation", 0))
+
+    @property
+    def refreshing(self):
+        return self.get_meta("refreshing") == "1"
+
+    def start_refresh(self):
+        """Begin a new refresh (every batch pending again), or resume one a crash cut short; True if new."""
+        if self.refreshing:
+            return False
+        with self.lock, self.conn:
+            self.conn.execute("UPDATE batches SET status = ?, updated_at = ?", (PENDING, time.time()))
+        self.set_meta("generation", self.generation + 1)
+        self.set_meta("refreshing", 1)
+        return True
+
+    def refresh_companies(self, batch_url, fingerprints, complete=True):
+        """Compare a re-paginated batch ({url: fingerprint}) with what is stored.
+
+        Every listed company is stamped with this generation, and so is the
+        batch if its pagination was complete (pagination.BatchPager.complete). Companies this
+        batch owns go back to pending if their block changed (or they had
+        vanished or failed); blocks seen in other batches are not compared, as their
+        markup may differ per batch. Returns the urls not in the state yet,
+        for add_companies().
+        """
+        generation = self.generation
+        urls = list(fingerprints)
+        known = {}
+        with self.lock:
+            for start in range(0, len(urls), 500):
+                chunk = urls[start:start + 500]
+                marks = ", ".join("?" * len(chunk))
+                for url, owner, fingerprint, status in self.conn.execute(
+                    f"SELECT url, batch_url, fingerprint, status FROM companies WHERE url IN ({marks})", chunk
+                ):
+                    known[url] = (owner == batch_url, fingerprint, status)
+            owned = [url for url, (own, _, _) in known.items() if own]
+            changed = [
+                url for url in owned
+                if known[url][2] in (VANISHED, FAILED) or known[url][1] not in (None, fingerprints[url])
+            ]
+            with self.conn:
+                self.conn.executemany(
+                    "UPDATE companies SET listed_gen = ? WHERE url = ?", [(generation, url) for url in known]
+                )
+                # Companies crawled before fingerprints existed take this one as their baseline
+                self.conn.executemany(
+                    "UPDATE companies SET fingerprint = ? WHERE url = ?", [(fingerprints[url], url) for url in owned]
+                )
+                self.conn.executemany(
+                    "UPDATE companies SET status = ?, attempts = 0, updated_at = ? WHERE url = ?",
+                    [(PENDING, time.time(), url) for url in changed],
+                )
+                if complete:
+                    self.conn.execute("UPDATE batches SET listed_gen = ? WHERE url = ?", (generation, batch_url))
+            self.refresh_counts["changed"] += len(changed)
+            self.refresh_counts["unchanged"] += len(known) - len(changed)
+        return [url for url in urls if url not in known]
+
+    def finish_refresh(self):
+        """Mark companies no batch listed in this refresh as vanished; returns how many.
+
+        Only companies of batches paginated completely in this refresh count,
+        so a batch with a failed or missing listing page does not make its
+        companies vanish.
+        """
+        generation = self.generation
+        self.flush()
+        with self.lock, self.conn:
+            vanished = self.conn.execute(
+                "UPDATE companies SET status = ?, updated_at = ? WHERE listed_gen < ? AND status != ? "
+                "AND batch_url IN (SELECT url FROM batches WHERE listed_gen = ?)",
+                (VANISHED, time.time(), generation, VANISHED, generation),
+            ).rowcount
+        self.set_meta("refreshing", 0)
+        return vanished
+
+    # Companies
+
+    def add_companies(self, batch_url, company_urls, fingerprints=None, priorities=None):
+        """Record a batch's company links (with listing fingerprints and fetch priorities); links already known are ignored."""
+        now = time.time()
+        fingerprints = fingerprints or [None] * len(company_urls)
+        priorities = priorities or [0.0] * len(company_urls)
+        generation = self.generation
+        with self.lock, self.conn:
+            before = self.conn.total_changes
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO companies (url, batch_url, fingerprint, listed_gen, priority, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [(url, batch_url, fingerprint, generation, priority, now)
+                 for url, fingerprint, priority in zip(company_urls, fingerprints, priorities)],
+            )
+            self.refresh_counts["new"] += self.conn.total_changes - before
+            self.conn.execute("UPDATE batches SET status = ?, updated_at = ? WHERE url = ?", (PAGINATED, now, batch_url))
+
+    def pending_companies(self, batch_url, with_priority=False):
+        """Company links of a batch still to scrape, highest priority first (in_flight ones were
+        cut off by a crash or a time budget); as (url, priority) with with_priority=True."""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT url, priority FROM companies WHERE batch_url = ? AND status IN (?, ?) "
+                "ORDER BY priority DESC, rowid",
+                (batch_url, PENDING, IN_FLIGHT),
+            ).fetchall()
+        return rows if with_priority else [url for url, _ in rows]
+
+    def mark_in_flight(self, company_urls):
+        now = time.time()
+        with self.lock, self.conn:
+            self.conn.executemany(
+                "UPDATE companies SET status = ?, updated_at = ? WHERE url = ?",
+                [(IN_FLIGHT, now, url) for url in company_urls],
+            )
+
+    def record_result(self, company_name, email, company_url, status=DONE, scheme=None):
+        """Buffer one company result, with the deobfuscate scheme that decoded its email;
+        every commit_every results are committed together.
+
+        status is DONE, DEAD, FAILED for a fetch that failed (the company goes
+        back to pending until it has failed max_attempts times), or PENDING to
+        hand it back without counting an attempt (e.g. not cached offline).
+        """
+        with self.lock:
+            self.buffer.append((status, company_name, email, scheme, time.time(), company_url))
+            if len(self.buffer) < self.commit_every:
+                return
+        self.flush()
+
+    def flush(self):
+        with self.lock:
+            rows, self.buffer = self.buffer, []
+            if rows:
+                with self.conn:
+                    self.conn.executemany(
+                        "UPDATE companies SET status = ?, company_name = ?, email = ?, scheme = ?, updated_at = ? "
+                        "WHERE url = ?",
+                        [row for row in rows if row[0] in (DONE, DEAD)],
+                    )
+                    self.conn.executemany(
+                        "UPDATE companies SET attempts = attempts + 1, updated_at = ?, "
+                        "status = CASE WHEN attempts + 1 >= ? THEN ? ELSE ? END WHERE url = ?",
+                        [(updated_at, self.max_attempts, FAILED, PENDING, url)
+                         for status, _, _, _, updated_at, url in rows if status == FAILED],
+                    )
+                    self.conn.executemany(
+                        "UPDATE companies SET status = ?, updated_at = ? WHERE url = ?",
+                        [(PENDING, updated_at, url) for status, _, _, _, updated_at, url in rows if status == PENDING],
+                    )
+
+    def counts(self):
+        """Company count per status."""
+        with self.lock:
+            return dict(self.conn.execute("SELECT status, COUNT(*) FROM companies GROUP BY status").fetchall())
+
+    def results(self, since=None):
+        """(company_name, email, url, scheme) of every finished company, in discovery order;
+        with since (a time.time()), only the ones finished from then on."""
+        self.flush()
+        with self.lock:
+            return self.conn.execute(
+                "SELECT company_name, email, url, scheme FROM companies WHERE status IN (?, ?) "
+                "AND (? IS NULL OR updated_at >= ?) ORDER BY rowid", (DONE, DEAD, since, since)
+            ).fetchall()
+
+    def export_csv(self, results_file):
+        rows = self.results()
+        with open(results_file, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(["Company Name", "Email", "Source URL", "Scheme"])
+            writer.writerows(rows)
+        return len(rows)
+
+    def close(self):
+        self.flush()
+        self.conn.close()
@@ -0,0 +1,129 @@
+"""Registry of email deobfuscation schemes.
+
+Decoders are tried cheapest first against what the email span contains;
+the first one that yields an address wins. Its scheme name is returned with
+the address, so scrapers store it on the result row, and counted.
+Register a new scheme with @register(name, cost).
+"""
+import html
+import re
+import threading
+import time
+from collections import Counter, namedtuple
+from urllib.parse import unquote
+
+import metrics
+from emrp import decode_script
+
+# What the extractor found inside span#cphMain_lblCLEmail
+# (text is the visible text only, script bodies are in script)
+EmailSource = namedtuple("EmailSource", "href script text cfemail")
+
+EMAIL_PATTERN = re.compile(r"[A-Za-z0-9._%+'-]+@[A-Za-z0-9-]+(?:\.[A-Za-z0-9-]+)*\.[A-Za-z]{2,}")
+QUOTED_PATTERN = re.compile(r"'([^']{5,})'|\"([^\"]{5,})\"")
+CF_HREF_PATTERN = re.compile(r"/cdn-cgi/l/email-protection#([0-9a-fA-F]+)")
+MAX_SHIFT = 5
+
+DECODERS = []  # [(cost, name, fn)], kept sorted by cost
+_counts = Counter()
+_counts_lock = threading.Lock()
+
+
+def register(name, cost):
+    def wrap(fn):
+        DECODERS.append((cost, name, fn))
+        DECODERS.sort(key=lambda d: d[0])
+        return fn
+    return wrap
+
+
+def unescape(text):
+    """Undo HTML entity and percent encoding."""
+    return html.unescape(unquote(text))
+
+
+@register("mailto", cost=1)
+def decode_mailto(source):
+    if source.href and source.href.lower().startswith("mailto:"):
+        return unescape(source.href[7:].split("?")[0]).strip() or None
+    return None
+
+
+@register("emrp", cost=2)
+def decode_emrp_script(source):
+    return decode_script(source.script) if source.script else None
+
+
+@register("plain-text", cost=3)
+def decode_plain_text(source):
+    if not source.text:
+        return None
+    match = EMAIL_PATTERN.search(unescape(source.text))
+    return match.group(0) if match else None
+
+
+def decode_cf_hex(encoded):
+    key = int(encoded[:2], 16)
+    return "".join(chr(int(encoded[i:i + 2], 16) ^ key) for i in range(2, len(encoded) - 1, 2))
+
+
+@register("cfemail", cost=4)
+def decode_cfemail(source):
+    encoded = source.cfemail
+    if not encoded and source.href:
+        match = CF_HREF_PATTERN.search(source.href)
+        encoded = match.group(1) if match else None
+    if not encoded:
+        return None
+    try:
+        email = decode_cf_hex(encoded)
+    except ValueError:
+        return None
+    return email if EMAIL_PATTERN.fullmatch(email) else None
+
+
+@register("shift", cost=5)
+def decode_shift(source):
+    """Caesar-style shift of every character, offset found by trying ±1..MAX_SHIFT."""
+    candidates = []
+    if source.script:
+        candidates.extend(a or b for a, b in QUOTED_PATTERN.findall(source.script))
+    if source.text:
+        candidates.append(source.text.strip())
+
+    for candidate in candidates:
+        for offset in range(1, MAX_SHIFT + 1):
+            for shift in (-offset, offset):
+                try:
+                    email = "".join(chr(ord(c) + shift) for c in candidate)
+                except ValueError:
+                    continue
+                if EMAIL_PATTERN.fullmatch(email):
+                    return email
+    return None
+
+
+def deobfuscate(source):
+    """Return (email, scheme) from the first decoder that succeeds, or ("N/A", None)."""
+    start = time.perf_counter()
+    for _, name, fn in DECODERS:
+        email = fn(source)
+        if email:
+            with _counts_lock:
+                _counts[name] += 1
+            metrics.observe("decode_seconds", time.perf_counter() - start, scheme=name)
+            return email, name
+    metrics.observe("decode_seconds", time.perf_counter() - start, scheme="none")
+    return "N/A", None
+
+
+def add_counts(counts):
+    """Merge scheme counts reported by another process (see parse_pool)."""
+    with _counts_lock:
+        _counts.update(counts)
+
+
+def scheme_counts():
+    """How many emails each scheme has decoded in this process."""
+    with _counts_lock:
+        return dict(_counts)
@@ -0,0 +1,231 @@
+"""Crawl split into one coordinator and any number of workers sharing a WorkQueue.
+
+The coordinator queues the batch links and waits; workers lease batch jobs
+(paginate, queue the companies) and company jobs (fetch, extract) until the
+queue is drained. The queue file stays on the coordinator's disk (SQLite WAL
+must not be shared over a network filesystem). With --serve the coordinator
+also serves the queue over HTTP, and workers on any machine pass that URL as
+--queue; workers on the coordinator's host may open the file directly. A
+crashed worker's leases expire and are picked up again.
+
+Usage:
+    python distributed_crawl.py coordinator [--queue FILE] [--serve HOST:PORT] [--token T] [--base-url URL]
+    python distributed_crawl.py worker [--queue FILE|http://HOST:PORT] [--token T] [--base-url URL] [--threads N]
+                                       [--worker-id ID]
+    python distributed_crawl.py local [--workers N] [--serve HOST:PORT] [--queue FILE] [--base-url URL]
+"""
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import http_client
+import pagination
+from extractor import extract_batch_links, stream_company_info
+from crawl_state import GONE_STATUSES
+from frontier import canonicalize
+from work_queue import BATCH, DEAD, DONE, FAILED, QUEUE_FILE, VISIBILITY_TIMEOUT, QueueServer, WorkQueue, open_queue
+
+BASE_URL = "https://www.construction.co.uk"
+HEADERS = http_client.HEADERS
+RESULTS_FILE = "construction_companies.csv"
+THREADS = 20
+CLAIM_SIZE = 40  # Jobs leased per round trip to the queue
+POLL_INTERVAL = 2.0  # Seconds an idle worker waits before asking again
+TOKEN_ENV = "QUEUE_TOKEN"  # Default --token, so it stays out of the process list
+
+
+def absolute(base_url, link):
+    return canonicalize(link, base_url)
+
+
+def fetch_listing(page_url):
+    res = http_client.get(page_url, headers=HEADERS)
+    res.raise_for_status()
+    return res.text
+
+
+def get_company_info(company_url):
+    """Return (company_name, email, status) for WorkQueue.complete.
+
+    A gone page (404/410) or one with neither name nor email is DEAD; any
+    other failure (after http_client's retries of 429/5xx) is FAILED, so the
+    job goes back to the queue instead of being written off.
+    """
+    try:
+        res = http_client.get(company_url, headers=HEADERS, stream=True)
+        try:
+            if res.status_code in GONE_STATUSES:
+                return "N/A", "N/A", DEAD
+            res.raise_for_status()
+            company_name, email, _ = stream_company_info(res)
+        finally:
+            res.close()
+    except Exception as e:
+        print(f"Failed to scrape {company_url}: {e}")
+        return "N/A", "N/A", FAILED
+
+    status = DEAD if company_name == "N/A" and email == "N/A" else DONE  # Empty template
+    return company_name, email, status
+
+
+# Coordinator
+
+def coordinator(args, on_ready=None):
+    """Queue the batches and wait for the queue to drain; on_ready(queue location) once workers may start."""
+    queue = WorkQueue(args.queue, args.visibility_timeout)
+    server = None
+    location = args.queue
+    if args.serve:
+        host, _, port = args.serve.rpartition(":")
+        server = QueueServer(queue, host or "0.0.0.0", int(port), args.token)
+        location = server.url
+        print(f"📡 Serving the queue on {location} (workers elsewhere use their route to this host)")
+    if on_ready is not None:
+        on_ready(location)
+    res = http_client.get(f"{args.base_url}/construction_directory.aspx", headers=HEADERS)
+    res.raise_for_status()
+    batch_links = [absolute(args.base_url, link) for link in extract_batch_links(res.text)]
+    added = queue.enqueue(BATCH, batch_links)
+    queue.mark_seeded()
+    print(f"Queued {added} new batches ({len(batch_links)} listed).")
+
+    while not queue.finished():
+        time.sleep(args.report_every)
+        print(f"⏳ {queue.counts()}")
+
+    exported = queue.export_csv(args.output)
+    print(f"\n✅ Queue drained: {queue.counts()}. {exported} companies saved to {args.output}.")
+    if server is not None:
+        time.sleep(2 * POLL_INTERVAL)  # Idle workers poll once more and see the queue is finished
+        server.close()
+    queue.close()
+
+
+# Worker
+
+class Worker:
+    def __init__(self, queue, worker_id, base_url, threads):
+        self.queue = queue
+        self.worker_id = worker_id
+        self.base_url = base_url
+        self.threads = threads
+        self.held = set()
+        self.held_lock = threading.Lock()
+        self.stopped = threading.Event()
+
+    def heartbeat(self):
+        while not self.stopped.wait(self.queue.visibility_timeout / 4):
+            with self.held_lock:
+                job_ids = list(self.held)
+            if job_ids:
+                self.queue.extend(self.worker_id, job_ids)
+
+    def run_batch(self, job_id, batch_url):
+        # Raises PaginationError if a listing page keeps failing, so no partial batch is completed
+        links = pagination.get_company_links(batch_url, fetch_listing)
+        added = self.queue.complete_batch(self.worker_id, job_id, [absolute(self.base_url, link) for link in links])
+        print(f"  Batch {batch_url}: {len(links)} companies, {added} new.")
+
+    def run(self):
+        threading.Thread(target=self.heartbeat, daemon=True).start()
+        companies = 0
+        with ThreadPoolExecutor(max_workers=self.threads) as executor:
+            while True:
+                jobs = self.queue.claim(self.worker_id, CLAIM_SIZE)
+                if not jobs:
+                    if self.queue.finished():
+                        break
+                    time.sleep(POLL_INTERVAL)
+                    continue
+                with self.held_lock:
+                    self.held.update(job_id for job_id, _, _ in jobs)
+
+                batch_jobs = [(job_id, url) for job_id, kind, url in jobs if kind == BATCH]
+                company_jobs = [(job_id, url) for job_id, kind, url in jobs if kind != BATCH]
+                for job_id, url in batch_jobs:
+                    try:
+                        self.run_batch(job_id, url)
+                    except Exception as e:
+                        print(f"⚠️ Failed to paginate {url}: {e}")
+                        self.queue.fail(self.worker_id, [job_id])  # Retried, up to MAX_ATTEMPTS leases
+                if company_jobs:
+                    infos = executor.map(get_company_info, [url for _, url in company_jobs])
+                    results = [(job_id, *info) for (job_id, _), info in zip(company_jobs, infos)]
+                    companies += self.queue.complete(self.worker_id, results)
+
+                with self.held_lock:
+                    self.held.difference_update(job_id for job_id, _, _ in jobs)
+        self.stopped.set()
+        return companies
+
+
+def worker(args):
+    http_client.configure(pool_size=args.threads)
+    queue = open_queue(args.queue, args.visibility_timeout, args.token)
+    worker_id = args.worker_id or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+    print(f"🧵 Worker {worker_id} on {args.queue}")
+    companies = Worker(queue, worker_id, args.base_url, args.threads).run()
+    print(f"✅ Worker {worker_id} done: {companies} companies.")
+    queue.close()
+
+
+def local(args):
+    """Coordinator plus N worker processes on this machine, for testing (--serve: through HTTP)."""
+    script = os.path.abspath(__file__)
+    env = {**os.environ, TOKEN_ENV: args.token} if args.token else None
+    workers = []
+
+    def start_workers(location):
+        if location.startswith("http://0.0.0.0:"):
+            location = location.replace("0.0.0.0", "127.0.0.1")
+        common = ["--queue", location, "--base-url", args.base_url, "--visibility-timeout", str(args.visibility_timeout)]
+        workers.extend(
+            subprocess.Popen([sys.executable, script, "worker", *common, "--worker-id", f"local-{n}"], env=env)
+            for n in range(args.workers)
+        )
+
+    coordinator(args, on_ready=start_workers)
+    for proc in workers:
+        proc.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="role", required=True)
+    for name, func, help in (
+        ("coordinator", coordinator, "queue the batches and wait for the workers"),
+        ("worker", worker, "lease and process jobs until the queue is drained"),
+        ("local", local, "coordinator plus --workers worker processes on this machine"),
+    ):
+        role = sub.add_parser(name, help=help)
+        role.add_argument("--queue", default=QUEUE_FILE,
+                          help="queue file" + (", or the coordinator's http:// URL" if name == "worker" else ""))
+        role.add_argument("--token", default=os.environ.get(TOKEN_ENV),
+                          help=f"shared secret for the served queue (default ${TOKEN_ENV})")
+        role.add_argument("--base-url", default=BASE_URL)
+        role.add_argument("--visibility-timeout", type=float, default=VISIBILITY_TIMEOUT,
+                          help="seconds before a silent worker's jobs are handed out again")
+        role.set_defaults(func=func)
+        if name == "worker":
+            role.add_argument("--threads", type=int, default=THREADS)
+            role.add_argument("--worker-id", default=None)
+        else:
+            role.add_argument("--output", default=RESULTS_FILE)
+            role.add_argument("--report-every", type=float, default=10.0, help="seconds between progress lines")
+            role.add_argument("--serve", default=None, metavar="HOST:PORT",
+                              help="serve the queue over HTTP for workers on other machines (e.g. 0.0.0.0:8765)")
+        if name == "local":
+            role.add_argument("--workers", type=int, default=3)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
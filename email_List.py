@@ -1,11 +1,15 @@
 import pandas as pd
-import requests
-from bs4 import BeautifulSoup
-import re
-import time
-import random
-from tqdm import tqdm
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import http_client
+import metrics
+
+from deobfuscate import scheme_counts
+from extractor import stream_company_info
+from frontier import Frontier, canonicalize
+from http_cache import CacheMiss
+from progress import ProgressTracker
+from result_sink import ResultSink
+from result_store import RESULTS_DIR, ResultStore
+from sliding_window import RetryLater, run_sliding_window
 
 # Configs
 HEADERS = {
@@ -13,111 +17,106 @@ HEADERS = {
 }
 BASE_URL = "https://www.construction.co.uk"
 THREADS = 20
-SAVE_EVERY = 20  # Save every 20 companies
-
-def decode_emrp(text):
-    decoded = ''
-    for char in text:
-        if char == '/':
-            decoded += '.'
-        elif char == 'A':
-            decoded += '@'
-        else:
-            decoded += chr(ord(char) - 1)
-    return decoded
-
-def fetch_company_info(company_relative_link, retries=3):
-    """Fetch company info, retry if both name/email are missing."""
-    company_url = company_relative_link
-    if not company_relative_link.startswith("http"):
-        company_url = BASE_URL + company_relative_link
-
-    for attempt in range(retries):
-        try:
-            res = requests.get(company_url, headers=HEADERS, timeout=10)
-            soup = BeautifulSoup(res.text, "html.parser")
-
-            # Company Name
-            name_tag = soup.find("h2", class_="listingTitle text-md-start text-center")
-            company_name = name_tag.find("span").text.strip() if name_tag else "N/A"
-
-            # Email
-            email = "N/A"
-            email_span = soup.find("span", id="cphMain_lblCLEmail")
-            if email_span:
-                a_tag = email_span.find("a", href=True)
-                if a_tag and a_tag['href'].startswith("mailto:"):
-                    email = a_tag['href'].replace("mailto:", "").split("?")[0].strip()
-                else:
-                    script_tag = email_span.find("script")
-                    if script_tag:
-                        match = re.search(r"emrp\('([^']+)'", script_tag.string)
-                        if match:
-                            obfuscated_text = match.group(1)
-                            email = decode_emrp(obfuscated_text)
-
-            # Retry if completely empty
-            if company_name == "N/A" and email == "N/A":
-                if attempt < retries - 1:
-                    print(f"⚠️ Press the button manually — retrying {company_url} after 10 seconds...")
-                    time.sleep(10)
-                    continue
-                else:
-                    return {"Company Name": "Dead Link", "Email": "Dead Link", "Company Link": company_url}
-
-            return {"Company Name": company_name, "Email": email, "Company Link": company_url}
-        
-        except Exception as e:
-            print(f"⚠️ Error on {company_url}: {e}")
-            if attempt < retries - 1:
-                print("🔁 Retrying after 10 seconds...")
-                time.sleep(10)
-            else:
-                return {"Company Name": "Dead Link", "Email": "Dead Link", "Company Link": company_url}
+RETRIES = 3
+RETRY_DELAY = 10  # Seconds a failed page waits before it is re-queued
+OUTPUT_FILE = "output.xlsx"  # Optional workbook export, None to skip
+RESULTS_PARQUET_DIR = RESULTS_DIR  # One Parquet sub-directory per run (its companies only), for result_store.py
+SINK_DIR = "output_parts"  # Append-only JSONL results, exported to OUTPUT_FILE at the end
+HTTP_CACHE_FILE = "http_cache.sqlite"
+OFFLINE = False  # True: re-extract from cached pages only, no network
+ARCHIVE_PAGES = False  # True: keep raw profile pages in page_archive/ for reextract.py
+METRICS_PORT = 9108  # Prometheus /metrics and JSON /summary while running, None to disable
+
+def full_url(company_relative_link):
+    if company_relative_link.startswith("http"):
+        return company_relative_link
+    return BASE_URL + company_relative_link
+
+def fetch_company_info(company_relative_link):
+    """Fetch company info once; raise RetryLater if the page fails or both name/email are missing.
+
+    Returns None for a page missing from the cache in OFFLINE mode.
+    """
+    company_url = full_url(company_relative_link)
+
+    try:
+        res = http_client.get(company_url, headers=HEADERS, timeout=10, stream=True, archive=True)
+        company_name, email, scheme = stream_company_info(res)
+    except CacheMiss:
+        return None  # Not saved, so an online run still fetches it
+    except Exception as e:
+        print(f"⚠️ Error on {company_url}: {e}")
+        print(f"🔁 Re-queued, retrying after {RETRY_DELAY} seconds...")
+        raise RetryLater(company_url)
+
+    if company_name == "N/A" and email == "N/A":
+        print(f"⚠️ Press the button manually — retrying {company_url} after {RETRY_DELAY} seconds...")
+        raise RetryLater(company_url)
+
+    return {"Company Name": company_name, "Email": email, "Company Link": company_url, "Scheme": scheme}
+
+def dead_link(company_relative_link):
+    return {"Company Name": "Dead Link", "Email": "Dead Link", "Company Link": full_url(company_relative_link)}
 
 def main():
+    http_client.configure(pool_size=THREADS)
+    http_client.enable_cache(HTTP_CACHE_FILE, offline=OFFLINE)
+    if ARCHIVE_PAGES:
+        http_client.enable_archive()
+    if METRICS_PORT is not None:
+        metrics.serve(METRICS_PORT)
+
     # Load links
     company_df = pd.read_excel("company_links.xlsx")
     company_links = company_df.iloc[:, 0].dropna().tolist()
 
-    all_info = []
-    start_time = time.time()
-
-    with ThreadPoolExecutor(max_workers=THREADS) as executor:
-        futures = []
-        for i, link in enumerate(company_links):
-            futures.append(executor.submit(fetch_company_info, link))
-
-            # Save after every SAVE_EVERY companies
-            if len(futures) >= SAVE_EVERY:
-                for future in tqdm(as_completed(futures), total=len(futures), desc=f"Scraping batch {i//SAVE_EVERY}"):
-                    result = future.result()
-                    all_info.append(result)
-
-                    # Time estimate
-                    elapsed = time.time() - start_time
-                    scraped = len(all_info)
-                    speed = scraped / elapsed
-                    remaining = (len(company_links) - scraped) / speed
-                    if scraped % 100 == 0:
-                        print(f"⏳ {scraped}/{len(company_links)} scraped. Remaining: {remaining/3600:.2f} hours")
-
-                # Save immediately
-                df = pd.DataFrame(all_info)
-                df.to_excel("output.xlsx", index=False)
-                print(f"💾 Saved {scraped} companies to output.xlsx")
-                
-                futures = []  # Clear futures for next batch
-
-        # Process leftover futures
-        for future in tqdm(as_completed(futures), total=len(futures), desc="Final batch"):
-            result = future.result()
-            all_info.append(result)
-
-    # Final save
-    df = pd.DataFrame(all_info)
-    df.to_excel("output.xlsx", index=False)
-    print("\n✅ All companies saved to output.xlsx!")
+    # Canonical links; the same company listed twice is fetched once
+    frontier = Frontier(None, BASE_URL)
+    company_links = frontier.add_many(company_links)
+    if frontier.skipped:
+        print(f"⏭️ Skipping {frontier.skipped} duplicate company links.")
+
+    # Every result is appended as it arrives; a rerun skips links already saved
+    sink = ResultSink(SINK_DIR)
+    done_links = {canonicalize(link, BASE_URL) for link in sink.keys()}
+    if done_links:
+        company_links = [link for link in company_links if link not in done_links]
+        print(f"⏭️ Skipping {len(done_links)} companies already saved in {SINK_DIR}.")
+
+    progress = ProgressTracker()
+    progress.stage("companies", total=len(company_links))
+
+    # THREADS requests stay in flight; failed pages wait out RETRY_DELAY in a queue, not in a worker
+    results = run_sliding_window(
+        company_links, fetch_company_info, window=THREADS, retries=RETRIES, retry_delay=RETRY_DELAY, on_give_up=dead_link
+    )
+    progress.bar("companies", "Scraping companies")
+    store = ResultStore.new_run(RESULTS_PARQUET_DIR)  # This run's results; the sink keeps every run's
+    not_cached = 0
+    for scraped, result in enumerate(results, 1):
+        if result is None:
+            not_cached += 1
+        else:
+            sink.append(result)
+            store.append(result)
+        progress.update("companies")
+
+        # Time estimate
+        if scraped % 100 == 0:
+            progress.log()
+    progress.close()
+
+    # The Excel export of everything in the sink is a last, optional step
+    sink.close()
+    store.close()
+    print(f"\n✅ {store.written} companies scraped this run saved to {store.directory}!")
+    if not_cached:
+        print(f"📭 {not_cached} companies are not in the cache; run with OFFLINE = False to fetch them.")
+    if OUTPUT_FILE:
+        sink.export_excel(OUTPUT_FILE)
+        print(f"✅ Exported to {OUTPUT_FILE}.")
+    print(f"🔓 Emails decoded per scheme: {scheme_counts()}")
+    metrics.write_summary()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,50 @@
+"""Decoder for the site's emrp('...') email obfuscation.
+
+The site shifts every character of the address up by one, except '.' which
+becomes '/' and '@' which becomes 'A'.
+"""
+import re
+from functools import lru_cache
+
+EMRP_PATTERN = re.compile(r"emrp\('([^']+)'")
+MEMO_SIZE = 65536  # Obfuscated strings remembered by decode_emrp
+
+
+class _ShiftTable(dict):
+    """str.translate table that fills in shifted characters outside ASCII on first use."""
+
+    def __init__(self, shift, specials):
+        super().__init__({c: chr(c + shift) for c in range(max(0, -shift), 128)})
+        self.shift = shift
+        self.update({ord(k): v for k, v in specials.items()})
+
+    def __missing__(self, codepoint):
+        value = chr(codepoint + self.shift)
+        self[codepoint] = value
+        return value
+
+
+DECODE_TABLE = _ShiftTable(-1, {'/': '.', 'A': '@'})
+ENCODE_TABLE = _ShiftTable(1, {'.': '/', '@': 'A'})
+
+
+@lru_cache(maxsize=MEMO_SIZE)
+def decode_emrp(text):
+    return text.translate(DECODE_TABLE)
+
+
+def encode_emrp(email):
+    """Inverse of decode_emrp, for building obfuscated test pages."""
+    return email.translate(ENCODE_TABLE)
+
+
+def decode_script(script_text):
+    """Decode the address inside an emrp('...') call, or None if there is none."""
+    match = EMRP_PATTERN.search(script_text)
+    return decode_emrp(match.group(1)) if match else None
+
+
+def decode_many(texts):
+    """Decode a batch of obfuscated strings, translating each distinct one once."""
+    decoded = {text: decode_emrp(text) for text in set(texts)}
+    return [decoded[text] for text in texts]
@@ -0,0 +1,242 @@
+import hashlib
+import re
+import time
+from collections import namedtuple
+
+from bs4 import BeautifulSoup
+
+import metrics
+from deobfuscate import EmailSource, deobfuscate
+
+try:
+    from lxml import etree
+    from lxml import html as lxml_html
+except ImportError:  # lxml missing -> BeautifulSoup only
+    etree = None
+    lxml_html = None
+
+BATCH_CLASS = "col-md-4 d-flex no-wrap align-items-center"
+LISTING_CLASS = "col companyListButtons"
+LISTING_LINK_CLASS = "companyListListingLink"
+NAME_CLASS = "listingTitle text-md-start text-center"
+EMAIL_SPAN_ID = "cphMain_lblCLEmail"
+# A listing block that links or scripts an email ("Email" button, mailto:, emrp(), Cloudflare)
+EMAIL_BUTTON_PATTERN = re.compile(r"mailto:|emrp\(|data-cfemail|\be-?mail\b", re.IGNORECASE)
+STREAM_CHUNK_SIZE = 8192
+STREAM_DRAIN_LIMIT = 64 * 1024  # Unparsed tail we still read so keep-alive connections go back to the pool
+
+# Selectors are compiled once and reused for every profile page
+if etree is not None:
+    NAME_XPATH = etree.XPath(f'(//h2[@class="{NAME_CLASS}"])[1]')
+    NAME_SPAN_XPATH = etree.XPath("(.//span)[1]")
+    EMAIL_SPAN_XPATH = etree.XPath(f'(//span[@id="{EMAIL_SPAN_ID}"])[1]')
+    EMAIL_LINK_XPATH = etree.XPath("(.//a[@href])[1]")
+    EMAIL_SCRIPT_XPATH = etree.XPath("(.//script)[1]")
+    EMAIL_TEXT_XPATH = etree.XPath(".//text()[not(ancestor::script or ancestor::style)]")  # As BeautifulSoup's get_text()
+    CFEMAIL_XPATH = etree.XPath("(.//@data-cfemail)[1]")
+    BATCH_LINK_XPATH = etree.XPath(f'//div[@class="{BATCH_CLASS}"]/descendant::a[1]/@href')
+    LISTING_BLOCK_XPATH = etree.XPath(f'//div[@class="{LISTING_CLASS}"]')
+    LISTING_LINK_XPATH = etree.XPath(
+        f'(.//div[contains(concat(" ", normalize-space(@class), " "), " {LISTING_LINK_CLASS} ")])[1]/descendant::a[1]/@href'
+    )
+
+
+def email_from_parts(href, script_text, text=None, cfemail=None):
+    """Turn whatever the email span holds into (email, scheme) via the deobfuscate registry.
+
+    text is the span's visible text only; script bodies go in script_text.
+    """
+    return deobfuscate(EmailSource(href, script_text, text, cfemail))
+
+
+def _name_from_tag(name_tag):
+    spans = NAME_SPAN_XPATH(name_tag)
+    return "".join(spans[0].itertext()).strip() if spans else "N/A"
+
+
+def _email_from_span(email_span):
+    links = EMAIL_LINK_XPATH(email_span)
+    href = links[0].get("href") if links else None
+    scripts = EMAIL_SCRIPT_XPATH(email_span)
+    script_text = scripts[0].text if scripts else None
+    cfemail = CFEMAIL_XPATH(email_span)
+    text = "".join(EMAIL_TEXT_XPATH(email_span))
+    return email_from_parts(href, script_text, text, str(cfemail[0]) if cfemail else None)
+
+
+def extract_with_lxml(html):
+    """Read company name, email and its deobfuscation scheme from a profile page using lxml selectors."""
+    root = lxml_html.fromstring(html)
+
+    name_tags = NAME_XPATH(root)
+    company_name = _name_from_tag(name_tags[0]) if name_tags else "N/A"
+
+    email_spans = EMAIL_SPAN_XPATH(root)
+    email, scheme = _email_from_span(email_spans[0]) if email_spans else ("N/A", None)
+
+    return company_name, email, scheme
+
+
+def extract_with_bs4(html):
+    """Reference extraction with BeautifulSoup, used when lxml is unavailable."""
+    soup = BeautifulSoup(html, "html.parser")
+
+    company_name = "N/A"
+    name_tag = soup.find("h2", class_=NAME_CLASS)
+    if name_tag and name_tag.find("span"):
+        company_name = name_tag.find("span").text.strip()
+
+    email, scheme = "N/A", None
+    email_span = soup.find("span", id=EMAIL_SPAN_ID)
+    if email_span:
+        a_tag = email_span.find("a", href=True)
+        href = a_tag['href'] if a_tag else None
+        script_tag = email_span.find("script")
+        script_text = script_tag.string if script_tag else None
+        cf_tag = email_span.find(attrs={"data-cfemail": True})
+        cfemail = cf_tag["data-cfemail"] if cf_tag else None
+        email, scheme = email_from_parts(href, script_text, email_span.get_text(), cfemail)
+
+    return company_name, email, scheme
+
+
+def extract_company_info(html):
+    """Return (company_name, email, scheme) for a profile page, "N/A" for anything missing.
+
+    scheme names the deobfuscate decoder that found the email, None without one.
+    """
+    metrics.inc("pages", stage="profile")
+    with metrics.timer("parse_seconds", stage="profile"):
+        if lxml_html is not None:
+            try:
+                return extract_with_lxml(html)
+            except (etree.ParserError, ValueError):
+                pass  # Empty or odd document, let BeautifulSoup have a go
+        return extract_with_bs4(html)
+
+
+def stream_company_info(res, chunk_size=STREAM_CHUNK_SIZE):
+    """Extract (company_name, email, scheme) from a stream=True response, closing it as
+    soon as name and email are seen.
+
+    The title and email span sit near the top of the page, so most profiles
+    never download or decode the rest of the body.
+    """
+    if etree is None:
+        try:
+            return extract_company_info(res.text)
+        finally:
+            res.close()
+
+    parser = etree.HTMLPullParser(events=("end",), encoding=res.encoding)
+    company_name = None
+    email = None
+    scheme = None
+
+    def read_events():
+        nonlocal company_name, email, scheme
+        for _, element in parser.read_events():
+            if company_name is None and element.tag == "h2" and element.get("class") == NAME_CLASS:
+                company_name = _name_from_tag(element)
+            elif email is None and element.tag == "span" and element.get("id") == EMAIL_SPAN_ID:
+                email, scheme = _email_from_span(element)
+
+    streamed = not res._content_consumed  # Cached/archived bodies were already timed by http_client
+    chunks = res.iter_content(chunk_size)
+    start = time.perf_counter()
+    parse_seconds = 0.0
+    try:
+        for chunk in chunks:
+            parse_start = time.perf_counter()
+            parser.feed(chunk)
+            read_events()
+            parse_seconds += time.perf_counter() - parse_start
+            if company_name is not None and email is not None:
+                break  # Got both, drop the rest of the page
+        else:
+            try:
+                parser.close()  # Flush elements still open at end of body
+            except etree.XMLSyntaxError:
+                pass
+            read_events()
+    finally:
+        _release(res, chunks)
+        metrics.inc("pages", stage="profile")
+        metrics.observe("parse_seconds", parse_seconds, stage="profile")
+        if streamed:
+            metrics.observe("http_download_seconds", time.perf_counter() - start - parse_seconds)
+
+    return company_name or "N/A", email or "N/A", scheme
+
+
+def _release(res, chunks):
+    """Close a streamed response, draining a short tail so its connection can be reused."""
+    drained = 0
+    try:
+        for chunk in chunks:
+            drained += len(chunk)
+            if drained > STREAM_DRAIN_LIMIT:
+                break  # Too much left, dropping the socket is cheaper
+    except Exception:
+        pass
+    res.close()
+
+
+def extract_batch_links(html):
+    """Return the batch hrefs listed on construction_directory.aspx."""
+    if lxml_html is not None:
+        return [str(href) for href in BATCH_LINK_XPATH(lxml_html.fromstring(html))]
+    soup = BeautifulSoup(html, "html.parser")
+    batch_divs = soup.find_all("div", class_=BATCH_CLASS)
+    return [div.find("a")['href'] for div in batch_divs if div.find("a") and div.find("a").get("href")]
+
+
+ListingEntry = namedtuple("ListingEntry", "href fingerprint email_button")
+
+
+def block_fingerprint(markup):
+    """Short hash of a listing block's HTML, whitespace-insensitive."""
+    return hashlib.blake2b(" ".join(markup.split()).encode("utf-8"), digest_size=8).hexdigest()
+
+
+def listing_entry(href, markup):
+    return ListingEntry(href, block_fingerprint(markup), bool(EMAIL_BUTTON_PATTERN.search(markup)))
+
+
+def extract_company_links(html, entries=False):
+    """Return (block_count, hrefs) for one batch listing page.
+
+    block_count is the number of company blocks on the page; zero means the
+    batch has no more pages. With entries=True every href comes as a
+    ListingEntry: a refresh compares its block fingerprint, and the fetch
+    order favours blocks with an email button.
+    """
+    metrics.inc("pages", stage="listing")
+    with metrics.timer("parse_seconds", stage="listing"):
+        return _extract_company_links(html, entries)
+
+
+def _extract_company_links(html, entries=False):
+    if lxml_html is not None:
+        try:
+            blocks = LISTING_BLOCK_XPATH(lxml_html.fromstring(html))
+        except etree.ParserError:
+            return 0, []
+        links = []
+        for block in blocks:
+            hrefs = LISTING_LINK_XPATH(block)
+            if hrefs and entries:
+                links.append(listing_entry(str(hrefs[0]), etree.tostring(block, encoding="unicode", with_tail=False)))
+            elif hrefs:
+                links.append(str(hrefs[0]))
+        return len(blocks), links
+
+    soup = BeautifulSoup(html, "html.parser")
+    blocks = soup.find_all("div", class_=LISTING_CLASS)
+    links = []
+    for block in blocks:
+        listing_link = block.find("div", class_=LISTING_LINK_CLASS)
+        if listing_link and listing_link.find("a"):
+            href = listing_link.find("a")['href']
+            links.append(listing_entry(href, str(block)) if entries else href)
+    return len(blocks), links
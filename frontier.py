@@ -0,0 +1,258 @@
+"""Crawl frontier: one URL canonicaliser plus a persisted seen-set.
+
+Every discovered link is canonicalised and checked before it is queued, so
+a company listed in several batches is fetched once. An in-memory Bloom
+filter answers most "never seen" checks; its positives are confirmed
+against the exact set in SQLite. Both survive restarts.
+
+Fetch order comes from listing-page signals: batches with the best email
+yield in earlier runs go first, and within a batch the companies whose
+listing block shows an email button. A time-boxed run then ends with the
+most useful rows.
+"""
+import hashlib
+import math
+import re
+import sqlite3
+import struct
+import threading
+import time
+from urllib.parse import parse_qsl, urlencode, urljoin, urlsplit, urlunsplit
+
+BASE_URL = "https://www.construction.co.uk"
+FRONTIER_FILE = "frontier.sqlite"
+BLOOM_CAPACITY = 1_000_000  # URLs the filter is sized for
+BLOOM_ERROR_RATE = 0.001
+SAVE_EVERY = 5000  # New URLs between two saves of the Bloom filter
+KNOWN_SOURCE = "known"  # Source of URLs seeded from earlier results; not queued again until KNOWN_TTL runs out
+KNOWN_TTL = 30 * 24 * 3600  # Seconds a seeded result keeps its company out of the queue
+PRIOR_WEIGHT = 20  # Finished companies' worth of weight the overall yield gets in a batch's estimate
+DEFAULT_YIELD = 0.5  # Expected email yield when nothing has been crawled yet
+EMAIL_BUTTON_BOOST = 1.0  # Added to a company's priority when its listing block has an email button
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+# "https://www.construction.co.ukhttps://www.construction.co.uk/..." -> the last base wins
+DUPLICATED_BASE = re.compile(r"^(?:https?://[^/?#]*?(?=https?://))+", re.IGNORECASE)
+REPEATED_SLASHES = re.compile(r"/{2,}")
+
+
+def canonicalize(url, base_url=BASE_URL):
+    """Absolute, canonical form of a link: no duplicated base, lowercase scheme/host, no default
+    port, no repeated or trailing slash, sorted query, no fragment. Links to the base host take
+    its scheme."""
+    url = DUPLICATED_BASE.sub("", url.strip())
+    parts = urlsplit(urljoin(base_url + "/", url))
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    base = urlsplit(base_url)
+    if host == (base.hostname or "").lower():
+        scheme = base.scheme.lower()
+    netloc = host
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        netloc = f"{host}:{parts.port}"
+    path = REPEATED_SLASHES.sub("/", parts.path) or "/"
+    if len(path) > 1:
+        path = path.rstrip("/")
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((scheme, netloc, path, query, ""))
+
+
+def company_priority(email_button, batch_yield=DEFAULT_YIELD):
+    """Fetch priority of a listed company, higher first."""
+    return batch_yield + (EMAIL_BUTTON_BOOST if email_button else 0.0)
+
+
+class BatchYields:
+    """Expected email yield per batch from {batch_url: (emails, finished companies)}.
+
+    Each batch's own rate is pulled towards the overall one by PRIOR_WEIGHT,
+    so a batch with two lucky companies does not jump the queue; batches
+    never crawled get the overall rate.
+    """
+
+    def __init__(self, stats, prior_weight=PRIOR_WEIGHT):
+        emails = sum(e for e, _ in stats.values())
+        finished = sum(n for _, n in stats.values())
+        self.prior = emails / finished if finished else DEFAULT_YIELD
+        self.known = len(stats)
+        self.yields = {
+            batch_url: (e + self.prior * prior_weight) / (n + prior_weight) for batch_url, (e, n) in stats.items()
+        }
+
+    def get(self, batch_url):
+        return self.yields.get(batch_url, self.prior)
+
+    def order(self, batch_urls):
+        """Batches by expected yield, best first; ties keep their order."""
+        return sorted(batch_urls, key=lambda batch_url: -self.get(batch_url))
+
+
+class BloomFilter:
+    def __init__(self, capacity=BLOOM_CAPACITY, error_rate=BLOOM_ERROR_RATE):
+        self.size = math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def positions(self, item):
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        h1, h2 = struct.unpack("<QQ", digest)
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, item):
+        for pos in self.positions(item):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, item):
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self.positions(item))
+
+    def to_bytes(self):
+        return struct.pack("<QI", self.size, self.hashes) + bytes(self.bits)
+
+    @classmethod
+    def from_bytes(cls, data):
+        bloom = cls.__new__(cls)
+        bloom.size, bloom.hashes = struct.unpack_from("<QI", data)
+        bloom.bits = bytearray(data[12:])
+        return bloom
+
+
+class Frontier:
+    """Seen-set of canonical URLs, each remembered with the source (batch) it was found in.
+
+    add_many() returns the links still worth queuing: never seen before, or
+    seen from the same source (a batch paginated again after a restart).
+    With source=None any earlier sighting counts as a duplicate.
+    path=None keeps everything in memory for one run.
+
+    URLs seeded by add_known() expire after known_ttl seconds; a batch that
+    lists an expired one queues it again and takes it over.
+    """
+
+    def __init__(self, path=FRONTIER_FILE, base_url=BASE_URL, capacity=BLOOM_CAPACITY, error_rate=BLOOM_ERROR_RATE,
+                 known_ttl=KNOWN_TTL):
+        self.path = path
+        self.base_url = base_url
+        self.known_ttl = known_ttl
+        self.lock = threading.Lock()
+        self.skipped = 0
+        self.false_positives = 0
+        self.unsaved = 0
+        self.bloom = BloomFilter(capacity, error_rate)
+        self.memory = {} if path is None else None  # url -> (source, added_at)
+        self.conn = None
+        if path is not None:
+            self.conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            with self.conn:
+                self.conn.execute("CREATE TABLE IF NOT EXISTS seen (url TEXT PRIMARY KEY, source TEXT)")
+                self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value BLOB)")
+                # Frontiers from older runs get added_at here; their known seeds count as expired
+                if "added_at" not in {row[1] for row in self.conn.execute("PRAGMA table_info(seen)")}:
+                    self.conn.execute("ALTER TABLE seen ADD COLUMN added_at REAL")
+            self.load_bloom(capacity, error_rate)
+
+    def load_bloom(self, capacity, error_rate):
+        """Use the saved filter if it covers every stored URL, otherwise rebuild it from the exact set."""
+        meta = dict(self.conn.execute("SELECT key, value FROM meta").fetchall())
+        seen = self.conn.execute("SELECT COUNT(*) FROM seen").fetchone()[0]
+        if "bloom" in meta and int(meta.get("bloom_count", -1)) == seen:
+            self.bloom = BloomFilter.from_bytes(meta["bloom"])
+            return
+        self.bloom = BloomFilter(max(capacity, 2 * seen), error_rate)
+        for (url,) in self.conn.execute("SELECT url FROM seen"):
+            self.bloom.add(url)
+        self.save_bloom()
+
+    def save_bloom(self):
+        seen = self.conn.execute("SELECT COUNT(*) FROM seen").fetchone()[0]
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                [("bloom", self.bloom.to_bytes()), ("bloom_count", str(seen))],
+            )
+        self.unsaved = 0
+
+    def lookup(self, url):
+        """(seen, source) for a canonical URL; an expired known seed counts as not seen."""
+        if url not in self.bloom:
+            return False, None
+        if self.memory is not None:
+            row = self.memory.get(url)
+        else:
+            row = self.conn.execute("SELECT source, added_at FROM seen WHERE url = ?", (url,)).fetchone()
+        if row is None:
+            self.false_positives += 1
+            return False, None
+        source, added_at = row
+        if source == KNOWN_SOURCE and (added_at is None or time.time() - added_at > self.known_ttl):
+            return False, None
+        return True, source
+
+    def store(self, urls, source):
+        """Record urls as seen from source (replacing expired known seeds); caller holds the lock."""
+        now = time.time()
+        for url in urls:
+            self.bloom.add(url)
+        if self.memory is not None:
+            self.memory.update((url, (source, now)) for url in urls)
+        elif urls:
+            with self.conn:
+                self.conn.executemany("INSERT OR REPLACE INTO seen (url, source, added_at) VALUES (?, ?, ?)",
+                                      [(url, source, now) for url in urls])
+
+    def add_many(self, links, source=None):
+        """Canonicalise links and return, in order, the ones to queue; duplicates are counted in .skipped."""
+        keep = []
+        new = []
+        batch_seen = set()
+        with self.lock:
+            for link in links:
+                url = canonicalize(link, self.base_url)
+                if url in batch_seen:
+                    self.skipped += 1
+                    continue
+                batch_seen.add(url)
+                seen, known_source = self.lookup(url)
+                if not seen:
+                    new.append(url)
+                    keep.append(url)
+                elif source is not None and known_source == source:
+                    keep.append(url)  # Same batch seen again after a restart
+                else:
+                    self.skipped += 1
+
+            self.store(new, source)
+            if self.memory is None and new:
+                self.unsaved += len(new)
+                if self.unsaved >= SAVE_EVERY:
+                    self.save_bloom()
+        return keep
+
+    def add_known(self, urls, source=KNOWN_SOURCE):
+        """Mark canonical URLs handled elsewhere (earlier runs' results) as seen for known_ttl seconds,
+        replacing the previous seeding; returns how many were seeded."""
+        with self.lock:
+            if self.memory is not None:
+                self.memory = {url: entry for url, entry in self.memory.items() if entry[0] != source}
+            else:
+                with self.conn:
+                    self.conn.execute("DELETE FROM seen WHERE source = ?", (source,))
+            new = [url for url in dict.fromkeys(urls) if not self.lookup(url)[0]]
+            self.store(new, source)
+            if self.memory is None:
+                self.save_bloom()
+        return len(new)
+
+    def stats(self):
+        with self.lock:
+            if self.memory is not None:
+                seen = len(self.memory)
+            else:
+                seen = self.conn.execute("SELECT COUNT(*) FROM seen").fetchone()[0]
+            return {"seen": seen, "skipped_duplicates": self.skipped, "bloom_false_positives": self.false_positives}
+
+    def close(self):
+        if self.conn is not None:
+            with self.lock:
+                self.save_bloom()
+            self.conn.close()
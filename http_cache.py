@@ -0,0 +1,179 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import zlib
+from functools import partial
+
+import requests
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+from frontier import canonicalize
+
+CACHE_FILE = "http_cache.sqlite"
+CACHE_TTL = 7 * 24 * 3600  # Seconds before an entry is revalidated
+CACHE_MAX_BYTES = 2 * 1024 ** 3  # Compressed bodies kept before LRU eviction
+EVICT_EVERY = 500  # Check the size bound every 500 writes
+KEPT_HEADERS = ("Content-Type", "ETag", "Last-Modified", "Date")
+
+
+class CacheMiss(Exception):
+    """Raised in offline mode when a URL is not in the cache."""
+
+
+def normalise_url(url):
+    """Canonical form (frontier.canonicalize) so equal pages share a key."""
+    return canonicalize(url)
+
+
+def cache_key(url):
+    return hashlib.sha256(normalise_url(url).encode("utf-8")).hexdigest()
+
+
+def build_response(url, status, headers, body):
+    """Wrap cached data in a requests.Response so callers can't tell it from a live one."""
+    res = requests.Response()
+    res.status_code = status
+    res.url = url
+    res.headers = CaseInsensitiveDict(headers)
+    res.encoding = get_encoding_from_headers(res.headers)
+    res._content = body
+    res._content_consumed = True
+    res.from_cache = True
+    return res
+
+
+def on_complete(res, callback):
+    """Call callback(body) once a stream=True response has been read to the end.
+
+    A reader that stops early (extractor.stream_company_info) never triggers
+    it, so only whole bodies are passed on.
+    """
+    iter_content = res.iter_content
+
+    def recording(chunk_size=1, decode_unicode=False):
+        chunks = []
+        for chunk in iter_content(chunk_size, decode_unicode):
+            chunks.append(chunk)
+            yield chunk
+        if not decode_unicode:
+            callback(b"".join(chunks))
+
+    res.iter_content = recording  # Response.content reads through it as well
+    return res
+
+
+class ResponseCache:
+    """SQLite store of zlib-compressed response bodies keyed by normalised URL.
+
+    Entries older than ttl are revalidated with If-None-Match/If-Modified-Since;
+    the least recently used entries are evicted once max_bytes is exceeded.
+    A stream=True miss stays streamed and is stored only if it is read to the end.
+    """
+
+    def __init__(self, path=CACHE_FILE, ttl=CACHE_TTL, max_bytes=CACHE_MAX_BYTES, offline=False):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.offline = offline
+        self.local = threading.local()
+        self.write_lock = threading.Lock()
+        self.writes = 0
+        with self.connection() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    url TEXT NOT NULL,
+                    status INTEGER NOT NULL,
+                    headers TEXT NOT NULL,
+                    body BLOB NOT NULL,
+                    size INTEGER NOT NULL,
+                    fetched_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )""")
+            conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at)")
+
+    def connection(self):
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self.local.conn = conn
+        return conn
+
+    def lookup(self, url):
+        """Return (response, fresh) for a cached URL, or (None, False)."""
+        row = self.connection().execute(
+            "SELECT status, headers, body, fetched_at FROM responses WHERE key = ?", (cache_key(url),)
+        ).fetchone()
+        if row is None:
+            return None, False
+        status, headers, body, fetched_at = row
+        res = build_response(url, status, json.loads(headers), zlib.decompress(body))
+        return res, time.time() - fetched_at < self.ttl
+
+    def touch(self, url, revalidated=False):
+        now = time.time()
+        with self.write_lock, self.connection() as conn:
+            if revalidated:
+                conn.execute("UPDATE responses SET accessed_at = ?, fetched_at = ? WHERE key = ?", (now, now, cache_key(url)))
+            else:
+                conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, cache_key(url)))
+
+    def store(self, url, res, body=None):
+        headers = {name: res.headers[name] for name in KEPT_HEADERS if name in res.headers}
+        body = zlib.compress(res.content if body is None else body, 6)
+        now = time.time()
+        with self.write_lock, self.connection() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (cache_key(url), url, res.status_code, json.dumps(headers), body, len(body), now, now),
+            )
+            self.writes += 1
+            if self.writes % EVICT_EVERY == 0:
+                self.evict(conn)
+
+    def evict(self, conn):
+        """Drop least recently used entries until the cache is back under 90% of max_bytes."""
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        target = self.max_bytes * 0.9
+        for key, size in conn.execute("SELECT key, size FROM responses ORDER BY accessed_at").fetchall():
+            conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            total -= size
+            if total <= target:
+                break
+
+    def get(self, fetch, url, **kwargs):
+        """GET through the cache: fresh hits skip the network, stale ones are revalidated."""
+        cached, fresh = self.lookup(url)
+        if cached is not None and (fresh or self.offline):
+            self.touch(url)
+            return cached
+        if self.offline:
+            raise CacheMiss(f"{url} is not in the cache")
+
+        stream = kwargs.pop("stream", False)
+        headers = dict(kwargs.pop("headers", None) or {})
+        if cached is not None:
+            if "ETag" in cached.headers:
+                headers["If-None-Match"] = cached.headers["ETag"]
+            if "Last-Modified" in cached.headers:
+                headers["If-Modified-Since"] = cached.headers["Last-Modified"]
+
+        res = fetch(url, headers=headers, stream=stream, **kwargs)
+        if res.status_code == 304 and cached is not None:
+            res.close()
+            self.touch(url, revalidated=True)
+            return cached
+        if res.status_code == 200:
+            if stream:
+                on_complete(res, partial(self.store, url, res))
+            else:
+                self.store(url, res)
+        res.from_cache = False
+        return res
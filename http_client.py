@@ -0,0 +1,275 @@
+import socket
+import threading
+import time
+import weakref
+from contextlib import ExitStack
+from functools import partial
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import ConnectTimeoutError
+from urllib3.util.connection import allowed_gai_family
+from urllib3.util.retry import Retry
+
+import metrics
+from archive import ARCHIVE_DIR, PageArchive
+from http_cache import CACHE_FILE, CACHE_TTL, ResponseCache
+from rate_control import THROTTLE_STATUSES, NoRateControl, RateController
+
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/90.0.4430.93 Safari/537.36"
+}
+POOL_SIZE = 20  # Match the THREADS setting of the scrapers
+DEFAULT_TIMEOUT = 15
+THROTTLE_RETRIES = 3  # Extra attempts for a 429/503, paced by the rate controller
+
+# Transient server errors are retried with backoff inside urllib3. 429/503 are
+# left to the rate controller so it can see them and slow the host down.
+RETRY_POLICY = Retry(
+    total=3,
+    backoff_factor=0.5,
+    status_forcelist=(500, 502, 504),
+    allowed_methods=("GET", "HEAD"),
+    raise_on_status=False,
+)
+
+_session = None
+_no_retry_session = None
+_session_lock = threading.Lock()
+_cache = None
+_archive = None
+_rate = RateController()
+
+
+class _TimedConnection:
+    """Records DNS and connect/TLS time of every new pooled connection in metrics.
+
+    The host is resolved once (timed), then every address is tried in
+    resolver order, as urllib3's create_connection does, so an unreachable
+    IPv6 address still falls back to IPv4.
+    """
+
+    def _new_conn(self):
+        host = self._dns_host
+        start = time.perf_counter()
+        try:
+            infos = socket.getaddrinfo(host, self.port, allowed_gai_family(), socket.SOCK_STREAM)
+        except OSError:
+            return super()._new_conn()  # Let urllib3 raise its usual error
+        self._dns_seconds = time.perf_counter() - start
+        metrics.observe("http_dns_seconds", self._dns_seconds)
+
+        error = None
+        try:
+            for address in dict.fromkeys(info[4][0] for info in infos):  # Unique, in resolver order
+                if error is not None:
+                    metrics.inc("retries", reason="connect_fallback")
+                self._dns_host = address  # Connect to the address just resolved, SNI still uses self.host
+                try:
+                    return super()._new_conn()
+                except ConnectTimeoutError as e:  # Also NewConnectionError, for refused/unreachable
+                    error = e
+        finally:
+            self._dns_host = host
+        if error is None:
+            return super()._new_conn()  # Resolved to nothing; urllib3 reports it
+        raise error
+
+    def connect(self):
+        self._dns_seconds = 0.0
+        start = time.perf_counter()
+        super().connect()
+        metrics.observe("http_connect_seconds", time.perf_counter() - start - self._dns_seconds)
+
+
+class _TimedHTTPConnection(_TimedConnection, HTTPConnection):
+    pass
+
+
+class _TimedHTTPSConnection(_TimedConnection, HTTPSConnection):
+    pass
+
+
+class _TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+
+class _TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+
+TIMED_POOL_CLASSES = {"http": _TimedHTTPConnectionPool, "https": _TimedHTTPSConnectionPool}
+
+
+class TimedAdapter(HTTPAdapter):
+    """HTTPAdapter whose pools (direct and proxied) time DNS and connect."""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = TIMED_POOL_CLASSES
+
+    def proxy_manager_for(self, proxy, **proxy_kwargs):
+        manager = super().proxy_manager_for(proxy, **proxy_kwargs)
+        manager.pool_classes_by_scheme = TIMED_POOL_CLASSES
+        return manager
+
+
+def make_session(pool_size=POOL_SIZE, retries=RETRY_POLICY):
+    """Build a keep-alive Session whose connection pool holds pool_size sockets per host."""
+    session = requests.Session()
+    adapter = TimedAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=retries, pool_block=True)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update(HEADERS)
+    return session
+
+
+def configure(pool_size=POOL_SIZE, retries=RETRY_POLICY, rate_control=True):
+    """Replace the shared sessions, e.g. to size the pool to the worker count.
+
+    rate_control=False stops pacing requests (for benchmarks only).
+    """
+    global _session, _no_retry_session, _rate
+    _rate = RateController() if rate_control else NoRateControl()
+    with _session_lock:
+        for session in (_session, _no_retry_session):
+            if session is not None:
+                session.close()
+        _session = make_session(pool_size, retries)
+        _no_retry_session = make_session(pool_size, retries=0)
+    return _session
+
+
+def get_session(retry=True):
+    """Return the process-wide session, creating it on first use; retry=False
+    gives the one without urllib3 retries."""
+    global _session, _no_retry_session
+    with _session_lock:
+        if not retry:
+            if _no_retry_session is None:
+                _no_retry_session = make_session(retries=0)
+            return _no_retry_session
+        if _session is None:
+            _session = make_session()
+        return _session
+
+
+def enable_cache(path=CACHE_FILE, ttl=CACHE_TTL, offline=False):
+    """Send every get() through the on-disk response cache.
+
+    With offline=True nothing touches the network and uncached URLs raise CacheMiss.
+    """
+    global _cache
+    _cache = ResponseCache(path, ttl=ttl, offline=offline)
+    return _cache
+
+
+def enable_archive(directory=ARCHIVE_DIR):
+    """Keep the raw body of every get(..., archive=True) page for reextract.py."""
+    global _archive
+    _archive = PageArchive(directory)
+    return _archive
+
+
+def rate_controller():
+    """The per-host rate controller every fetch goes through (async_crawl.py shares it)."""
+    return _rate
+
+
+def response_cache():
+    """The cache enabled by enable_cache(), or None."""
+    return _cache
+
+
+def rate_stats():
+    """Current per-host rate, concurrency and throttle count from the rate controller."""
+    return _rate.stats()
+
+
+def record_metrics(res, seconds, stream):
+    ttfb = res.elapsed.total_seconds()
+    metrics.observe("http_ttfb_seconds", ttfb)
+    if not stream:
+        metrics.observe("http_download_seconds", max(0.0, seconds - ttfb))
+    metrics.inc("http_responses", status=res.status_code)
+    retries = getattr(res.raw, "retries", None)
+    if retries is not None and retries.history:
+        metrics.inc("retries", len(retries.history), reason="server_error")
+
+
+def hold_slot(res, release):
+    """Keep a streamed response's rate-control slot until its body is read to the end
+    or it is closed (or, failing both, garbage collected)."""
+    release = weakref.finalize(res, release)  # Runs once, whichever comes first
+    close, iter_content = res.close, res.iter_content
+
+    def closing():
+        try:
+            close()
+        finally:
+            release()
+
+    def reading(*args, **kwargs):
+        yield from iter_content(*args, **kwargs)
+        release()
+
+    res.close = closing
+    res.iter_content = reading  # Response.content reads through it as well
+
+
+def fetch(url, retry=True, **kwargs):
+    """One network GET through the rate controller, retrying throttled responses.
+
+    With stream=True the slot is held until the body is consumed or the
+    response closed, so the concurrency cap counts open downloads, not just
+    requests waiting for headers. Proxied requests skip the urllib3 retries
+    (see get()).
+    """
+    session = get_session(retry and not kwargs.get("proxies"))
+    for attempt in range(THROTTLE_RETRIES + 1):
+        with ExitStack() as slot:
+            outcome = slot.enter_context(_rate.slot(url))
+            start = time.perf_counter()
+            try:
+                res = session.get(url, **kwargs)
+            except Exception:
+                metrics.inc("http_responses", status="error")
+                raise
+            _rate.record(outcome, res)
+            if kwargs.get("stream"):
+                hold_slot(res, slot.pop_all().close)
+        record_metrics(res, time.perf_counter() - start, kwargs.get("stream", False))
+        if res.status_code not in THROTTLE_STATUSES or attempt == THROTTLE_RETRIES:
+            return res
+        metrics.inc("retries", reason="throttled")
+        res.close()  # The next slot waits out the back-off / Retry-After
+    return res
+
+
+def get(url, archive=False, retry=True, **kwargs):
+    """requests.get over the shared pooled session, paced per host by the rate controller
+    (and served from the response cache, when enabled).
+
+    archive=True stores the full body of a 200 response in the page archive,
+    if one is enabled; such pages are always read whole. retry=False, and any
+    request through proxies, goes out once without urllib3 retries: callers
+    that rotate proxies retry on their own, and a dead free proxy would only
+    be retried for nothing.
+    """
+    kwargs.setdefault("timeout", DEFAULT_TIMEOUT)
+    archiving = archive and _archive is not None
+    if archiving:
+        kwargs.pop("stream", None)
+
+    if _cache is not None:
+        res = _cache.get(partial(fetch, retry=retry), url, **kwargs)
+        if res.from_cache:
+            metrics.inc("http_cache_hits")
+    else:
+        res = fetch(url, retry=retry, **kwargs)
+
+    if archiving and res.status_code == 200:
+        _archive.add(url, res.content, res.headers.get("Content-Type", "text/html"))
+    return res
@@ -0,0 +1,260 @@
+"""Import historical result workbooks into one indexed store of known URLs.
+
+The Reults/ folders hold many overlapping runs with different headers
+(Company Name/Email/Company Link, CompanyLink, Batch Link). Each workbook is
+streamed by a read-only openpyxl reader in its own worker process; rows are
+keyed on the canonical URL and kept with their provenance (file and row).
+Per URL the best sighting wins (email > no email > dead link > only listed).
+Files already imported and unchanged are skipped on the next run.
+
+The companies that already have an email are then seeded into the crawl
+frontier, so the scrapers skip them until the seed expires (frontier.KNOWN_TTL).
+Rows without an email ("N/A" is often a failed fetch) are only seeded with
+--seed-no-email.
+
+Usage:
+    python known_urls.py import ["Reults/**/*.xlsx" ...] [--processes N] [--force] [--frontier FILE] [--seed-no-email]
+    python known_urls.py stats
+    python known_urls.py lookup URL [URL ...]
+"""
+import argparse
+import glob
+import os
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from urllib.parse import urlsplit
+
+from frontier import BASE_URL, FRONTIER_FILE, Frontier, canonicalize
+from result_store import has_email, read_tables, read_xlsx
+
+KNOWN_URLS_FILE = "known_urls.sqlite"
+DEFAULT_INPUTS = ["Reults/**/*.xlsx"]
+SKIP_STATUSES = ("email",)  # Company results seeded into the frontier as done
+
+COMPANY = "company"
+BATCH = "batch"
+# Sighting status -> rank; the highest ranked sighting of a URL is its record
+RANKS = {"email": 3, "no_email": 2, "dead": 1, "listed": 0}
+
+
+def status_of(email):
+    if email is None:
+        return "listed"  # Links-only workbook
+    if email == "Dead Link":
+        return "dead"
+    return "email" if has_email(email) else "no_email"
+
+
+def read_sightings(path, base_url=BASE_URL):
+    """Worker side: (path, [(url, kind, row, company_name, email, status)], invalid rows)."""
+    if path.lower().endswith((".xlsx", ".xlsm")):
+        tables = read_xlsx(path)
+    else:
+        tables = read_tables([path])
+    host = urlsplit(base_url).hostname
+    sightings = []
+    invalid = 0
+    row = 1  # Header
+    for table in tables:
+        data = table.to_pydict()
+        if "Company Link" in data:
+            kind, links = COMPANY, data["Company Link"]
+        elif "Batch Link" in data:
+            kind, links = BATCH, data["Batch Link"]
+        else:
+            raise ValueError(f"no link column in {list(data)}")
+        names = data.get("Company Name") or [None] * len(links)
+        emails = data.get("Email") or [None] * len(links)
+        for link, name, email in zip(links, names, emails):
+            row += 1
+            url = canonicalize(link, base_url) if link else ""
+            if not url or " " in url or urlsplit(url).hostname != host:
+                invalid += 1  # e.g. "https://www.construction.co.ukDead Link"
+                continue
+            sightings.append((url, kind, row, name, email, status_of(email)))
+    return path, sightings, invalid
+
+
+class KnownUrls:
+    """SQLite store: every sighting with its source, plus the best record per canonical URL."""
+
+    def __init__(self, path=KNOWN_URLS_FILE):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        with self.conn:
+            self.conn.executescript("""
+                CREATE TABLE IF NOT EXISTS sources (
+                    id INTEGER PRIMARY KEY,
+                    path TEXT UNIQUE NOT NULL,
+                    size INTEGER,
+                    mtime REAL,
+                    rows INTEGER,
+                    imported_at REAL
+                );
+                CREATE TABLE IF NOT EXISTS sightings (
+                    url TEXT NOT NULL,
+                    kind TEXT NOT NULL,
+                    source_id INTEGER NOT NULL,
+                    row INTEGER NOT NULL,
+                    company_name TEXT,
+                    email TEXT,
+                    status TEXT NOT NULL,
+                    rank INTEGER NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS sightings_url ON sightings (url);
+                CREATE INDEX IF NOT EXISTS sightings_source ON sightings (source_id);
+                CREATE TABLE IF NOT EXISTS urls (
+                    url TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    company_name TEXT,
+                    email TEXT,
+                    status TEXT NOT NULL,
+                    source_id INTEGER,
+                    row INTEGER,
+                    sightings INTEGER
+                );
+                CREATE INDEX IF NOT EXISTS urls_status ON urls (kind, status);
+            """)
+
+    def is_current(self, path):
+        """True if this file was imported before and has not changed since."""
+        stat = os.stat(path)
+        row = self.conn.execute("SELECT size, mtime FROM sources WHERE path = ?", (os.path.abspath(path),)).fetchone()
+        return row is not None and row[0] == stat.st_size and row[1] == stat.st_mtime
+
+    def replace_source(self, path, sightings):
+        """Swap a file's sightings for a fresh read of it."""
+        stat = os.stat(path)
+        path = os.path.abspath(path)
+        with self.conn:
+            row = self.conn.execute("SELECT id FROM sources WHERE path = ?", (path,)).fetchone()
+            if row is not None:
+                self.conn.execute("DELETE FROM sightings WHERE source_id = ?", row)
+            self.conn.execute(
+                "INSERT INTO sources (path, size, mtime, rows, imported_at) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (path) DO UPDATE SET size = excluded.size, mtime = excluded.mtime, "
+                "rows = excluded.rows, imported_at = excluded.imported_at",
+                (path, stat.st_size, stat.st_mtime, len(sightings), time.time()),
+            )
+            source_id = self.conn.execute("SELECT id FROM sources WHERE path = ?", (path,)).fetchone()[0]
+            self.conn.executemany(
+                "INSERT INTO sightings (url, kind, source_id, row, company_name, email, status, rank) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [(url, kind, source_id, row, name, email, status, RANKS[status])
+                 for url, kind, row, name, email, status in sightings],
+            )
+
+    def rebuild(self):
+        """Recompute the best record per URL: highest rank, then the earliest imported sighting."""
+        with self.conn:
+            self.conn.execute("DELETE FROM urls")
+            self.conn.execute("""
+                INSERT INTO urls (url, kind, company_name, email, status, source_id, row, sightings)
+                SELECT url, kind, company_name, email, status, source_id, row, total FROM (
+                    SELECT *,
+                        ROW_NUMBER() OVER (PARTITION BY url ORDER BY rank DESC, source_id, row) AS pick,
+                        COUNT(*) OVER (PARTITION BY url) AS total
+                    FROM sightings
+                ) WHERE pick = 1""")
+
+    def lookup(self, url):
+        """Best record for a link plus every file it was seen in, or None."""
+        url = canonicalize(url)
+        row = self.conn.execute(
+            "SELECT url, kind, company_name, email, status, sightings FROM urls WHERE url = ?", (url,)
+        ).fetchone()
+        if row is None:
+            return None
+        sources = self.conn.execute(
+            "SELECT s.path, g.row, g.status FROM sightings g JOIN sources s ON s.id = g.source_id "
+            "WHERE g.url = ? ORDER BY g.source_id, g.row", (url,)
+        ).fetchall()
+        keys = ("url", "kind", "company_name", "email", "status", "sightings")
+        return {**dict(zip(keys, row)), "sources": sources}
+
+    def urls(self, kind=COMPANY, statuses=SKIP_STATUSES):
+        marks = ", ".join("?" * len(statuses))
+        query = f"SELECT url FROM urls WHERE kind = ? AND status IN ({marks})"
+        return [url for (url,) in self.conn.execute(query, (kind, *statuses))]
+
+    def stats(self):
+        rows = self.conn.execute("SELECT kind, status, COUNT(*) FROM urls GROUP BY kind, status").fetchall()
+        counts = {f"{kind}:{status}": count for kind, status, count in rows}
+        counts["sightings"] = self.conn.execute("SELECT COUNT(*) FROM sightings").fetchone()[0]
+        counts["sources"] = self.conn.execute("SELECT COUNT(*) FROM sources").fetchone()[0]
+        return counts
+
+    def close(self):
+        self.conn.close()
+
+
+def import_files(store, paths, processes, force=False, base_url=BASE_URL):
+    """Read changed files in parallel and store them as each finishes; returns (imported, failed)."""
+    todo = [path for path in paths if force or not store.is_current(path)]
+    skipped = len(paths) - len(todo)
+    if skipped:
+        print(f"⏭️ {skipped} files unchanged since the last import.")
+    imported = []
+    failed = []
+    if not todo:
+        return imported, failed
+    with ProcessPoolExecutor(max_workers=max(1, min(processes, len(todo)))) as executor:
+        futures = {executor.submit(read_sightings, path, base_url): path for path in todo}
+        for future in as_completed(futures):
+            path = futures[future]
+            try:
+                _, sightings, invalid = future.result()
+            except Exception as e:
+                print(f"⚠️ Skipped {path}: {e}")  # Corrupt or unreadable workbook
+                failed.append(path)
+                continue
+            store.replace_source(path, sightings)
+            imported.append(path)
+            print(f"  {path}: {len(sightings)} rows" + (f", {invalid} without a valid link" if invalid else ""))
+    if imported:
+        store.rebuild()
+    return imported, failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--store", default=KNOWN_URLS_FILE)
+    sub = parser.add_subparsers(dest="command", required=True)
+    run = sub.add_parser("import", help="import workbooks (or result CSV/Parquet files)")
+    run.add_argument("inputs", nargs="*", default=DEFAULT_INPUTS, help="files or globs")
+    run.add_argument("--processes", type=int, default=os.cpu_count())
+    run.add_argument("--force", action="store_true", help="re-read files even if unchanged")
+    run.add_argument("--base-url", default=BASE_URL)
+    run.add_argument("--frontier", default=FRONTIER_FILE, help="frontier to seed with known companies ('' to skip)")
+    run.add_argument("--seed-no-email", action="store_true", help="also seed companies whose result had no email")
+    sub.add_parser("stats", help="URL counts per kind and status")
+    find = sub.add_parser("lookup", help="best record and provenance of URLs")
+    find.add_argument("urls", nargs="+")
+    args = parser.parse_args()
+
+    store = KnownUrls(args.store)
+    if args.command == "stats":
+        print(f"📊 {store.stats()}")
+    elif args.command == "lookup":
+        for url in args.urls:
+            print(store.lookup(url) or f"{url}: unknown")
+    else:
+        paths = sorted({path for pattern in args.inputs for path in glob.glob(pattern, recursive=True) or [pattern]})
+        start_time = time.time()
+        imported, failed = import_files(store, paths, args.processes, args.force, args.base_url)
+        print(f"\n✅ Imported {len(imported)} files in {time.time() - start_time:.1f} seconds"
+              + (f" ({len(failed)} unreadable)." if failed else "."))
+        print(f"📊 {store.stats()}")
+        if args.frontier:
+            frontier = Frontier(args.frontier, args.base_url)
+            added = frontier.add_known(store.urls(statuses=SKIP_STATUSES + ("no_email",) if args.seed_no_email
+                                                  else SKIP_STATUSES))
+            frontier.close()
+            print(f"⏭️ {added} known companies added to {args.frontier}; the scrapers will skip them.")
+    store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,23 +1,19 @@
-import requests
+import http_client
+import metrics
 from bs4 import BeautifulSoup
-import csv
 import time
-import random
-import os
-from concurrent.futures import ThreadPoolExecutor
-from tqdm import tqdm  # <--- Add this import at the top
-import re
-
-def decode_emrp(text):
-    decoded = ''
-    for char in text:
-        if char == '/':
-            decoded += '.'
-        elif char == 'A':
-            decoded += '@'
-        else:
-            decoded += chr(ord(char) - 1)
-    return decoded
+from functools import partial
+
+from deobfuscate import scheme_counts
+from extractor import stream_company_info
+from frontier import BatchYields, Frontier, canonicalize, company_priority
+from crawl_state import DEAD, DONE, FAILED, GONE_STATUSES, PENDING, CrawlState
+from http_cache import CacheMiss
+from parse_pool import ParsePool
+from pipeline import BatchPipeline, PriorityPipeline
+from progress import ProgressTracker
+from result_store import RESULTS_DIR, ResultStore
+import pagination
 
 BASE_URL = "https://www.construction.co.uk"
 
@@ -25,169 +21,186 @@ HEADERS = {
     "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/90.0.4430.93 Safari/537.36"
 }
 
-BATCH_CHECKPOINT_FILE = "batch_checkpoint.csv"
+BATCH_CHECKPOINT_FILE = "batch_checkpoint.csv"  # Old checkpoint, imported into STATE_FILE once
+STATE_FILE = "crawl_state.sqlite"
+FRONTIER_FILE = "frontier.sqlite"  # Canonical company links already queued by some batch
 RESULTS_FILE = "construction_companies.csv"
-THREADS = 20
-SAVE_EVERY_N_BATCHES = 10
-
-# Utilities
-
-def save_checkpoint(batch_links_done):
-    with open(BATCH_CHECKPOINT_FILE, "w", newline="", encoding="utf-8") as f:
-        writer = csv.writer(f)
-        for link in batch_links_done:
-            writer.writerow([link])
-
-def load_checkpoint():
-    if not os.path.exists(BATCH_CHECKPOINT_FILE):
-        return set()
-    with open(BATCH_CHECKPOINT_FILE, "r", encoding="utf-8") as f:
-        return set(line.strip() for line in f)
-
-def append_results(data):
-    file_exists = os.path.isfile(RESULTS_FILE)
-    with open(RESULTS_FILE, "a", newline="", encoding="utf-8") as f:
-        writer = csv.writer(f)
-        if not file_exists:
-            writer.writerow(["Company Name", "Email", "Source URL"])  # add source link column
-        writer.writerows(data)
-
+RESULTS_PARQUET_DIR = RESULTS_DIR  # One Parquet sub-directory per run (its companies only), for result_store.py
+THREADS = 20  # Fetch threads
+PARSE_PROCESSES = 0  # Extraction processes, e.g. (os.cpu_count() or 1) - 1; 0 streams and parses in the fetch threads, stopping once name and email are found
+PARSE_CHUNK = 16  # Pages pickled to a parse worker at once
+HTTP_CACHE_FILE = "http_cache.sqlite"
+OFFLINE = False  # True: re-extract from cached pages only, no network
+REFRESH = False  # True: re-paginate every batch and refetch only companies whose listing block is new or changed
+PRIORITISE = False  # True: scrape best first (email-button companies in high-yield batches) from a priority queue fed as batches are paginated
+TIME_BUDGET = None  # Seconds to crawl before stopping cleanly (the rest stays pending), None for no limit
+ARCHIVE_PAGES = False  # True: keep raw profile pages in page_archive/ for reextract.py
+METRICS_PORT = 9108  # Prometheus /metrics and JSON /summary while running, None to disable
+
+parse_pool = None  # ParsePool while main() runs with PARSE_PROCESSES > 0
 
 # Scraping functions
 
 def get_batch_links():
     url = f"{BASE_URL}/construction_directory.aspx"
-    res = requests.get(url, headers=HEADERS)
+    res = http_client.get(url, headers=HEADERS)
     soup = BeautifulSoup(res.text, "html.parser")
     batch_divs = soup.find_all("div", class_="col-md-4 d-flex no-wrap align-items-center")
     batch_links = [a.find("a")['href'] for a in batch_divs if a.find("a")]
     return batch_links
 
-def get_company_links(batch_link):
-    company_links = []
-    page_num = 1
-
-    while True:
-        page_url = batch_link
-        if page_num > 1:
-            page_url += f"?pagenum={page_num}"
+def fetch_listing(page_url):
+    res = http_client.get(page_url, headers=HEADERS)
+    res.raise_for_status()
+    return res.text
 
-        res = requests.get(page_url, headers=HEADERS)
-        soup = BeautifulSoup(res.text, "html.parser")
-        company_blocks = soup.find_all("div", class_="col companyListButtons")
-
-        if not company_blocks:
-            break  # No more companies on this page
-        
-        for block in company_blocks:
-            listing_link = block.find("div", class_="companyListListingLink")
-            if listing_link and listing_link.find("a"):
-                href = listing_link.find("a")['href']
-                company_links.append(href)
-        
-        print(f"  Found {len(company_blocks)} companies on page {page_num} of batch.")
-        page_num += 1
-        time.sleep(random.uniform(1, 2))  # polite
-
-    return company_links
+def batch_pager(batch_link):
+    # Page count comes from the pager / galloping probes, then pages load concurrently
+    # Its complete flag tells a refresh whether unlisted companies may be marked vanished
+    return pagination.BatchPager(batch_link, fetch_listing, entries=True)
 
 
 def get_company_info(company_link):
+    """Return (company_name, email, company_link, status, scheme) for CrawlState.record_result.
+
+    A gone page (404/410) or one with neither name nor email is DEAD; any other
+    failure is FAILED, so the company is tried again instead of written off.
+    """
     try:
-        res = requests.get(company_link, headers=HEADERS)
-        soup = BeautifulSoup(res.text, "html.parser")
-
-        # Company Name
-        name_tag = soup.find("h2", class_="listingTitle text-md-start text-center")
-        company_name = name_tag.find("span").text.strip() if name_tag else "N/A"
-
-        # Email (new smart decoding)
-        email = "N/A"
-        email_span = soup.find("span", id="cphMain_lblCLEmail")
-
-        if email_span:
-            # Try direct <a> mailto first
-            a_tag = email_span.find("a", href=True)
-            if a_tag and a_tag['href'].startswith("mailto:"):
-                email = a_tag['href'].replace("mailto:", "").split("?")[0].strip()
+        # Threads only download when parsing runs in the process pool
+        res = http_client.get(company_link, headers=HEADERS, stream=parse_pool is None, archive=True)
+        try:
+            if res.status_code in GONE_STATUSES:
+                return ("N/A", "N/A", company_link, DEAD, None)
+            res.raise_for_status()
+            if parse_pool is None:
+                company_name, email, scheme = stream_company_info(res)
             else:
-                # If no direct <a>, then decode from <script>
-                script_tag = email_span.find("script")
-                if script_tag:
-                    # Extract inside emrp('xxxxx',...)
-                    match = re.search(r"emrp\('([^']+)'", script_tag.string)
-                    if match:
-                        obfuscated_text = match.group(1)
-                        email = decode_emrp(obfuscated_text)
-
-        return (company_name, email, company_link)
-    
+                company_name, email, scheme = parse_pool.extract(res.content)
+        finally:
+            res.close()
+
+    except CacheMiss:
+        return ("N/A", "N/A", company_link, PENDING, None)  # Offline and not cached: left for an online run
     except Exception as e:
         print(f"Failed to scrape {company_link}: {e}")
-        return ("N/A", "N/A", company_link)
+        return ("N/A", "N/A", company_link, FAILED, None)
+
+    status = DEAD if company_name == "N/A" and email == "N/A" else DONE  # Empty template
+    return (company_name, email, company_link, status, scheme)
+
+# Crawl state
+
+def batch_company_links(state, frontier, yields, batch_url):
+    """Company links of a batch still to scrape; each batch is paginated only once and
+    companies already queued by another batch are left to that batch. During a refresh
+    only new companies and ones whose listing block changed are still to scrape."""
+    if not state.is_paginated(batch_url):
+        pager = batch_pager(batch_url)
+        listed = {canonicalize(entry.href, BASE_URL): entry for entry in pager.get_company_links()}
+        fingerprints = {url: entry.fingerprint for url, entry in listed.items()}
+        unknown = state.refresh_companies(batch_url, fingerprints, pager.complete) if state.refreshing else list(listed)
+        links = frontier.add_many(unknown, source=batch_url)
+        priorities = [company_priority(listed[link].email_button, yields.get(batch_url)) if PRIORITISE else 0.0
+                      for link in links]
+        state.add_companies(batch_url, links, [fingerprints[link] for link in links], priorities)
+    pending = state.pending_companies(batch_url, with_priority=True)
+    state.mark_in_flight([url for url, _ in pending])
+    # PriorityPipeline orders by priority across batches; BatchPipeline takes them as listed here
+    return pending if PRIORITISE else [url for url, _ in pending]
+
+def scrape_company(state, company_link):
+    result = get_company_info(company_link)
+    state.record_result(*result)
+    return result
+
 
 # Main Workflow
 
 def main():
-    start_time = time.time()
+    global parse_pool
+    http_client.configure(pool_size=THREADS)
+    # A refresh revalidates every cached page (cheap 304s) instead of trusting it for CACHE_TTL
+    http_client.enable_cache(HTTP_CACHE_FILE, ttl=0 if REFRESH else http_client.CACHE_TTL, offline=OFFLINE)
+    if ARCHIVE_PAGES:
+        http_client.enable_archive()
+    if METRICS_PORT is not None:
+        metrics.serve(METRICS_PORT)
+    if PARSE_PROCESSES:
+        parse_pool = ParsePool(PARSE_PROCESSES, PARSE_CHUNK)
+
+    run_started = time.time()  # The Parquet run gets the companies finished from here on
+    state = CrawlState(STATE_FILE)
+    frontier = Frontier(FRONTIER_FILE, BASE_URL)
+    if REFRESH:
+        started = state.start_refresh()
+        print(f"{'Starting' if started else 'Resuming'} refresh #{state.generation}.")
+    imported = state.import_checkpoint(BATCH_CHECKPOINT_FILE)
+    if imported:
+        print(f"Imported {imported} completed batches from {BATCH_CHECKPOINT_FILE}.")
 
     all_batch_links = get_batch_links()
     print(f"Found {len(all_batch_links)} batch links.")
 
-    completed_batches = load_checkpoint()
-    batches_to_do = [link for link in all_batch_links if (BASE_URL + link) not in completed_batches]
+    state.add_batches([canonicalize(link, BASE_URL) for link in all_batch_links])
+    batches_to_do = state.pending_batches()
+    yields = BatchYields(state.batch_stats())
+    if PRIORITISE:
+        batches_to_do = yields.order(batches_to_do)
 
     print(f"{len(batches_to_do)} batches left to process.")
-
-    current_results = []
-    batches_done_counter = 0
-
-    for batch_url in tqdm(batches_to_do, desc="Processing Batches"):
-        full_batch_url = batch_url if batch_url.startswith("http") else BASE_URL + batch_url
-        print(f"\nScraping batch: {full_batch_url}")
-
-        company_links = get_company_links(full_batch_url)
-        print(f"  Found {len(company_links)} companies in this batch.")
-
-        full_company_links = [link if link.startswith("http") else BASE_URL + link for link in company_links]
-
-        # Multithread the company scraping
-        with ThreadPoolExecutor(max_workers=THREADS) as executor:
-            batch_results = list(tqdm(executor.map(get_company_info, full_company_links), total=len(full_company_links), desc="  Scraping Companies"))
-
-        current_results.extend(batch_results)
-
-        completed_batches.add(full_batch_url)
-        batches_done_counter += 1
-
-        if batches_done_counter % SAVE_EVERY_N_BATCHES == 0:
-            print(f"Saving after {batches_done_counter} batches...")
-            save_checkpoint(completed_batches)
-            append_results(current_results)
-            current_results = []
+    if PRIORITISE and yields.known:
+        print(f"📈 Batches ordered by past email yield ({yields.known} with history, {yields.prior:.1%} overall).")
+
+    # Company total is learned from the batches paginated so far
+    progress = ProgressTracker()
+    progress.stage("batches", total=len(batches_to_do))
+    progress.stage("companies", parent="batches")
+
+    # Pagination of upcoming batches overlaps company scraping on one long-lived pool,
+    # or with PRIORITISE companies are scraped best first from a queue the paginated batches feed
+    pipeline = (PriorityPipeline if PRIORITISE else BatchPipeline)(
+        partial(batch_company_links, state, frontier, yields), partial(scrape_company, state), BASE_URL,
+        threads=THREADS, progress=progress, time_budget=TIME_BUDGET,
+    )
+    progress.bar("companies", "Scraping Companies")
+
+    for full_batch_url, batch_results in pipeline.run(batches_to_do):
+        progress.update("batches")
+        if not state.mark_batch_done(full_batch_url):  # Commits this batch's results too
+            print(f"🔁 Some companies of {full_batch_url} failed; the batch stays open for the next run.")
 
         # After processing one batch
-        elapsed_time = time.time() - start_time
-        companies_scraped = len(current_results)
-        if companies_scraped > 0:
-            avg_time_per_company = elapsed_time / companies_scraped
-            estimated_total_time = avg_time_per_company * 157000
-            remaining_time = estimated_total_time - elapsed_time
-
-            print(f"⏳ Scraped {companies_scraped} companies so far.")
-            print(f"⚡ Average time per company: {avg_time_per_company:.3f} seconds")
-            print(f"🕐 Estimated total time: {estimated_total_time/3600:.2f} hours")
-            print(f"⌛ Estimated remaining time: {remaining_time/3600:.2f} hours")
-
-        time.sleep(random.uniform(2, 5))
-
+        progress.log()
+        print(f"🧵 Worker utilisation: {pipeline.utilisation():.1%}")
+        print(f"🚦 Request rate: {http_client.rate_stats()}")
+
+    progress.close()
+    if parse_pool is not None:
+        parse_pool.close()
+    pipeline.print_stats()
+    print(f"🔓 Emails decoded per scheme: {scheme_counts()}")
+    print(f"⏭️ Frontier: {frontier.stats()}")
+    frontier.close()
+    metrics.write_summary()
+
+    if state.refreshing and not pipeline.timed_out:  # A cut-short refresh is resumed by the next run
+        vanished = state.finish_refresh()
+        print(f"🔄 Refresh: {state.refresh_counts}, {vanished} vanished.")
 
     # Final save
-    if current_results:
-        append_results(current_results)
-    save_checkpoint(completed_batches)
-
-    print("\nAll batches completed! Data saved to construction_companies.csv.")
+    exported = state.export_csv(RESULTS_FILE)
+    with ResultStore.new_run(RESULTS_PARQUET_DIR) as store:
+        store.extend({"Company Name": name, "Email": email, "Company Link": url, "Scheme": scheme}
+                     for name, email, url, scheme in state.results(since=run_started))
+    print(f"{store.written} companies finished this run also saved to {store.directory} (Parquet).")
+    print(f"Company status counts: {state.counts()}")
+    state.close()
+
+    if pipeline.timed_out:
+        print(f"\n⏱️ Stopped after {TIME_BUDGET} seconds; rerun to continue. {exported} companies saved to {RESULTS_FILE}.")
+    else:
+        print(f"\nAll batches completed! {exported} companies saved to {RESULTS_FILE}.")
 
 if __name__ == "__main__":
     main()
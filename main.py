@@ -1,8 +1,6 @@
-import requests
+import http_client
 from bs4 import BeautifulSoup
 import csv
-import time
-import random
 
 
 BASE_URL = "https://www.construction.co.uk"
@@ -14,7 +12,7 @@ headers = {
 # Step 1: Get all Batch Links
 def get_batch_links():
     url = f"{BASE_URL}/construction_directory.aspx"
-    res = requests.get(url, headers=headers)
+    res = http_client.get(url, headers=headers)
     soup = BeautifulSoup(res.text, "html.parser")
     batch_divs = soup.find_all("div", class_="col-md-4 d-flex no-wrap align-items-center")
     batch_links = [a.find("a")['href'] for a in batch_divs if a.find("a")]
@@ -24,7 +22,7 @@ def get_batch_links():
 
 
 def get_company_links(batch_link):
-    res = requests.get(batch_link, headers=headers)
+    res = http_client.get(batch_link, headers=headers)
     soup = BeautifulSoup(res.text, "html.parser")
     company_blocks = soup.find_all("div", class_="col companyListButtons")
     company_links = []
@@ -37,7 +35,7 @@ def get_company_links(batch_link):
 
 # Step 3: Extract Company Name + Email from Company Page
 def get_company_info(company_link):
-    res = requests.get(company_link, headers=headers)
+    res = http_client.get(company_link, headers=headers)
     soup = BeautifulSoup(res.text, "html.parser")
     
     # Company Name
@@ -75,8 +73,6 @@ def main():
                 results.append((company_name, email))
             except Exception as e:
                 print(f"Failed to scrape {full_company_url}: {e}")
-            
-            time.sleep(random.uniform(1, 2))  # polite scraping
 
     # Save to CSV
     with open("construction_companies.csv", "w", newline="", encoding="utf-8") as f:
@@ -0,0 +1,219 @@
+"""Process-wide scrape metrics: counters, gauges and latency histograms.
+
+Exposed as Prometheus text on a local port with serve(), and written as a
+JSON summary at the end of a run with write_summary().
+"""
+import errno
+import json
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+METRICS_PORT = 9108
+SUMMARY_FILE = "metrics_summary.json"
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_lock = threading.Lock()
+_metrics = {}  # name -> Metric, in declaration order
+_started = time.time()
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in pairs) + "}"
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name, help):
+        self.name = name
+        self.help = help
+        self.values = {}  # label key -> value
+
+    def samples(self):
+        for key, value in self.values.items():
+            yield self.name, key, value
+
+    def summary(self):
+        return {_format_labels(key) or "all": value for key, value in self.values.items()}
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(labels)
+        self.values[key] = self.values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        self.values[_label_key(labels)] = value
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help, buckets=LATENCY_BUCKETS):
+        super().__init__(name, help)
+        self.buckets = buckets
+
+    def observe(self, value, **labels):
+        key = _label_key(labels)
+        state = self.values.get(key)
+        if state is None:
+            state = self.values[key] = {"buckets": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                state["buckets"][i] += 1
+                break
+        state["sum"] += value
+        state["count"] += 1
+
+    def samples(self):
+        for key, state in self.values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets, state["buckets"]):
+                cumulative += count
+                yield self.name + "_bucket", key + (("le", bound),), cumulative
+            yield self.name + "_bucket", key + (("le", "+Inf"),), state["count"]
+            yield self.name + "_sum", key, round(state["sum"], 6)
+            yield self.name + "_count", key, state["count"]
+
+    def quantile(self, state, q):
+        """Upper bucket bound holding the q-th observation (None past the last bucket)."""
+        target = q * state["count"]
+        cumulative = 0
+        for bound, count in zip(self.buckets, state["buckets"]):
+            cumulative += count
+            if cumulative >= target:
+                return bound
+        return None
+
+    def summary(self):
+        return {
+            _format_labels(key) or "all": {
+                "count": state["count"],
+                "sum": round(state["sum"], 3),
+                "mean": round(state["sum"] / state["count"], 6) if state["count"] else 0.0,
+                "p50": self.quantile(state, 0.5),
+                "p95": self.quantile(state, 0.95),
+            }
+            for key, state in self.values.items()
+        }
+
+
+def _declare(metric):
+    _metrics[metric.name] = metric
+    return metric
+
+
+# Network
+_declare(Histogram("http_dns_seconds", "DNS resolution time for new connections"))
+_declare(Histogram("http_connect_seconds", "TCP connect plus TLS handshake time for new connections"))
+_declare(Histogram("http_ttfb_seconds", "Time from sending a request to its response headers"))
+_declare(Histogram("http_download_seconds", "Time spent reading response bodies"))
+_declare(Counter("http_responses", "Responses received from the network, by status code"))
+_declare(Counter("http_cache_hits", "Responses served from the on-disk cache"))
+_declare(Counter("retries", "Retried requests, by reason"))
+# Processing
+_declare(Histogram("parse_seconds", "HTML parsing and extraction time per page, by stage"))
+_declare(Histogram("decode_seconds", "Email deobfuscation time per page, by scheme"))
+_declare(Counter("pages", "Pages processed, by stage"))
+_declare(Counter("link_checks", "Links verified by Deadlink.py, by result"))
+# Scheduling
+_declare(Gauge("queue_depth", "Items waiting or in flight, by stage"))
+
+
+def inc(name, amount=1, **labels):
+    with _lock:
+        _metrics[name].inc(amount, **labels)
+
+
+def observe(name, value, **labels):
+    with _lock:
+        _metrics[name].observe(value, **labels)
+
+
+def set_gauge(name, value, **labels):
+    with _lock:
+        _metrics[name].set(value, **labels)
+
+
+@contextmanager
+def timer(name, **labels):
+    """Observe the duration of the with-block in histogram `name`."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - start, **labels)
+
+
+def render():
+    """All metrics in the Prometheus text exposition format."""
+    lines = []
+    with _lock:
+        for metric in _metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, key, value in metric.samples():
+                if metric.kind == "counter":
+                    name += "_total"
+                lines.append(f"{name}{_format_labels(key)} {value}")
+    return "\n".join(lines) + "\n"
+
+
+def summary():
+    """JSON-friendly snapshot of every metric that has been touched."""
+    with _lock:
+        metrics = {name: metric.summary() for name, metric in _metrics.items() if metric.values}
+    return {"elapsed_seconds": round(time.time() - _started, 1), "metrics": metrics}
+
+
+def write_summary(path=SUMMARY_FILE):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(summary(), f, indent=2)
+    print(f"📊 Metrics summary written to {path}")
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] == "/summary":
+            body, content_type = json.dumps(summary()).encode(), "application/json"
+        else:
+            body, content_type = render().encode(), "text/plain; version=0.0.4; charset=utf-8"
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(port=METRICS_PORT, host="127.0.0.1"):
+    """Serve /metrics (Prometheus text) and /summary (JSON) from a daemon thread.
+
+    If port is taken (say by another scraper running alongside) a free one is used.
+    """
+    try:
+        server = ThreadingHTTPServer((host, port), _Handler)
+    except OSError as e:
+        if e.errno != errno.EADDRINUSE:
+            raise
+        server = ThreadingHTTPServer((host, 0), _Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"📊 Metrics on http://{host}:{server.server_address[1]}/metrics")
+    return server
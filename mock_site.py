@@ -0,0 +1,217 @@
+"""Local stand-in for www.construction.co.uk, used by bench.py.
+
+Usage: python mock_site.py [--port N] [--batches N] [--pages-per-batch N] [--latency S]
+                           [--slow-rate F] [--slow-latency S] [--error-rate F] [--empty-rate F] [--gone-rate F]
+                           [--no-email-rate F]
+"""
+import argparse
+import random
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from emrp import encode_emrp
+
+BATCHES = 20
+PAGES_PER_BATCH = 3
+COMPANIES_PER_PAGE = 20
+PAGER_WINDOW = 4
+EMPTY_TEMPLATE = "<html><body><div class=\"container\"></div></body></html>"
+PAGE_PADDING = "<p>Lorem ipsum dolor sit amet, consectetur adipiscing elit.</p>" * 400
+
+
+def directory_page(batches):
+    links = "".join(
+        f'<div class="col-md-4 d-flex no-wrap align-items-center"><a href="/batch/{b}">Batch {b}</a></div>'
+        for b in range(batches)
+    )
+    return f"<html><body>{links}</body></html>"
+
+
+def listing_page(batch_id, page_num, pages_per_batch, has_email=lambda company_id: True):
+    if page_num > pages_per_batch:
+        return "<html><body><p>No companies found.</p></body></html>"
+    first = batch_id * 1000 + (page_num - 1) * COMPANIES_PER_PAGE
+    blocks = "".join(
+        '<div class="col companyListButtons">'
+        + (f'<div class="companyListEmail"><a href="/company/{company_id}#email">Email</a></div>'
+           if has_email(company_id) else "")
+        + f'<div class="companyListListingLink"><a href="/company/{company_id}">View</a></div></div>'
+        for company_id in range(first, first + COMPANIES_PER_PAGE)
+    )
+    # Windowed pager like the real site: only nearby pages are linked
+    pager = "".join(
+        f'<a href="/batch/{batch_id}?pagenum={n}">{n}</a>'
+        for n in range(max(1, page_num - PAGER_WINDOW), min(pages_per_batch, page_num + PAGER_WINDOW) + 1)
+        if n != page_num
+    )
+    return f"<html><body>{blocks}<div class=\"pager\">{pager}</div></body></html>"
+
+
+def company_page(company_id, with_email=True):
+    email = f"info{company_id}@company{company_id}.co.uk"
+    if not with_email:
+        email_html = ""
+    elif company_id % 2:
+        email_html = f'<a href="mailto:{email}">Email</a>'
+    else:
+        email_html = f"<script>emrp('{encode_emrp(email)}', 'Email')</script>"
+    return (
+        "<html><head><meta charset=\"utf-8\"><title>Company</title></head><body>"
+        f'<h2 class="listingTitle text-md-start text-center"><span>Company {company_id} Ltd</span></h2>'
+        f'<span id="cphMain_lblCLEmail">{email_html}</span>'
+        f"{PAGE_PADDING}</body></html>"
+    )
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Allow keep-alive
+
+    def do_HEAD(self):
+        self.do_GET(head=True)
+
+    def do_GET(self, head=False):
+        self.head = head
+        self.server.count_request()
+        time.sleep(self.server.page_delay())
+        path, _, query = self.path.partition("?")
+        if path == "/construction_directory.aspx":
+            self.send_page(200, directory_page(self.server.batches))
+        elif path.startswith("/batch/"):
+            page_num = int(query.split("pagenum=")[1]) if "pagenum=" in query else 1
+            body = listing_page(int(path.rsplit("/", 1)[1]), page_num, self.server.pages_per_batch,
+                                self.server.has_email)
+            self.send_page(200, body)
+        elif path.startswith("/company/"):
+            roll = random.random()
+            if self.server.is_gone(int(path.rsplit("/", 1)[1])):
+                self.send_page(404, "<html><body>Page not found</body></html>")
+            elif roll < self.server.error_rate:
+                self.send_page(503, "<html><body>Service unavailable</body></html>")
+            elif roll < self.server.error_rate + self.server.empty_rate:
+                self.send_page(200, EMPTY_TEMPLATE)  # Page rendered without the listing
+            else:
+                company_id = int(path.rsplit("/", 1)[1])
+                self.send_page(200, company_page(company_id, self.server.has_email(company_id)))
+        else:
+            self.send_page(404, "<html><body>Not found</body></html>")
+
+    def send_page(self, status, body):
+        data = body.encode("utf-8")
+        etag = '"%x"' % zlib.crc32(data)
+        if status == 200 and self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self.send_response(status)
+        self.send_header("ETag", etag)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        if self.head:
+            return
+        try:
+            self.wfile.write(data)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # Client stopped reading early (streaming extraction)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class MockSite(ThreadingHTTPServer):
+    daemon_threads = True
+
+    """Mock directory server.
+
+    latency is added to every response; a slow_rate fraction of responses
+    take slow_latency extra. Company pages fail with 503 at error_rate and
+    come back as an empty template at empty_rate; a fixed gone_rate fraction
+    of companies always answers 404. A no_email_rate fraction of companies
+    (from none to twice that, depending on the batch) has no email, neither
+    on its page nor as a button in its listing block.
+    """
+
+    def __init__(self, port=0, batches=BATCHES, pages_per_batch=PAGES_PER_BATCH, latency=0.0,
+                 slow_rate=0.0, slow_latency=2.0, error_rate=0.0, empty_rate=0.0, gone_rate=0.0,
+                 no_email_rate=0.0):
+        super().__init__(("127.0.0.1", port), MockHandler)
+        self.batches = batches
+        self.pages_per_batch = pages_per_batch
+        self.latency = latency
+        self.slow_rate = slow_rate
+        self.slow_latency = slow_latency
+        self.error_rate = error_rate
+        self.empty_rate = empty_rate
+        self.gone_rate = gone_rate
+        self.no_email_rate = no_email_rate
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.requests = 0
+
+    def get_request(self):
+        conn = super().get_request()
+        with self.lock:
+            self.connections += 1
+        return conn
+
+    def count_request(self):
+        with self.lock:
+            self.requests += 1
+
+    def page_delay(self):
+        delay = self.latency
+        if self.slow_rate and random.random() < self.slow_rate:
+            delay += self.slow_latency
+        return delay
+
+    def is_gone(self, company_id):
+        return zlib.crc32(str(company_id).encode()) % 1000 < self.gone_rate * 1000
+
+    def has_email(self, company_id):
+        batch_rate = self.no_email_rate * 2 * (zlib.crc32(f"batch{company_id // 1000}".encode()) % 100) / 100
+        return zlib.crc32(f"email{company_id}".encode()) % 1000 >= batch_rate * 1000
+
+    def reset_counters(self):
+        with self.lock:
+            self.connections = 0
+            self.requests = 0
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server_port}"
+
+
+def start_mock_site(port=0, **kwargs):
+    """Start the mock site in a background thread and return the server."""
+    server = MockSite(port, **kwargs)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--batches", type=int, default=BATCHES)
+    parser.add_argument("--pages-per-batch", type=int, default=PAGES_PER_BATCH)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument("--slow-rate", type=float, default=0.0, help="fraction of responses that are slow")
+    parser.add_argument("--slow-latency", type=float, default=2.0, help="extra seconds for a slow response")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of company pages answered with 503")
+    parser.add_argument("--empty-rate", type=float, default=0.0, help="fraction of company pages served empty")
+    parser.add_argument("--gone-rate", type=float, default=0.0, help="fraction of companies that are always 404")
+    parser.add_argument("--no-email-rate", type=float, default=0.0, help="average fraction of companies without an email")
+    args = parser.parse_args()
+
+    server = MockSite(args.port, args.batches, args.pages_per_batch, args.latency, args.slow_rate,
+                      args.slow_latency, args.error_rate, args.empty_rate, args.gone_rate, args.no_email_rate)
+    print(f"Mock site running on {server.base_url} "
+          f"({args.batches} batches x {args.pages_per_batch} pages x {COMPANIES_PER_PAGE} companies)")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
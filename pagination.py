@@ -0,0 +1,126 @@
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from extractor import extract_company_links
+
+PAGENUM_PATTERN = re.compile(r"pagenum=(\d+)")
+PAGE_THREADS = 5
+PAGE_RETRIES = 2  # Extra attempts for a listing page before the batch fails
+PAGE_RETRY_DELAY = 2.0  # Seconds before the first extra attempt, doubled after each
+
+
+class PaginationError(Exception):
+    """A listing page still failed after PAGE_RETRIES, so the batch's links are incomplete."""
+
+
+def page_url(batch_link, page_num):
+    return batch_link if page_num == 1 else f"{batch_link}?pagenum={page_num}"
+
+
+def last_page_hint(html):
+    """Highest ?pagenum= linked from a listing page's pager, 1 if there is no pager."""
+    return max((int(n) for n in PAGENUM_PATTERN.findall(html)), default=1)
+
+
+class BatchPager:
+    """Collects the company links of one batch, fetching each listing page at most once.
+
+    fetch_html(url) returns the page text or raises. A page that keeps
+    failing is recorded in failed and raises PaginationError, so a network
+    error is never mistaken for the empty page past the end of the batch.
+    complete turns True once get_company_links() has every page of a
+    non-empty batch; only then may a refresh treat unlisted companies as gone.
+    With entries=True the links come as extractor.ListingEntry tuples.
+    """
+
+    def __init__(self, batch_link, fetch_html, threads=PAGE_THREADS, entries=False):
+        self.batch_link = batch_link
+        self.fetch_html = fetch_html
+        self.threads = threads
+        self.entries = entries
+        self.pages = {}  # page_num -> (block_count, links, last_page_hint)
+        self.failed = set()  # Page numbers that failed every attempt
+        self.complete = False
+        self.lock = threading.Lock()
+
+    def load(self, page_num):
+        with self.lock:
+            if page_num in self.pages:
+                return self.pages[page_num]
+
+        url = page_url(self.batch_link, page_num)
+        for attempt in range(PAGE_RETRIES + 1):
+            try:
+                html = self.fetch_html(url)
+                block_count, links = extract_company_links(html, self.entries)
+                page = (block_count, links, last_page_hint(html))
+                break
+            except Exception as e:
+                print(f"⚠️ Failed to load {url} (attempt {attempt + 1}): {e}")
+                error = e
+                if attempt < PAGE_RETRIES:
+                    time.sleep(PAGE_RETRY_DELAY * 2 ** attempt)
+        else:
+            with self.lock:
+                self.failed.add(page_num)
+            raise PaginationError(f"{url} failed {PAGE_RETRIES + 1} times: {error}") from error
+
+        with self.lock:
+            self.pages[page_num] = page
+        return page
+
+    def find_last_page(self):
+        """Follow pager hints, gallop past them in doubling steps, then bisect to the last non-empty page."""
+        block_count, _, hint = self.load(1)
+        if not block_count:
+            return 0
+
+        last_full, probe, trusted = 1, hint, True
+        if probe <= 1:
+            probe, trusted = 2, False
+
+        while True:
+            block_count, _, hint = self.load(probe)
+            if not block_count:
+                break
+            last_full = probe
+            if hint > probe:
+                probe, trusted = hint, True
+            elif trusted:
+                probe, trusted = probe + 1, False  # Pager says this is the end, confirm with one probe
+            else:
+                probe *= 2
+
+        empty = probe
+        while empty - last_full > 1:
+            mid = (last_full + empty) // 2
+            if self.load(mid)[0]:
+                last_full = mid
+            else:
+                empty = mid
+        return last_full
+
+    def get_company_links(self):
+        last_page = self.find_last_page()
+        missing = [n for n in range(2, last_page + 1) if n not in self.pages]
+        if missing:
+            with ThreadPoolExecutor(max_workers=self.threads) as executor:
+                list(executor.map(self.load, missing))
+
+        company_links = []
+        for page_num in range(1, last_page + 1):
+            company_links.extend(self.pages[page_num][1])
+        # An empty first page may be an error page served with 200, so it does not count
+        self.complete = last_page > 0 and not self.failed
+        print(f"  Found {len(company_links)} companies on {last_page} pages ({len(self.pages)} fetched) of {self.batch_link}")
+        return company_links
+
+
+def get_company_links(batch_link, fetch_html, threads=PAGE_THREADS, entries=False):
+    """Return every company href of a batch, in page order (as ListingEntry tuples with entries=True).
+
+    Raises PaginationError if a listing page could not be loaded.
+    """
+    return BatchPager(batch_link, fetch_html, threads, entries).get_company_links()
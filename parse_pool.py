@@ -0,0 +1,116 @@
+"""Process-pool parse stage.
+
+Fetch threads hand raw page bytes to ParsePool, which groups them into
+chunks (one pickle round trip per chunk) for worker processes running
+extract_company_info, so parsing is not limited to one core by the GIL.
+"""
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+
+import deobfuscate
+import metrics
+from extractor import extract_company_info
+
+PARSE_PROCESSES = os.cpu_count() or 1
+CHUNK_SIZE = 16  # Pages sent to a worker in one task
+FLUSH_INTERVAL = 0.02  # Seconds a partial chunk waits for more pages
+
+
+def extract_chunk(pages):
+    """Worker side: extract every page and report per-page time and decoded schemes."""
+    before = deobfuscate.scheme_counts()
+    results = []
+    timings = []
+    for body in pages:
+        start = time.perf_counter()
+        results.append(extract_company_info(body))
+        timings.append(time.perf_counter() - start)
+    after = deobfuscate.scheme_counts()
+    schemes = {name: count - before.get(name, 0) for name, count in after.items() if count != before.get(name, 0)}
+    return results, timings, schemes
+
+
+class ParsePool:
+    """Chunked hand-off from fetch threads to a ProcessPoolExecutor.
+
+    submit(body) returns a Future of (company_name, email, scheme); extract(body)
+    waits for it.
+    """
+
+    def __init__(self, processes=PARSE_PROCESSES, chunk_size=CHUNK_SIZE, flush_interval=FLUSH_INTERVAL):
+        # spawn: workers must not inherit the fetch threads' locks (and it is the Windows default anyway)
+        self.executor = ProcessPoolExecutor(max_workers=processes, mp_context=multiprocessing.get_context("spawn"))
+        self.processes = processes
+        self.chunk_size = chunk_size
+        self.flush_interval = flush_interval
+        self.pending = []  # [(body, Future)]
+        self.chunks_in_flight = 0
+        self.lock = threading.Lock()
+        self.closed = threading.Event()
+        self.flusher = threading.Thread(target=self.flush_periodically, daemon=True)
+        self.flusher.start()
+
+    def submit(self, body):
+        future = Future()
+        with self.lock:
+            self.pending.append((body, future))
+            chunk = self.take() if len(self.pending) >= self.chunk_size else None
+        if chunk:
+            self.dispatch(chunk)
+        return future
+
+    def extract(self, body):
+        return self.submit(body).result()
+
+    def take(self):
+        chunk, self.pending = self.pending, []
+        return chunk
+
+    def flush(self):
+        with self.lock:
+            chunk = self.take()
+        if chunk:
+            self.dispatch(chunk)
+
+    def flush_periodically(self):
+        while not self.closed.wait(self.flush_interval):
+            self.flush()
+
+    def dispatch(self, chunk):
+        futures = [future for _, future in chunk]
+        with self.lock:
+            self.chunks_in_flight += 1
+            metrics.set_gauge("queue_depth", self.chunks_in_flight, stage="parse")
+        task = self.executor.submit(extract_chunk, [body for body, _ in chunk])
+
+        def done(task):
+            with self.lock:
+                self.chunks_in_flight -= 1
+            try:
+                results, timings, schemes = task.result()
+            except Exception as e:
+                for future in futures:
+                    future.set_exception(e)
+                return
+            deobfuscate.add_counts(schemes)
+            for future, result, seconds in zip(futures, results, timings):
+                metrics.inc("pages", stage="profile")
+                metrics.observe("parse_seconds", seconds, stage="profile")
+                future.set_result(result)
+
+        task.add_done_callback(done)
+
+    def close(self):
+        self.closed.set()
+        self.flusher.join()
+        self.flush()
+        self.executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
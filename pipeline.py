@@ -0,0 +1,258 @@
+import itertools
+import queue
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import metrics
+
+THREADS = 20
+PREFETCH_BATCHES = 2  # Batches paginated ahead of the scraping workers
+MAX_BATCHES_IN_FLIGHT = 3  # Batches whose companies are queued on the pool at once
+
+_DONE = object()
+
+
+class BatchPipeline:
+    """Producer/consumer pipeline over batches.
+
+    A producer thread runs get_company_links for upcoming batches while one
+    long-lived pool scrapes companies, so pagination of batch N+1 overlaps
+    the company scraping (and its tail) of batch N. An optional
+    ProgressTracker with a "companies" stage learns each batch's size and
+    counts every scraped company. A batch that fails to paginate is skipped,
+    not yielded, so the caller never marks it done.
+
+    With a time_budget (seconds) no new batch is started once it runs out and
+    companies still queued are dropped; run() then returns after the scrapes
+    already running, without yielding the batches cut short. Before run()
+    returns, the producer is stopped and joined (after the batch it is
+    paginating), so nothing writes to the crawl state once the caller closes it.
+    """
+
+    def __init__(self, get_company_links, get_company_info, base_url, threads=THREADS, progress=None,
+                 time_budget=None):
+        self.get_company_links = get_company_links
+        self.get_company_info = get_company_info
+        self.base_url = base_url
+        self.threads = threads
+        self.batches = queue.Queue(maxsize=PREFETCH_BATCHES)
+        self.busy_seconds = 0.0
+        self.busy_lock = threading.Lock()
+        self.start_time = None
+        self.companies_done = 0
+        self.progress = progress
+        self.time_budget = time_budget
+        self.timed_out = False
+        self.stopped = threading.Event()
+        self.producer = None
+
+    def absolute(self, link):
+        return link if link.startswith("http") else self.base_url + link
+
+    def remaining(self):
+        """Seconds left of the time budget, or None without one."""
+        if self.time_budget is None:
+            return None
+        return max(0.0, self.start_time + self.time_budget - time.monotonic())
+
+    def start_producer(self, target, *args):
+        self.producer = threading.Thread(target=target, args=args, daemon=True)
+        self.producer.start()
+
+    def stop(self):
+        """Stop the producer and wait for it to finish its current batch."""
+        self.stopped.set()
+        if self.producer is not None:
+            self.producer.join()
+
+    def hand_over(self, item):
+        """Queue item for run(); gives up once the pipeline is stopped."""
+        while not self.stopped.is_set():
+            try:
+                self.batches.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+
+    def produce(self, batch_urls):
+        for batch_url in batch_urls:
+            if self.stopped.is_set() or self.remaining() == 0:
+                break
+            try:
+                company_links = self.get_company_links(batch_url)
+            except Exception as e:
+                print(f"⚠️ Failed to paginate {batch_url}: {e}")
+                continue  # Not yielded, so the batch stays pending for the next run
+            print(f"  Found {len(company_links)} companies in batch {batch_url}.")
+            if self.progress is not None:
+                self.progress.discover("companies", len(company_links))
+            self.hand_over((batch_url, [self.absolute(link) for link in company_links]))
+        self.hand_over(_DONE)
+
+    def scrape(self, company_link):
+        start = time.monotonic()
+        try:
+            return self.get_company_info(company_link)
+        finally:
+            with self.busy_lock:
+                self.busy_seconds += time.monotonic() - start
+                self.companies_done += 1
+            if self.progress is not None:
+                self.progress.update("companies")
+
+    def run(self, batch_urls):
+        """Yield (batch_url, results) for each batch, in order, as soon as it completes."""
+        self.start_time = time.monotonic()
+        self.start_producer(self.produce, batch_urls)
+        try:
+            yield from self.consume()
+        finally:
+            self.stop()
+
+    def consume(self):
+        in_flight = []  # [(batch_url, futures)] oldest first
+        producer_done = False
+
+        with ThreadPoolExecutor(max_workers=self.threads) as executor:
+            while in_flight or not producer_done:
+                if not self.timed_out and self.remaining() == 0:
+                    self.timed_out = True
+                    producer_done = True
+                    for _, futures in in_flight:
+                        for f in futures:
+                            f.cancel()  # Left pending in the crawl state for the next run
+                    print(f"⏱️ Time budget of {self.time_budget:.0f} seconds used up; finishing the running scrapes.")
+
+                if not producer_done and len(in_flight) < MAX_BATCHES_IN_FLIGHT:
+                    try:
+                        # Don't block on pagination while finished batches are waiting to be handed back
+                        item = self.batches.get(timeout=0.1 if in_flight else self.remaining())
+                    except queue.Empty:
+                        item = None
+                    if item is None:
+                        pass
+                    elif item is _DONE:
+                        producer_done = True
+                    else:
+                        batch_url, company_links = item
+                        in_flight.append((batch_url, [executor.submit(self.scrape, link) for link in company_links]))
+
+                metrics.set_gauge("queue_depth", self.batches.qsize(), stage="pagination")
+                metrics.set_gauge("queue_depth", sum(not f.done() for _, futures in in_flight for f in futures),
+                                  stage="scrape")
+
+                # Hand back every finished batch at the head of the line
+                while in_flight and all(f.done() for f in in_flight[0][1]):
+                    batch_url, futures = in_flight.pop(0)
+                    if not any(f.cancelled() for f in futures):
+                        yield batch_url, [f.result() for f in futures]
+
+                if in_flight and (producer_done or len(in_flight) >= MAX_BATCHES_IN_FLIGHT):
+                    wait(in_flight[0][1], timeout=None if self.timed_out else self.remaining(),
+                         return_when=FIRST_COMPLETED)
+
+        metrics.set_gauge("queue_depth", 0, stage="scrape")
+
+    def utilisation(self):
+        """Fraction of worker-seconds spent scraping since run() started."""
+        elapsed = time.monotonic() - self.start_time
+        if elapsed <= 0:
+            return 0.0
+        with self.busy_lock:
+            return self.busy_seconds / (self.threads * elapsed)
+
+    def print_stats(self):
+        elapsed = time.monotonic() - self.start_time
+        print(f"🧵 Worker utilisation: {self.utilisation():.1%} over {elapsed:.1f} seconds "
+              f"({self.companies_done} companies, {self.threads} threads)")
+
+
+class PriorityPipeline(BatchPipeline):
+    """Best-first variant: scrape by priority across batches while they are paginated.
+
+    get_company_links returns [(link, priority)] here. A producer thread
+    paginates the batches in the order given (best batches first, see
+    frontier.BatchYields) into one priority queue, and the pool takes the
+    highest-priority company queued so far, whatever its batch, from the
+    start. A batch is yielded as soon as its last company is scraped. Early
+    (or time-boxed) results thus hold the companies most likely to have an
+    email, without waiting for every batch to be paginated.
+    """
+
+    def paginate(self, batch_urls, frontier, sizes, finished):
+        """Producer: queue every batch's companies on the frontier; sizes gets each batch's count."""
+        order = itertools.count()  # Ties go to the earlier batch and page
+        try:
+            for batch_url in batch_urls:
+                if self.stopped.is_set() or self.remaining() == 0:
+                    self.cut_short = True
+                    break
+                try:
+                    company_links = self.get_company_links(batch_url)
+                except Exception as e:
+                    print(f"⚠️ Failed to paginate {batch_url}: {e}")
+                    continue  # Not yielded, so the batch stays pending for the next run
+                print(f"  Found {len(company_links)} companies in batch {batch_url}.")
+                if self.progress is not None:
+                    self.progress.discover("companies", len(company_links))
+                with self.results_lock:
+                    sizes[batch_url] = len(company_links)
+                if not company_links:
+                    finished.put(batch_url)
+                for link, priority in company_links:
+                    frontier.put((-priority, next(order), batch_url, self.absolute(link)))
+                metrics.set_gauge("queue_depth", frontier.qsize(), stage="scrape")
+        finally:
+            self.paginated.set()
+
+    def run(self, batch_urls):
+        """Yield (batch_url, results) for each batch as soon as it completes."""
+        self.start_time = time.monotonic()
+        self.cut_short = False
+        self.paginated = threading.Event()
+        self.results_lock = threading.Lock()
+        frontier = queue.PriorityQueue()
+        sizes = {}
+        finished = queue.Queue()
+        self.start_producer(self.paginate, batch_urls, frontier, sizes, finished)
+        try:
+            yield from self.drain(frontier, sizes, finished)
+        finally:
+            self.stop()
+        # Checked once the producer is joined, so a batch it was still paginating counts
+        if self.remaining() == 0 and (frontier.qsize() or self.cut_short):
+            self.timed_out = True
+            print(f"⏱️ Time budget of {self.time_budget:.0f} seconds used up; the rest stays pending.")
+
+    def drain(self, frontier, sizes, finished):
+        results = {}
+
+        def work():
+            while self.remaining() != 0 and not self.stopped.is_set():
+                try:
+                    _, _, batch_url, company_link = frontier.get(timeout=0.1)
+                except queue.Empty:
+                    if self.paginated.is_set() and frontier.empty():
+                        return
+                    continue  # The producer is still paginating
+                result = self.scrape(company_link)
+                with self.results_lock:
+                    results.setdefault(batch_url, []).append(result)
+                    if len(results[batch_url]) == sizes[batch_url]:
+                        finished.put(batch_url)
+
+        with ThreadPoolExecutor(max_workers=self.threads) as executor:
+            workers = [executor.submit(work) for _ in range(self.threads)]
+            while not (all(f.done() for f in workers) and finished.empty()):
+                try:
+                    batch_url = finished.get(timeout=0.1)
+                except queue.Empty:
+                    metrics.set_gauge("queue_depth", frontier.qsize(), stage="scrape")
+                    continue
+                with self.results_lock:
+                    batch_results = results.pop(batch_url, [])
+                yield batch_url, batch_results
+            for f in workers:
+                f.result()
+        metrics.set_gauge("queue_depth", 0, stage="scrape")
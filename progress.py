@@ -0,0 +1,166 @@
+"""Streaming throughput and ETA estimates shared by tqdm bars and log lines.
+
+Every stage keeps an exponentially weighted throughput (mean and variance,
+sampled every SAMPLE_INTERVAL seconds). Totals are learned while crawling: a
+child stage (companies) extrapolates the work still hidden in undiscovered
+parents (batches) from how many items each discovered parent produced.
+"""
+import math
+import threading
+import time
+
+from tqdm import tqdm
+
+ALPHA = 0.2  # Weight of the newest throughput sample
+SAMPLE_INTERVAL = 2.0  # Seconds of work folded into one throughput sample
+Z = 1.96  # Width of the ~95% confidence bounds
+
+
+def format_duration(seconds):
+    if seconds is None:
+        return "?"
+    if math.isinf(seconds):
+        return "∞"
+    if seconds < 3600:
+        return f"{seconds / 60:.1f}m"
+    return f"{seconds / 3600:.2f}h"
+
+
+class Stage:
+    def __init__(self, name, total=None, parent=None):
+        self.name = name
+        self.parent = parent
+        self.known = total or 0  # Items we know exist
+        self.fixed_total = parent is None and total is not None
+        self.done = 0
+        # Children per discovered parent (Welford mean/variance)
+        self.parents_seen = 0
+        self.per_parent_mean = 0.0
+        self.per_parent_m2 = 0.0
+        # Throughput, items/s
+        self.started = time.monotonic()
+        self.sample_start = self.started
+        self.sample_done = 0
+        self.rate = None
+        self.rate_var = 0.0
+
+    def discover(self, count):
+        """A parent turned out to hold `count` items of this stage."""
+        self.known += count
+        if self.parent is not None:
+            self.parents_seen += 1
+            delta = count - self.per_parent_mean
+            self.per_parent_mean += delta / self.parents_seen
+            self.per_parent_m2 += delta * (count - self.per_parent_mean)
+
+    def advance(self, count, now):
+        self.done += count
+        self.sample_done += count
+        elapsed = now - self.sample_start
+        if elapsed < SAMPLE_INTERVAL:
+            return
+        sample = self.sample_done / elapsed
+        if self.rate is None:
+            self.rate = sample
+        else:
+            diff = sample - self.rate
+            self.rate += ALPHA * diff
+            self.rate_var = (1 - ALPHA) * (self.rate_var + ALPHA * diff * diff)
+        self.sample_start, self.sample_done = now, 0
+
+    def current_rate(self, now):
+        if self.rate is not None:
+            return self.rate
+        elapsed = now - self.started
+        return self.done / elapsed if elapsed > 0 and self.done else None
+
+    def expected_total(self):
+        """(expected, spread) of this stage's total; spread covers undiscovered parents."""
+        if self.parent is None:
+            return (self.known, 0.0) if self.fixed_total or self.known else (None, 0.0)
+        unseen = max(0, self.parent.known - self.parents_seen)
+        if not self.parents_seen:
+            return (None, 0.0) if unseen else (self.known, 0.0)
+        variance = self.per_parent_m2 / (self.parents_seen - 1) if self.parents_seen > 1 else 0.0
+        return self.known + unseen * self.per_parent_mean, Z * math.sqrt(unseen * variance)
+
+    def eta(self, now):
+        """(expected, low, high) seconds left, None where unknown."""
+        total, spread = self.expected_total()
+        rate = self.current_rate(now)
+        if total is None or not rate:
+            return None, None, None
+        remaining = max(0.0, total - self.done)
+        spread_rate = Z * math.sqrt(self.rate_var)
+        fast = rate + spread_rate
+        slow = rate - spread_rate
+        return (
+            remaining / rate,
+            max(0.0, remaining - spread) / fast,
+            (remaining + spread) / slow if slow > 0 else (math.inf if remaining + spread else 0.0),
+        )
+
+
+class ProgressTracker:
+    """Thread-safe set of stages; update() moves the attached tqdm bar, line()/log() feed the logs."""
+
+    def __init__(self):
+        self.stages = {}
+        self.bars = {}
+        self.lock = threading.Lock()
+
+    def stage(self, name, total=None, parent=None):
+        """Declare a stage; with parent=<stage name> its total is learned through discover()."""
+        with self.lock:
+            self.stages[name] = Stage(name, total, self.stages[parent] if parent else None)
+
+    def discover(self, name, count):
+        with self.lock:
+            self.stages[name].discover(count)
+        self.refresh_bar(name)
+
+    def update(self, name, count=1):
+        with self.lock:
+            self.stages[name].advance(count, time.monotonic())
+        bar = self.bars.get(name)
+        if bar is not None:
+            bar.update(count)
+            self.refresh_bar(name)
+
+    def bar(self, name, desc):
+        """tqdm bar for a stage whose total and ETA follow the estimator."""
+        total, _ = self.stages[name].expected_total()
+        self.bars[name] = tqdm(total=round(total) if total is not None else None, desc=desc)
+        return self.bars[name]
+
+    def refresh_bar(self, name):
+        bar = self.bars.get(name)
+        if bar is None:
+            return
+        with self.lock:
+            stage = self.stages[name]
+            total, _ = stage.expected_total()
+            eta, low, high = stage.eta(time.monotonic())
+        if total is not None:
+            bar.total = max(round(total), stage.done)
+        bar.set_postfix_str(f"ETA {format_duration(eta)} [{format_duration(low)}–{format_duration(high)}]", refresh=False)
+
+    def line(self, name):
+        with self.lock:
+            stage = self.stages[name]
+            now = time.monotonic()
+            total, spread = stage.expected_total()
+            rate = stage.current_rate(now)
+            eta, low, high = stage.eta(now)
+        total_text = "?" if total is None else f"~{total:,.0f}" + (f" ±{spread:,.0f}" if spread >= 1 else "")
+        rate_text = "?" if rate is None else f"{rate:.2f}/s"
+        return (f"{name}: {stage.done:,}/{total_text} at {rate_text}, "
+                f"ETA {format_duration(eta)} (95%: {format_duration(low)}–{format_duration(high)})")
+
+    def log(self):
+        for name in self.stages:
+            print(f"⏳ {self.line(name)}")
+
+    def close(self):
+        for bar in self.bars.values():
+            bar.close()
@@ -0,0 +1,183 @@
+import asyncio
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+INITIAL_RATE = 5.0  # Requests per second per host
+MIN_RATE = 0.5
+MAX_RATE = 50.0
+INCREASE_STEP = 1.0  # Requests/s gained per second of healthy traffic
+BACKOFF_FACTOR = 0.5  # Rate and concurrency multiplier on 429/503
+SLOW_FACTOR = 0.9  # Multiplier when latency runs high
+DECREASE_COOLDOWN = 2.0  # Seconds between two decreases for the same host
+INITIAL_CONCURRENCY = 4
+MAX_CONCURRENCY = 32
+BURST = 5.0  # Tokens a quiet host can save up
+TARGET_LATENCY = 1.0  # Seconds; speed up only while responses come back faster
+THROTTLE_STATUSES = (429, 503)
+ASYNC_POLL = 0.05  # Seconds an asyncio caller waits for a release before asking again
+
+
+def parse_retry_after(value):
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date), or None."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class HostLimiter:
+    """Token bucket plus concurrency cap for one host, tuned by AIMD.
+
+    Healthy, fast responses raise the rate additively; 429/503 halve it (and
+    honour Retry-After); slow responses or errors trim it gently.
+    """
+
+    def __init__(self, rate=INITIAL_RATE, concurrency=INITIAL_CONCURRENCY):
+        self.cond = threading.Condition()
+        self.rate = rate
+        self.concurrency = float(concurrency)
+        self.tokens = 1.0
+        self.last_refill = time.monotonic()
+        self.in_flight = 0
+        self.blocked_until = 0.0
+        self.last_decrease = 0.0
+        self.throttled = 0
+
+    def refill(self, now):
+        self.tokens = min(BURST, self.tokens + (now - self.last_refill) * self.rate)
+        self.last_refill = now
+
+    def take(self, now):
+        """Take a slot if one is free (caller holds cond); returns (taken, seconds to wait, None until a release)."""
+        self.refill(now)
+        if now < self.blocked_until:
+            return False, self.blocked_until - now
+        if self.in_flight >= int(self.concurrency):
+            return False, None
+        if self.tokens < 1:
+            return False, (1 - self.tokens) / self.rate
+        self.tokens -= 1
+        self.in_flight += 1
+        return True, 0.0
+
+    def acquire(self):
+        with self.cond:
+            while True:
+                taken, timeout = self.take(time.monotonic())
+                if taken:
+                    return
+                self.cond.wait(timeout)  # None: woken by release()
+
+    async def acquire_async(self):
+        """acquire() for asyncio callers: sleeps between tries instead of blocking the event loop."""
+        while True:
+            with self.cond:
+                taken, timeout = self.take(time.monotonic())
+            if taken:
+                return
+            await asyncio.sleep(ASYNC_POLL if timeout is None else timeout)
+
+    def decrease(self, now, factor):
+        if now - self.last_decrease < DECREASE_COOLDOWN:
+            return  # Responses to requests sent before the last cut don't count twice
+        self.last_decrease = now
+        self.rate = max(MIN_RATE, self.rate * factor)
+        self.concurrency = max(1.0, self.concurrency * factor)
+
+    def release(self, status=None, latency=None, retry_after=None):
+        """Feed back one finished request; status None means it raised."""
+        with self.cond:
+            now = time.monotonic()
+            self.in_flight -= 1
+            if status in THROTTLE_STATUSES:
+                self.throttled += 1
+                self.decrease(now, BACKOFF_FACTOR)
+                wait = parse_retry_after(retry_after)
+                if wait:
+                    self.blocked_until = max(self.blocked_until, now + wait)
+            elif status is None or (latency is not None and latency > 2 * TARGET_LATENCY):
+                self.decrease(now, SLOW_FACTOR)
+            elif latency is None or latency <= TARGET_LATENCY:
+                self.rate = min(MAX_RATE, self.rate + INCREASE_STEP / self.rate)
+                self.concurrency = min(MAX_CONCURRENCY, self.concurrency + 1 / self.concurrency)
+            self.cond.notify_all()
+
+    def stats(self):
+        with self.cond:
+            return {
+                "rate": round(self.rate, 2),
+                "concurrency": int(self.concurrency),
+                "in_flight": self.in_flight,
+                "throttled": self.throttled,
+            }
+
+
+class RateController:
+    """Hands out per-host request slots; every fetch in http_client goes through one."""
+
+    def __init__(self, rate=INITIAL_RATE, concurrency=INITIAL_CONCURRENCY):
+        self.rate = rate
+        self.concurrency = concurrency
+        self.hosts = {}
+        self.lock = threading.Lock()
+
+    def limiter(self, url):
+        host = urlsplit(url).netloc.lower()
+        with self.lock:
+            if host not in self.hosts:
+                self.hosts[host] = HostLimiter(self.rate, self.concurrency)
+            return self.hosts[host]
+
+    @contextmanager
+    def slot(self, url):
+        """Wait for a slot on the URL's host; the caller reports the outcome with record()."""
+        limiter = self.limiter(url)
+        limiter.acquire()
+        outcome = {}
+        try:
+            yield outcome
+        finally:
+            limiter.release(outcome.get("status"), outcome.get("latency"), outcome.get("retry_after"))
+
+    @asynccontextmanager
+    async def async_slot(self, url):
+        """slot() for asyncio callers; fill the yielded outcome with status, latency and retry_after."""
+        limiter = self.limiter(url)
+        await limiter.acquire_async()
+        outcome = {}
+        try:
+            yield outcome
+        finally:
+            limiter.release(outcome.get("status"), outcome.get("latency"), outcome.get("retry_after"))
+
+    @staticmethod
+    def record(outcome, res):
+        outcome["status"] = res.status_code
+        outcome["latency"] = res.elapsed.total_seconds()
+        outcome["retry_after"] = res.headers.get("Retry-After")
+
+    def stats(self):
+        with self.lock:
+            hosts = dict(self.hosts)
+        return {host: limiter.stats() for host, limiter in hosts.items()}
+
+
+class NoRateControl(RateController):
+    """Unpaced stand-in for RateController, for benchmarks against plain requests."""
+
+    @contextmanager
+    def slot(self, url):
+        yield {}
+
+    @asynccontextmanager
+    async def async_slot(self, url):
+        yield {}
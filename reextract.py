@@ -0,0 +1,62 @@
+"""Re-run company extraction over archived pages, without touching the network.
+
+Segments are spread across all cores with a process pool; when a page was
+archived more than once the latest copy wins.
+
+Usage: python reextract.py [--archive DIR] [--output FILE] [--processes N]
+"""
+import argparse
+import csv
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from tqdm import tqdm
+
+from archive import ARCHIVE_DIR, iter_records, list_segments
+from extractor import extract_company_info
+
+RESULTS_FILE = "reextracted_companies.csv"
+
+
+def reextract_segment(segment_path):
+    results = []
+    for url, _, body in iter_records(segment_path):
+        company_name, email, scheme = extract_company_info(body)
+        results.append((company_name, email, url, scheme))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--archive", default=ARCHIVE_DIR)
+    parser.add_argument("--output", default=RESULTS_FILE)
+    parser.add_argument("--processes", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    segments = list_segments(args.archive)
+    if not segments:
+        raise Exception(f"No archive segments found in {args.archive}")
+
+    start_time = time.time()
+    latest = {}
+    pages = 0
+    with ProcessPoolExecutor(max_workers=args.processes) as executor:
+        # map keeps segment order, so later copies of a page overwrite earlier ones
+        for results in tqdm(executor.map(reextract_segment, segments), total=len(segments), desc="Re-extracting segments"):
+            pages += len(results)
+            for row in results:
+                latest[row[2]] = row
+
+    with open(args.output, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["Company Name", "Email", "Source URL", "Scheme"])
+        writer.writerows(latest.values())
+
+    elapsed = time.time() - start_time
+    print(f"\n✅ Re-extracted {len(latest)} companies from {pages} archived pages in {elapsed:.1f} seconds.")
+    print(f"Data saved to {args.output}.")
+
+
+if __name__ == "__main__":
+    main()
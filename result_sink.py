@@ -0,0 +1,133 @@
+"""Append-only result sink with background compaction.
+
+Records are appended as JSON lines to rotating part files, so saving costs
+the same for the 10th and the 150,000th record. A background thread folds
+finished parts into one compacted file (latest record per key wins), and
+the Excel workbook is written once, at the end.
+"""
+import json
+import os
+import threading
+
+import pandas as pd
+
+SINK_DIR = "output_parts"
+ROTATE_EVERY = 5000  # Records per part file
+COMPACT_INTERVAL = 300  # Seconds between background compactions
+COMPACTED_FILE = "compacted.jsonl"
+
+
+class ResultSink:
+    def __init__(self, directory=SINK_DIR, key="Company Link", rotate_every=ROTATE_EVERY,
+                 compact_interval=COMPACT_INTERVAL):
+        self.directory = directory
+        self.key = key
+        self.rotate_every = rotate_every
+        self.lock = threading.Lock()
+        self.compact_lock = threading.Lock()
+        self.stopped = threading.Event()
+        os.makedirs(directory, exist_ok=True)
+
+        self.part_number = max((self.part_index(n) for n in os.listdir(directory)), default=0)
+        self.part_file = None
+        self.part_records = 0
+        self.open_next_part()
+
+        self.compactor = threading.Thread(target=self.compact_loop, args=(compact_interval,), daemon=True)
+        self.compactor.start()
+
+    @staticmethod
+    def part_index(name):
+        if name.startswith("part-") and name.endswith(".jsonl"):
+            return int(name[5:-6])
+        return 0
+
+    def part_paths(self):
+        names = sorted(n for n in os.listdir(self.directory) if self.part_index(n))
+        return [os.path.join(self.directory, n) for n in names]
+
+    def open_next_part(self):
+        if self.part_file is not None:
+            self.part_file.close()
+        self.part_number += 1
+        path = os.path.join(self.directory, f"part-{self.part_number:05d}.jsonl")
+        self.part_file = open(path, "a", encoding="utf-8")
+        self.part_records = 0
+
+    def append(self, record):
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self.lock:
+            self.part_file.write(line)
+            self.part_file.flush()
+            self.part_records += 1
+            if self.part_records >= self.rotate_every:
+                self.open_next_part()
+
+    def compact(self):
+        """Fold every finished part file into the compacted file."""
+        with self.compact_lock:
+            with self.lock:
+                current = os.path.abspath(self.part_file.name) if self.part_file else None
+            parts = [p for p in self.part_paths() if os.path.abspath(p) != current]
+            if not parts:
+                return
+
+            compacted = os.path.join(self.directory, COMPACTED_FILE)
+            merged = {}
+            for path in [compacted] + parts:
+                for record in self.read_jsonl(path):
+                    merged[record[self.key]] = record
+
+            tmp = compacted + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                for record in merged.values():
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            os.replace(tmp, compacted)
+            for path in parts:
+                os.remove(path)
+
+    def compact_loop(self, interval):
+        while not self.stopped.wait(interval):
+            try:
+                self.compact()
+            except Exception as e:
+                print(f"⚠️ Compaction failed: {e}")
+
+    @staticmethod
+    def read_jsonl(path):
+        if not os.path.exists(path):
+            return
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    try:
+                        yield json.loads(line)
+                    except json.JSONDecodeError:
+                        pass  # Torn last line after a crash
+
+    def records(self):
+        """All records, latest per key, in first-seen order."""
+        with self.compact_lock:
+            merged = {}
+            for path in [os.path.join(self.directory, COMPACTED_FILE)] + self.part_paths():
+                for record in self.read_jsonl(path):
+                    merged[record[self.key]] = record
+            return list(merged.values())
+
+    def keys(self):
+        """Keys already written, for skipping finished work on a rerun."""
+        return {record[self.key] for record in self.records()}
+
+    def close(self):
+        self.stopped.set()
+        self.compactor.join()
+        with self.lock:
+            self.part_file.close()  # Seal the current part so it gets compacted
+            self.part_file = None
+        self.compact()
+
+    def export_excel(self, path):
+        records = self.records()
+        pd.DataFrame(records).to_excel(path, index=False)
+        return len(records)
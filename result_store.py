@@ -0,0 +1,421 @@
+"""Columnar result store (Parquet) and a streaming dedupe/count/merge CLI.
+
+Scrapers export their results as Parquet part files under RESULTS_DIR, one
+sub-directory per run, with a Run column on every row. The CLI reads those
+datasets, result workbooks (.xlsx) and result CSVs alike, one row group or
+chunk of rows at a time, so deduping, counting duplicates and merging runs
+keep only the keys in memory, never the rows. Excel is an optional last step.
+
+Usage:
+    python result_store.py merge "Reults/*.xlsx" results_parquet -o merged
+    python result_store.py dedupe merged -o uniques [--key "Company Link"] [--keep first|last|best] [--excel uniques.xlsx]
+    python result_store.py count merged [--key "Company Link"] [-o counted] [--excel counted.xlsx]
+    python result_store.py export uniques --excel uniques.xlsx
+"""
+import argparse
+import glob
+import os
+import threading
+import time
+from collections import Counter
+
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+
+from frontier import canonicalize
+
+RESULTS_DIR = "results_parquet"
+ROW_GROUP_SIZE = 10000  # Rows per row group, and per chunk read from a workbook
+KEY = "Company Link"
+RUN = "Run"
+DUPLICATE_COUNT = "Duplicate Count"
+COLUMNS = ["Company Name", "Email", "Company Link", "Scheme"]
+SCHEMA = pa.schema([(name, pa.string()) for name in COLUMNS + [RUN]])
+EXCEL_MAX_ROWS = 1048576
+LINK_COLUMNS = {"Company Link", "Batch Link"}  # Keys compared in canonical form, as the crawlers queue them
+
+# Header spellings found in older outputs -> column name
+COLUMN_ALIASES = {
+    "company name": "Company Name",
+    "email": "Email",
+    "company link": "Company Link",
+    "companylink": "Company Link",
+    "source url": "Company Link",
+    "scheme": "Scheme",
+    "batch link": "Batch Link",
+    "batchlink": "Batch Link",
+    "run": RUN,
+}
+NO_EMAIL = {"", "N/A", "Dead Link"}
+
+
+def normalise_column(name):
+    name = " ".join(str(name).split())
+    return COLUMN_ALIASES.get(name.lower(), name)
+
+
+def has_email(value):
+    return value is not None and value not in NO_EMAIL and "@" in value
+
+
+class ResultStore:
+    """Buffered writer of one run's results as Parquet part files.
+
+    append() takes result dicts (the same records as ResultSink), write()
+    takes Arrow tables; every ROW_GROUP_SIZE rows become one part file,
+    written to a temporary name first so readers never see half a file.
+    """
+
+    def __init__(self, directory, run=None, schema=SCHEMA, row_group_size=ROW_GROUP_SIZE):
+        self.directory = directory
+        self.run = run
+        self.schema = schema
+        self.row_group_size = row_group_size
+        self.lock = threading.Lock()
+        self.rows = []
+        self.tables = []
+        self.pending = 0
+        self.written = 0
+        os.makedirs(self.directory, exist_ok=True)
+        self.part_number = len(glob.glob(os.path.join(self.directory, "part-*.parquet")))
+
+    @classmethod
+    def new_run(cls, root=RESULTS_DIR):
+        """Store for this scrape: a new sub-directory of root named after the start time."""
+        run = time.strftime("%Y%m%d-%H%M%S")
+        return cls(os.path.join(root, run), run)
+
+    def append(self, record):
+        with self.lock:
+            self.rows.append({RUN: self.run, **record})
+            self.pending += 1
+            if self.pending >= self.row_group_size:
+                self.flush_locked()
+
+    def extend(self, records):
+        for record in records:
+            self.append(record)
+
+    def write(self, table):
+        with self.lock:
+            self.tables.append(conform(table, self.schema, self.run))
+            self.pending += table.num_rows
+            if self.pending >= self.row_group_size:
+                self.flush_locked()
+
+    def flush(self):
+        with self.lock:
+            self.flush_locked()
+
+    def flush_locked(self):
+        tables = self.tables
+        if self.rows:
+            tables = tables + [pa.Table.from_pylist(self.rows, schema=self.schema)]
+        self.rows, self.tables, self.pending = [], [], 0
+        if not tables:
+            return
+        table = pa.concat_tables(tables, promote_options="default")  # Inputs may carry different extra columns
+        for offset in range(0, table.num_rows, self.row_group_size):
+            self.part_number += 1
+            path = os.path.join(self.directory, f"part-{self.part_number:05d}.parquet")
+            pq.write_table(table.slice(offset, self.row_group_size), path + ".tmp", compression="zstd")
+            os.replace(path + ".tmp", path)
+        self.written += table.num_rows
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# Reading
+
+def conform(table, schema=SCHEMA, run=None):
+    """Rename known header spellings and return `schema`'s columns (missing ones null), then
+    any other columns of the input as strings."""
+    table = table.rename_columns([normalise_column(name) for name in table.column_names])
+    columns = []
+    for field in schema:
+        if field.name in table.column_names:
+            column = table.column(field.name)
+            if column.type != field.type:
+                column = column.cast(field.type)
+        elif field.name == RUN and run is not None:
+            column = pa.array([run] * table.num_rows, field.type)
+        else:
+            column = pa.nulls(table.num_rows, field.type)
+        columns.append(column)
+    fields = list(schema)
+    for name in table.column_names:
+        if name not in schema.names:
+            columns.append(table.column(name).cast(pa.string()))
+            fields.append(pa.field(name, pa.string()))
+    return pa.Table.from_arrays(columns, schema=pa.schema(fields))
+
+
+def input_files(inputs):
+    """Expand globs and directories (every .parquet below them) into files, in order."""
+    files = []
+    for pattern in inputs:
+        for path in sorted(glob.glob(pattern)) or [pattern]:
+            if os.path.isdir(path):
+                files.extend(sorted(glob.glob(os.path.join(path, "**", "*.parquet"), recursive=True)))
+            else:
+                files.append(path)
+    return files
+
+
+def input_columns(inputs, schema=SCHEMA):
+    """Column names read_tables() yields for inputs: schema's, then the others in first-seen order."""
+    names = list(schema.names)
+    for path in input_files(inputs):
+        extension = os.path.splitext(path)[1].lower()
+        if extension == ".parquet":
+            header = pq.read_schema(path).names
+        elif extension in (".xlsx", ".xlsm"):
+            from openpyxl import load_workbook
+
+            workbook = load_workbook(path, read_only=True)
+            try:
+                header = [name for name in next(workbook.active.iter_rows(max_row=1, values_only=True), ())
+                          if name is not None]
+            finally:
+                workbook.close()
+        elif extension == ".csv":
+            header = pa_csv.open_csv(path).schema.names
+        else:
+            raise ValueError(f"Unsupported input: {path}")
+        names.extend(name for name in map(normalise_column, header) if name not in names)
+    return names
+
+
+def read_xlsx(path, batch_size=ROW_GROUP_SIZE):
+    """Stream a workbook's first sheet as tables of batch_size rows (openpyxl read-only mode)."""
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = next(rows, None) or ()
+        keep = [i for i, name in enumerate(header) if name is not None]
+        names = [normalise_column(header[i]) for i in keep]
+        chunk = []
+        for row in rows:
+            values = [row[i] if i < len(row) else None for i in keep]
+            if all(value is None for value in values):
+                continue
+            chunk.append([None if value is None else str(value) for value in values])
+            if len(chunk) >= batch_size:
+                yield pa.Table.from_arrays([pa.array(column, pa.string()) for column in zip(*chunk)], names=names)
+                chunk = []
+        if chunk:
+            yield pa.Table.from_arrays([pa.array(column, pa.string()) for column in zip(*chunk)], names=names)
+    finally:
+        workbook.close()
+
+
+def read_tables(inputs, schema=SCHEMA, batch_size=ROW_GROUP_SIZE):
+    """Yield every input as schema-conformed tables of at most batch_size rows.
+
+    Rows without a Run get the name of the file they came from.
+    """
+    for path in input_files(inputs):
+        source = os.path.splitext(os.path.basename(path))[0]
+        extension = os.path.splitext(path)[1].lower()
+        if extension == ".parquet":
+            parquet = pq.ParquetFile(path)
+            tables = (pa.Table.from_batches([batch]) for batch in parquet.iter_batches(batch_size))
+        elif extension in (".xlsx", ".xlsm"):
+            tables = read_xlsx(path, batch_size)
+        elif extension == ".csv":
+            reader = pa_csv.open_csv(path, read_options=pa_csv.ReadOptions(block_size=1 << 22))
+            tables = (pa.Table.from_batches([batch]) for batch in reader)
+        else:
+            raise ValueError(f"Unsupported input: {path}")
+        for table in tables:
+            yield conform(table, schema, source)
+
+
+# Commands
+
+def key_values(table, key):
+    """Values of the key column, links canonicalised so spelling variants of one URL match."""
+    if key not in table.column_names:
+        return [None] * table.num_rows  # An input without the column: its rows have no key
+    values = table.column(key).to_pylist()
+    if key in LINK_COLUMNS:
+        values = [canonicalize(value) if value else value for value in values]
+    return values
+
+
+def choose_rows(inputs, key, keep):
+    """Pass 1 for --keep last/best: global index of the row kept for every key."""
+    chosen = {}
+    chosen_has_email = {}
+    index = 0
+    for table in read_tables(inputs):
+        emails = table.column("Email").to_pylist()
+        for value, email in zip(key_values(table, key), emails):
+            if value:
+                if keep == "last" or value not in chosen:
+                    chosen[value] = index
+                    chosen_has_email[value] = has_email(email)
+                elif not chosen_has_email[value] and has_email(email):
+                    chosen[value] = index
+                    chosen_has_email[value] = True
+            index += 1
+    return chosen
+
+
+def dedupe(inputs, store, key=KEY, keep="first"):
+    """Write one row per key (rows with no key are kept); returns (rows read, rows written)."""
+    chosen = choose_rows(inputs, key, keep) if keep != "first" else None
+    seen = set()
+    index = 0
+    read = 0
+    for table in read_tables(inputs):
+        mask = []
+        for value in key_values(table, key):
+            if not value:
+                mask.append(True)
+            elif chosen is not None:
+                mask.append(chosen[value] == index)
+            else:
+                mask.append(value not in seen)
+                seen.add(value)
+            index += 1
+        read += table.num_rows
+        store.write(table.filter(pa.array(mask, pa.bool_())))
+    store.close()
+    return read, store.written
+
+
+def count_keys(inputs, key=KEY):
+    counts = Counter()
+    rows = 0
+    for table in read_tables(inputs):
+        counts.update(value for value in key_values(table, key) if value)
+        rows += table.num_rows
+    return rows, counts
+
+
+def write_counts(inputs, store, counts, key=KEY):
+    """Every row plus a Duplicate Count column, like countUnique.py used to add."""
+    for table in read_tables(inputs):
+        column = [counts.get(value, 1) if value else 1 for value in key_values(table, key)]
+        store.write(table.append_column(DUPLICATE_COUNT, pa.array(column, pa.int64())))
+    store.close()
+
+
+def merge(inputs, store):
+    for table in read_tables(inputs):
+        store.write(table)
+    store.close()
+    return store.written
+
+
+def export_excel(inputs, path, schema=SCHEMA):
+    """Stream Parquet into a write-only workbook; returns the rows written."""
+    from openpyxl import Workbook
+
+    names = input_columns(inputs, schema)
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    sheet.append(names)
+    rows = 0
+    for table in read_tables(inputs, schema):
+        rows += table.num_rows
+        if rows >= EXCEL_MAX_ROWS:
+            raise ValueError(f"{rows} rows do not fit in one Excel sheet; keep the Parquet output instead.")
+        columns = [table.column(name).to_pylist() if name in table.column_names else [None] * table.num_rows
+                   for name in names]
+        for row in zip(*columns):
+            sheet.append(row)
+    workbook.save(path)
+    return rows
+
+
+def output_store(args, schema=SCHEMA):
+    """Store for a command's output; --excel alone writes a temporary dataset next to the workbook."""
+    directory = args.output or os.path.splitext(args.excel)[0] + "_parquet"
+    if glob.glob(os.path.join(directory, "**", "*.parquet"), recursive=True):
+        raise SystemExit(f"❌ {directory} already holds Parquet files; pick a new --output.")
+    return ResultStore(directory, schema=schema)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+    for name, help in (
+        ("merge", "concatenate runs/workbooks into one dataset, tagging rows with their source"),
+        ("dedupe", "keep one row per key"),
+        ("count", "count duplicates per key; with -o/--excel also write rows with a Duplicate Count column"),
+        ("export", "write inputs to one Excel workbook"),
+    ):
+        command = sub.add_parser(name, help=help)
+        command.add_argument("inputs", nargs="+", help="Parquet files or directories, .xlsx or .csv files, globs")
+        command.add_argument("-o", "--output", default=None, help="output Parquet directory")
+        command.add_argument("--excel", default=None, help="also export the output to this workbook")
+        if name in ("dedupe", "count"):
+            command.add_argument("--key", default=KEY, help="column that identifies a row")
+        if name == "dedupe":
+            command.add_argument("--keep", choices=("first", "last", "best"), default="first",
+                                 help="row kept per key; best: the first one with an email")
+        if name == "count":
+            command.add_argument("--top", type=int, default=10, help="most duplicated keys to print")
+    args = parser.parse_args(argv)
+
+    if getattr(args, "key", None) is not None:
+        args.key = normalise_column(args.key)
+        columns = input_columns(args.inputs)
+        if args.key not in columns:
+            parser.error(f"--key {args.key!r} is not a column of the inputs; pick one of {columns}")
+
+    start = time.perf_counter()
+    if args.command == "export":
+        if not args.excel:
+            parser.error("export needs --excel")
+        rows = export_excel(args.inputs, args.excel)
+        print(f"✅ {rows} rows exported to {args.excel}.")
+        return
+
+    if args.command == "count":
+        rows, counts = count_keys(args.inputs, args.key)
+        duplicated = {value: n for value, n in counts.items() if n > 1}
+        print(f"📊 {rows} rows, {len(counts)} unique {args.key} values, "
+              f"{len(duplicated)} duplicated ({sum(duplicated.values()) - len(duplicated)} extra rows).")
+        for value, n in Counter(duplicated).most_common(args.top):
+            print(f"  {n}× {value}")
+        if args.output or args.excel:
+            schema = SCHEMA.append(pa.field(DUPLICATE_COUNT, pa.int64()))
+            store = output_store(args, schema)
+            write_counts(args.inputs, store, counts, args.key)
+            print(f"✅ Rows with {DUPLICATE_COUNT} saved to {store.directory}.")
+            if args.excel:
+                export_excel([store.directory], args.excel, schema)
+                print(f"✅ Exported to {args.excel}.")
+        print(f"⏱️ {time.perf_counter() - start:.1f}s")
+        return
+
+    if not (args.output or args.excel):
+        parser.error(f"{args.command} needs -o/--output or --excel")
+    store = output_store(args)
+    if args.command == "merge":
+        rows = merge(args.inputs, store)
+        print(f"✅ {rows} rows merged into {store.directory}.")
+    else:
+        read, written = dedupe(args.inputs, store, args.key, args.keep)
+        print(f"✅ {written} unique rows by {args.key} (of {read}) saved to {store.directory}.")
+    if args.excel:
+        export_excel([store.directory], args.excel)
+        print(f"✅ Exported to {args.excel}.")
+    print(f"⏱️ {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
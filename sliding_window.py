@@ -0,0 +1,66 @@
+import heapq
+import itertools
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import metrics
+
+WINDOW = 20
+RETRIES = 3
+RETRY_DELAY = 10  # Seconds before a failed item is tried again
+
+
+class RetryLater(Exception):
+    """Raised by a task to have its item re-queued after the retry delay."""
+
+
+def run_sliding_window(items, fn, window=WINDOW, retries=RETRIES, retry_delay=RETRY_DELAY, on_give_up=None):
+    """Yield fn(item) for every item, keeping `window` calls in flight at all times.
+
+    When fn raises RetryLater the item is parked for retry_delay seconds
+    instead of sleeping inside a worker, so one slow or failing page never
+    holds up the rest. After `retries` attempts, on_give_up(item) is yielded
+    (or the item is dropped if on_give_up is None).
+    """
+    pending = iter(items)
+    delayed = []  # Heap of (ready_at, seq, item, attempt)
+    seq = itertools.count()
+    in_flight = {}  # future -> (item, attempt)
+    exhausted = False
+
+    with ThreadPoolExecutor(max_workers=window) as executor:
+        while in_flight or delayed or not exhausted:
+            # Top the window up: due retries first, then fresh items
+            now = time.monotonic()
+            while len(in_flight) < window:
+                if delayed and delayed[0][0] <= now:
+                    _, _, item, attempt = heapq.heappop(delayed)
+                elif not exhausted:
+                    item = next(pending, None)
+                    if item is None:
+                        exhausted = True
+                        continue
+                    attempt = 0
+                else:
+                    break
+                in_flight[executor.submit(fn, item)] = (item, attempt)
+
+            metrics.set_gauge("queue_depth", len(in_flight), stage="window")
+            metrics.set_gauge("queue_depth", len(delayed), stage="retry")
+
+            if not in_flight:
+                time.sleep(max(0.0, delayed[0][0] - time.monotonic()))
+                continue
+
+            timeout = max(0.0, delayed[0][0] - time.monotonic()) if delayed else None
+            done, _ = wait(in_flight, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                item, attempt = in_flight.pop(future)
+                try:
+                    yield future.result()
+                except RetryLater:
+                    metrics.inc("retries", reason="requeued")
+                    if attempt + 1 < retries:
+                        heapq.heappush(delayed, (time.monotonic() + retry_delay, next(seq), item, attempt + 1))
+                    elif on_give_up is not None:
+                        yield on_give_up(item)
@@ -0,0 +1,82 @@
+"""CrawlState: failed fetches are retried, dead is kept for real dead pages, checkpoints import once."""
+import time
+
+import pytest
+
+from crawl_state import DEAD, FAILED, PENDING, VANISHED, CrawlState
+
+
+@pytest.fixture
+def state(tmp_path):
+    state = CrawlState(str(tmp_path / "state.sqlite"), max_attempts=2)
+    state.add_batches(["batch"])
+    state.add_companies("batch", ["ok", "gone", "flaky"])
+    state.mark_in_flight(["ok", "gone", "flaky"])
+    yield state
+    state.close()
+
+
+def test_failed_fetch_stays_pending_and_keeps_the_batch_open(state):
+    state.record_result("Acme", "a@acme.test", "ok", scheme="mailto")
+    state.record_result("N/A", "N/A", "gone", DEAD)
+    state.record_result("N/A", "N/A", "flaky", FAILED)
+    assert not state.mark_batch_done("batch")
+    assert state.pending_batches() == ["batch"]
+    assert state.pending_companies("batch") == ["flaky"]
+    assert state.results() == [("Acme", "a@acme.test", "ok", "mailto"), ("N/A", "N/A", "gone", None)]
+
+
+def test_company_is_given_up_after_max_attempts(state):
+    for url in ("ok", "gone"):
+        state.record_result("N/A", "N/A", url, DEAD)
+    for _ in range(2):
+        state.record_result("N/A", "N/A", "flaky", FAILED)
+    assert state.mark_batch_done("batch")
+    assert state.counts() == {DEAD: 2, FAILED: 1}
+
+
+def test_pending_result_does_not_count_an_attempt(state):
+    for _ in range(3):
+        state.record_result("N/A", "N/A", "flaky", PENDING)
+    state.flush()
+    assert "flaky" in state.pending_companies("batch")
+
+
+def test_checkpoint_is_imported_once(state, tmp_path):
+    batch = "https://www.construction.co.uk/batch/1"
+    state.add_batches([batch])
+    checkpoint = tmp_path / "batch_checkpoint.csv"
+    checkpoint.write_text(f"{batch}\n", encoding="utf-8")
+    assert state.import_checkpoint(str(checkpoint)) == 1
+    state.start_refresh()
+    assert state.import_checkpoint(str(checkpoint)) == 0
+    assert batch in state.pending_batches()
+
+
+def test_checkpoint_urls_are_canonicalised(state, tmp_path):
+    batch = "https://www.construction.co.uk/batch/1"
+    state.add_batches([batch])
+    checkpoint = tmp_path / "batch_checkpoint.csv"
+    checkpoint.write_text("/batch/1/\nHTTPS://www.construction.co.uk//batch/1\n", encoding="utf-8")
+    assert state.import_checkpoint(str(checkpoint)) == 1
+    assert batch not in state.pending_batches()
+
+
+def test_results_since_leaves_out_earlier_runs(state):
+    state.record_result("Acme", "a@acme.test", "ok")
+    state.flush()
+    run_started = time.time()
+    state.record_result("N/A", "N/A", "gone", DEAD)
+    assert state.results(since=run_started) == [("N/A", "N/A", "gone", None)]
+    assert len(state.results()) == 2
+
+
+def test_refresh_vanishes_only_companies_of_completely_paginated_batches(state):
+    state.add_batches(["other"])
+    state.add_companies("other", ["lost"])
+    state.start_refresh()
+    assert state.refresh_companies("batch", {"ok": None, "gone": None}, complete=True) == []
+    state.refresh_companies("other", {}, complete=False)  # A listing page failed
+    assert state.finish_refresh() == 1
+    assert state.counts()[VANISHED] == 1
+    assert "lost" in state.pending_companies("other")
@@ -0,0 +1,39 @@
+"""emrp decoder against known obfuscated/plain pairs."""
+import pytest
+
+from emrp import decode_emrp, decode_many, decode_script, encode_emrp
+
+# (as served in emrp('...'), address) - every character shifted up by one
+PAIRS = [
+    ("jogpAbdnf/dp/vl", "info@acme.co.uk"),
+    ("tbmft.ufbnAcsjdl.npsubs/dpn", "sales-team@brick-mortar.com"),
+    ("K/Tnjui::AFybnqmf/psh", "J.Smith99@Example.org"),
+    ("p(ofjm`y,2Atjuf/jf", "o'neil_x+1@site.ie"),
+    ("dbgðAqbsjt/gs", "cafï@paris.fr"),
+]
+
+
+@pytest.mark.parametrize("encoded, email", PAIRS)
+def test_decode_known_pairs(encoded, email):
+    assert decode_emrp(encoded) == email
+
+
+@pytest.mark.parametrize("encoded, email", PAIRS)
+def test_encode_known_pairs(encoded, email):
+    assert encode_emrp(email) == encoded
+
+
+@pytest.mark.parametrize("encoded, email", PAIRS)
+def test_round_trip(encoded, email):
+    assert decode_emrp(encode_emrp(email)) == email
+    assert encode_emrp(decode_emrp(encoded)) == encoded
+
+
+def test_decode_script():
+    assert decode_script("<!--\nemrp('jogpAbdnf/dp/vl');\n//-->") == "info@acme.co.uk"
+    assert decode_script("document.write('no email here');") is None
+
+
+def test_decode_many_keeps_order_and_duplicates():
+    encoded = [encoded for encoded, _ in PAIRS] + [PAIRS[0][0]]
+    assert decode_many(encoded) == [email for _, email in PAIRS] + [PAIRS[0][1]]
@@ -0,0 +1,46 @@
+"""lxml extraction must match the BeautifulSoup reference on saved profile pages."""
+from pathlib import Path
+
+import pytest
+
+from extractor import extract_company_info, extract_with_bs4, extract_with_lxml, stream_company_info
+from http_cache import build_response
+
+FIXTURES = Path(__file__).parent / "fixtures"
+PAGES = sorted(FIXTURES.glob("*.html"))
+
+EXPECTED = {
+    "mailto.html": ("Acme Roofing Ltd", "sales@acme-roofing.co.uk", "mailto"),
+    "emrp.html": ("Brick & Mortar Builders", "office@brick-mortar.com", "emrp"),
+    "cfemail.html": ("Concrete Solutions", "hello@concrete.co.uk", "cfemail"),
+    "plain_text.html": ("Drainage Direct", "enquiries@drainage-direct.co.uk", "plain-text"),
+    "no_email.html": ("Excavation Experts", "N/A", None),
+    "no_name.html": ("N/A", "fix@glaziers.org", "mailto"),
+    "empty_template.html": ("N/A", "N/A", None),
+    # Script text is not shown on the page, so it must not reach the text decoders
+    "script_decoy.html": ("Fencing & Gates Co", "N/A", None),
+}
+
+
+def fixture_response(path):
+    return build_response(path.as_uri(), 200, {"Content-Type": "text/html; charset=utf-8"}, path.read_bytes())
+
+
+def test_every_fixture_has_an_expectation():
+    assert {page.name for page in PAGES} == set(EXPECTED)
+
+
+@pytest.mark.parametrize("page", PAGES, ids=lambda page: page.name)
+def test_lxml_matches_bs4(page):
+    html = page.read_text(encoding="utf-8")
+    assert extract_with_lxml(html) == extract_with_bs4(html) == EXPECTED[page.name]
+
+
+@pytest.mark.parametrize("page", PAGES, ids=lambda page: page.name)
+def test_streamed_extraction_matches_bs4(page):
+    html = page.read_text(encoding="utf-8")
+    assert stream_company_info(fixture_response(page), chunk_size=64) == extract_with_bs4(html)
+
+
+def test_extract_company_info_handles_an_empty_body():
+    assert extract_company_info("") == ("N/A", "N/A", None)
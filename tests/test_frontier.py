@@ -0,0 +1,37 @@
+"""Frontier: known seeds keep companies out of the queue until they expire or are reseeded."""
+import pytest
+
+from frontier import Frontier
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def make_frontier(request, tmp_path):
+    frontiers = []
+
+    def make(**kwargs):
+        path = None if request.param == "memory" else str(tmp_path / "frontier.sqlite")
+        frontier = Frontier(path, "https://example.test", **kwargs)
+        frontiers.append(frontier)
+        return frontier
+
+    yield make
+    for frontier in frontiers:
+        frontier.close()
+
+
+def test_known_seed_is_skipped_until_it_expires(make_frontier):
+    frontier = make_frontier()
+    frontier.add_known(["https://example.test/acme"])
+    assert frontier.add_many(["/acme", "/bolt"], source="batch") == ["https://example.test/bolt"]
+
+    frontier.known_ttl = -1
+    assert frontier.add_many(["/acme"], source="batch") == ["https://example.test/acme"]
+    frontier.known_ttl = 3600
+    assert frontier.add_many(["/acme"], source="batch") == ["https://example.test/acme"]  # Now the batch's
+
+
+def test_reseeding_replaces_the_previous_seeds(make_frontier):
+    frontier = make_frontier()
+    frontier.add_known(["https://example.test/acme", "https://example.test/bolt"])
+    assert frontier.add_known(["https://example.test/bolt"]) == 1
+    assert frontier.add_many(["/acme", "/bolt"], source="batch") == ["https://example.test/acme"]
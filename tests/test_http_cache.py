@@ -0,0 +1,58 @@
+"""ResponseCache with a fake fetch: streamed misses are stored only once read whole."""
+import io
+
+import pytest
+import requests
+
+from http_cache import CacheMiss, ResponseCache
+
+URL = "https://example.test/company/1"
+BODY = b"<html>" + b"x" * 50000 + b"</html>"
+
+
+def fake_fetch(calls):
+    def fetch(url, headers=None, stream=False, **kwargs):
+        calls.append(stream)
+        res = requests.Response()
+        res.status_code = 200
+        res.url = url
+        res.headers["Content-Type"] = "text/html"
+        res.raw = io.BytesIO(BODY)
+        if not stream:
+            res.content  # requests reads non-streamed bodies up front
+        return res
+    return fetch
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ResponseCache(str(tmp_path / "cache.sqlite"))
+
+
+def test_streamed_miss_stays_streamed_and_is_stored_when_read_whole(cache):
+    calls = []
+    res = cache.get(fake_fetch(calls), URL, stream=True)
+    assert calls == [True] and not res._content_consumed
+    assert b"".join(res.iter_content(8192)) == BODY
+    cached, fresh = cache.lookup(URL)
+    assert fresh and cached.content == BODY
+
+
+def test_streamed_miss_read_partly_is_not_stored(cache):
+    res = cache.get(fake_fetch([]), URL, stream=True)
+    next(res.iter_content(8192))
+    res.close()
+    assert cache.lookup(URL) == (None, False)
+
+
+def test_unstreamed_miss_is_stored_and_then_served(cache):
+    calls = []
+    assert cache.get(fake_fetch(calls), URL).content == BODY
+    hit = cache.get(fake_fetch(calls), URL, stream=True)
+    assert calls == [False] and hit.from_cache and hit.content == BODY
+
+
+def test_offline_miss_raises(tmp_path):
+    offline = ResponseCache(str(tmp_path / "cache.sqlite"), offline=True)
+    with pytest.raises(CacheMiss):
+        offline.get(fake_fetch([]), URL)
@@ -0,0 +1,70 @@
+"""http_client.fetch: a streamed response keeps its rate-control slot until read or closed."""
+import io
+import socket
+
+import pytest
+import requests
+
+import http_client
+from rate_control import RateController
+
+URL = "https://example.test/company/1"
+
+
+class FakeSession:
+    def get(self, url, stream=False, **kwargs):
+        res = requests.Response()
+        res.status_code = 200
+        res.url = url
+        res.raw = io.BytesIO(b"<html>" + b"x" * 20000 + b"</html>")
+        if not stream:
+            res.content
+        return res
+
+
+@pytest.fixture
+def limiter(monkeypatch):
+    rate = RateController(rate=1000.0)
+    monkeypatch.setattr(http_client, "_rate", rate)
+    monkeypatch.setattr(http_client, "get_session", lambda retry=True: FakeSession())
+    return rate.limiter(URL)
+
+
+def test_unstreamed_fetch_releases_its_slot(limiter):
+    http_client.fetch(URL)
+    assert limiter.in_flight == 0
+
+
+def test_streamed_fetch_holds_its_slot_until_closed(limiter):
+    res = http_client.fetch(URL, stream=True)
+    assert limiter.in_flight == 1
+    next(res.iter_content(1024))
+    assert limiter.in_flight == 1
+    res.close()
+    res.close()
+    assert limiter.in_flight == 0
+
+
+def test_streamed_fetch_releases_its_slot_once_read(limiter):
+    res = http_client.fetch(URL, stream=True)
+    assert len(res.content) == 20013
+    assert limiter.in_flight == 0
+
+
+def test_new_connection_falls_back_to_the_next_address(monkeypatch):
+    listener = socket.socket()
+    listener.bind(("127.0.0.1", 0))
+    listener.listen()
+    port = listener.getsockname()[1]
+    # First address refuses (nothing listens on 127.0.0.2), the second one answers
+    addresses = [(socket.AF_INET, socket.SOCK_STREAM, 6, "", (host, port)) for host in ("127.0.0.2", "127.0.0.1")]
+    monkeypatch.setattr(http_client.socket, "getaddrinfo", lambda *args, **kwargs: addresses)
+
+    conn = http_client._TimedHTTPConnection("example.test", port, timeout=2)
+    try:
+        sock = conn._new_conn()
+        assert sock.getpeername() == ("127.0.0.1", port)
+        assert conn._dns_host == "example.test"
+        sock.close()
+    finally:
+        listener.close()
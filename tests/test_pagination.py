@@ -0,0 +1,76 @@
+"""BatchPager against a fake batch: page counts, single fetches, and failed pages."""
+import pytest
+
+import pagination
+from pagination import BatchPager, PaginationError
+
+BATCH = "https://example.test/batch"
+
+
+def listing(page_num, companies, pager_last):
+    blocks = "".join(
+        f'<div class="col companyListButtons"><div class="companyListListingLink">'
+        f'<a href="/c/{page_num}-{n}">Company</a></div></div>'
+        for n in range(companies)
+    )
+    pager = "".join(f'<a href="{BATCH}?pagenum={n}">{n}</a>' for n in range(2, pager_last + 1))
+    return f"<html><body>{blocks}<div class='pager'>{pager}</div></body></html>"
+
+
+class FakeBatch:
+    """pages listed pages of 3 companies; the pager shows at most `window` pages ahead."""
+
+    def __init__(self, pages, window=5, failing=()):
+        self.pages = pages
+        self.window = window
+        self.failing = dict(failing)  # page_num -> failures before it loads
+        self.fetches = []
+
+    def __call__(self, url):
+        page_num = int(url.split("pagenum=")[1]) if "pagenum=" in url else 1
+        self.fetches.append(page_num)
+        if self.failing.get(page_num, 0):
+            self.failing[page_num] -= 1
+            raise ConnectionError("connection reset")
+        companies = 3 if page_num <= self.pages else 0
+        return listing(page_num, companies, min(self.pages, page_num + self.window))
+
+
+@pytest.fixture(autouse=True)
+def no_retry_delay(monkeypatch):
+    monkeypatch.setattr(pagination, "PAGE_RETRY_DELAY", 0)
+
+
+@pytest.mark.parametrize("pages", [1, 2, 7, 23])
+def test_finds_every_page_and_fetches_each_once(pages):
+    fetch = FakeBatch(pages)
+    links = pagination.get_company_links(BATCH, fetch)
+    assert len(links) == 3 * pages
+    assert links[0] == "/c/1-0" and links[-1] == f"/c/{pages}-2"
+    assert len(fetch.fetches) == len(set(fetch.fetches))
+
+
+def test_complete_after_every_page_loaded():
+    pager = BatchPager(BATCH, FakeBatch(7, failing={4: pagination.PAGE_RETRIES}))
+    assert not pager.complete
+    pager.get_company_links()
+    assert pager.complete
+
+
+def test_empty_batch():
+    pager = BatchPager(BATCH, FakeBatch(0))
+    assert pager.get_company_links() == []
+    assert not pager.complete  # Could be an error page; a refresh must not vanish the batch's companies
+
+
+def test_transient_failure_is_retried():
+    fetch = FakeBatch(7, failing={4: pagination.PAGE_RETRIES})
+    assert len(pagination.get_company_links(BATCH, fetch)) == 21
+
+
+@pytest.mark.parametrize("page_num", [1, 4, 7, 8])
+def test_failed_page_raises_instead_of_ending_the_batch(page_num):
+    pager = BatchPager(BATCH, FakeBatch(7, failing={page_num: 99}))
+    with pytest.raises(PaginationError):
+        pager.get_company_links()
+    assert pager.failed == {page_num} and not pager.complete
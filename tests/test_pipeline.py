@@ -0,0 +1,48 @@
+"""Pipelines: scraping overlaps pagination, and the producer is joined before run() returns."""
+import threading
+import time
+
+import pytest
+
+from pipeline import BatchPipeline, PriorityPipeline
+
+BASE = "https://example.test"
+
+
+def test_priority_pipeline_scrapes_while_paginating():
+    second_batch = threading.Event()
+    scraped_early = []
+
+    def get_company_links(batch_url):
+        if batch_url == "/b2":
+            # The first batch's companies are scraped while this one is still paginating
+            scraped_early.append(second_batch.wait(timeout=5))
+        return [(f"{batch_url}/c{n}", float(n)) for n in range(3)]
+
+    def get_company_info(link):
+        second_batch.set()
+        return link
+
+    pipeline = PriorityPipeline(get_company_links, get_company_info, BASE, threads=2)
+    results = dict(pipeline.run(["/b1", "/b2"]))
+    assert scraped_early == [True]
+    assert sorted(results) == ["/b1", "/b2"]
+    assert sorted(results["/b2"]) == [f"{BASE}/b2/c{n}" for n in range(3)]
+    assert not pipeline.timed_out
+
+
+@pytest.mark.parametrize("pipeline_class", [BatchPipeline, PriorityPipeline])
+def test_producer_is_joined_when_the_time_budget_runs_out(pipeline_class):
+    paginating = []
+
+    def get_company_links(batch_url):
+        paginating.append(batch_url)
+        time.sleep(0.3)
+        paginating.remove(batch_url)
+        link = f"{batch_url}/c"
+        return [(link, 0.0)] if pipeline_class is PriorityPipeline else [link]
+
+    pipeline = pipeline_class(get_company_links, lambda link: link, BASE, threads=2, time_budget=0.5)
+    list(pipeline.run([f"/b{n}" for n in range(10)]))
+    assert not pipeline.producer.is_alive() and not paginating
+    assert pipeline.timed_out
@@ -0,0 +1,49 @@
+"""result_store: extra columns survive, --key is checked, link keys are compared canonically."""
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+import result_store
+from result_store import ResultStore, dedupe, read_tables
+
+
+def write_csv(path, header, rows):
+    path.write_text("\n".join([",".join(header)] + [",".join(row) for row in rows]) + "\n", encoding="utf-8")
+    return str(path)
+
+
+@pytest.fixture
+def results_csv(tmp_path):
+    return write_csv(tmp_path / "results.csv", ["Company Name", "Email", "Company Link", "Batch Link"], [
+        ("Acme", "N/A", "https://www.construction.co.uk/acme/", "/batch-a"),
+        ("Acme", "a@acme.test", "HTTPS://www.construction.co.uk//acme", "/batch-a"),
+        ("Bolt", "b@bolt.test", "/bolt", "/batch-b"),
+    ])
+
+
+def test_extra_columns_are_kept(results_csv):
+    (table,) = read_tables([results_csv])
+    assert table.column("Batch Link").to_pylist() == ["/batch-a", "/batch-a", "/batch-b"]
+
+
+def test_dedupe_compares_canonical_links(results_csv, tmp_path):
+    store = ResultStore(str(tmp_path / "uniques"))
+    assert dedupe([results_csv], store, keep="best") == (3, 2)
+    table = pq.read_table(store.directory)
+    assert table.column("Email").to_pylist() == ["a@acme.test", "b@bolt.test"]
+    assert "Batch Link" in table.column_names
+
+
+def test_unknown_key_is_rejected(results_csv, tmp_path, capsys):
+    with pytest.raises(SystemExit):
+        result_store.main(["dedupe", results_csv, "-o", str(tmp_path / "out"), "--key", "Phone"])
+    assert "Phone" in capsys.readouterr().err
+
+
+def test_store_writes_tables_with_different_extra_columns(tmp_path):
+    store = ResultStore(str(tmp_path / "merged"))
+    store.write(pa.table({"Company Link": ["/a"], "Batch Link": ["/batch-a"]}))
+    store.write(pa.table({"Company Link": ["/b"], "Note": ["x"]}))
+    store.close()
+    table = pq.read_table(store.directory)
+    assert table.num_rows == 2 and {"Batch Link", "Note"} <= set(table.column_names)
@@ -0,0 +1,48 @@
+"""WorkQueue: failed jobs are retried up to the cap, and workers can reach it over HTTP."""
+import pytest
+
+from work_queue import BATCH, COMPANY, DEAD, DONE, FAILED, QueueServer, RemoteQueue, WorkQueue
+
+
+@pytest.fixture
+def queue(tmp_path):
+    queue = WorkQueue(str(tmp_path / "queue.sqlite"), visibility_timeout=60, max_attempts=2)
+    queue.enqueue(COMPANY, ["a", "b", "c"])
+    queue.mark_seeded()
+    yield queue
+    queue.close()
+
+
+def claimed(queue, worker_id="w"):
+    return {url: job_id for job_id, _, url in queue.claim(worker_id, 10)}
+
+
+def test_failed_fetch_is_retried_until_max_attempts(queue):
+    jobs = claimed(queue)
+    queue.complete("w", [(jobs["a"], "Acme", "a@acme.test", DONE), (jobs["b"], "N/A", "N/A", DEAD),
+                         (jobs["c"], "N/A", "N/A", FAILED)])
+    assert queue.counts() == {f"{COMPANY}:done": 1, f"{COMPANY}:dead": 1, f"{COMPANY}:pending": 1}
+
+    queue.fail("w", [claimed(queue)["c"]])
+    assert queue.counts()[f"{COMPANY}:failed"] == 1
+    assert queue.finished()
+
+
+def test_remote_queue_over_http(queue):
+    server = QueueServer(queue, port=0, token="secret")
+    try:
+        with pytest.raises(RuntimeError):
+            RemoteQueue(server.url, token="wrong")
+        remote = RemoteQueue(server.url, token="secret")
+        assert remote.visibility_timeout == 60
+        jobs = {url: job_id for job_id, kind, url in remote.claim("w", 10)}
+        assert set(jobs) == {"a", "b", "c"}
+        assert remote.complete("w", [(jobs["a"], "Acme", "a@acme.test", DONE)]) == 1
+        remote.fail("w", [jobs["b"], jobs["c"]])
+        queue.enqueue(BATCH, ["batch"])
+        (batch_id, kind, _), = [job for job in remote.claim("w", 10) if job[1] == BATCH]
+        assert remote.complete_batch("w", batch_id, ["d"]) == 1
+        assert not remote.finished()
+        remote.close()
+    finally:
+        server.close()
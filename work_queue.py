@@ -0,0 +1,352 @@
+"""Lease-based job queue for the distributed crawl.
+
+WorkQueue keeps the jobs in one SQLite file on the coordinator's disk.
+Workers on the same host may open that file directly; workers on other
+machines talk to a QueueServer the coordinator runs next to it, through
+RemoteQueue, which has the same worker-side methods. open_queue() picks
+one from the --queue value (a path or an http:// URL).
+"""
+import csv
+import hmac
+import json
+import sqlite3
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+QUEUE_FILE = "crawl_queue.sqlite"
+VISIBILITY_TIMEOUT = 120  # Seconds a claimed job stays invisible to other workers
+MAX_ATTEMPTS = 5  # Leases handed out for one job before it is given up as failed
+SERVER_PORT = 8765
+REMOTE_TIMEOUT = 30  # Seconds a RemoteQueue call waits for the coordinator
+REMOTE_RETRIES = 5  # Extra attempts for a call that could not reach the coordinator
+REMOTE_RETRY_DELAY = 1.0  # Seconds before the first extra attempt, doubled after each
+TOKEN_HEADER = "X-Queue-Token"
+
+BATCH = "batch"
+COMPANY = "company"
+
+PENDING = "pending"
+LEASED = "leased"
+DONE = "done"
+DEAD = "dead"  # Definitive miss: gone page (404/410) or a page with neither name nor email
+FAILED = "failed"  # Fetch or pagination kept failing (timeouts, 429/5xx) for max_attempts leases
+
+
+class WorkQueue:
+    """Shared SQLite job queue with leases, for a coordinator and any number of worker processes.
+
+    The file relies on SQLite WAL locking, which does not work over network
+    filesystems (NFS, SMB), so only processes on the machine that holds it
+    may open it; workers elsewhere go through QueueServer and RemoteQueue.
+
+    claim() hands out jobs under a lease that expires after the visibility
+    timeout; a worker that crashes simply stops renewing, and its jobs go
+    back to the queue. A job whose fetch fails goes back to pending at once
+    (fail(), or complete() with FAILED) and is given up as failed only after
+    max_attempts leases; dead is kept for gone pages. Every URL is queued once per kind, so batches listed
+    twice or companies in several batches are fetched once. Results are
+    stored on the job row, so the queue file is also the merged result store.
+    """
+
+    def __init__(self, path=QUEUE_FILE, visibility_timeout=VISIBILITY_TIMEOUT, max_attempts=MAX_ATTEMPTS):
+        self.path = path
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max_attempts
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, timeout=60, isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY,
+                kind TEXT NOT NULL,
+                url TEXT NOT NULL,
+                parent TEXT,
+                status TEXT NOT NULL DEFAULT 'pending',
+                lease_owner TEXT,
+                lease_expires REAL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                company_name TEXT,
+                email TEXT,
+                updated_at REAL,
+                UNIQUE (kind, url)
+            )""")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS jobs_claim ON jobs (status, lease_expires)")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+
+    def transaction(self):
+        """BEGIN IMMEDIATE so concurrent claims from other processes serialise on the write lock."""
+        return _Immediate(self.conn)
+
+    # Coordinator
+
+    def enqueue(self, kind, urls, parent=None):
+        """Queue URLs not seen before for this kind; returns how many were new."""
+        now = time.time()
+        with self.lock, self.transaction():
+            before = self.conn.total_changes
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO jobs (kind, url, parent, updated_at) VALUES (?, ?, ?, ?)",
+                [(kind, url, parent, now) for url in urls],
+            )
+            return self.conn.total_changes - before
+
+    def mark_seeded(self):
+        """Tell workers the coordinator has queued every batch; an empty queue now means finished."""
+        with self.lock, self.transaction():
+            self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('seeded', '1')")
+
+    def finished(self):
+        with self.lock:
+            seeded = self.conn.execute("SELECT value FROM meta WHERE key = 'seeded'").fetchone()
+            open_jobs = self.conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status IN (?, ?)", (PENDING, LEASED)
+            ).fetchone()[0]
+        return seeded is not None and open_jobs == 0
+
+    # Workers
+
+    def claim(self, worker_id, limit):
+        """Lease up to `limit` jobs (company pages before batches); returns [(id, kind, url)].
+
+        Jobs whose lease expired are reclaimed; ones leased max_attempts times
+        already are marked failed instead.
+        """
+        now = time.time()
+        with self.lock, self.transaction():
+            self.conn.execute(
+                "UPDATE jobs SET status = ?, lease_owner = NULL, updated_at = ? "
+                "WHERE status = ? AND lease_expires < ? AND attempts >= ?",
+                (FAILED, now, LEASED, now, self.max_attempts),
+            )
+            rows = self.conn.execute(
+                "SELECT id, kind, url FROM jobs "
+                "WHERE status = ? OR (status = ? AND lease_expires < ?) "
+                "ORDER BY kind = ? DESC, id LIMIT ?",
+                (PENDING, LEASED, now, COMPANY, limit),
+            ).fetchall()
+            self.conn.executemany(
+                "UPDATE jobs SET status = ?, lease_owner = ?, lease_expires = ?, attempts = attempts + 1, "
+                "updated_at = ? WHERE id = ?",
+                [(LEASED, worker_id, now + self.visibility_timeout, now, job_id) for job_id, _, _ in rows],
+            )
+        return rows
+
+    def extend(self, worker_id, job_ids):
+        """Heartbeat: push the lease of jobs this worker still holds."""
+        expires = time.time() + self.visibility_timeout
+        with self.lock, self.transaction():
+            self.conn.executemany(
+                "UPDATE jobs SET lease_expires = ? WHERE id = ? AND lease_owner = ? AND status = ?",
+                [(expires, job_id, worker_id, LEASED) for job_id in job_ids],
+            )
+
+    def complete_batch(self, worker_id, job_id, company_urls):
+        """Queue a paginated batch's companies and close the batch job in one transaction."""
+        now = time.time()
+        with self.lock, self.transaction():
+            updated = self.conn.execute(
+                "UPDATE jobs SET status = ?, lease_owner = NULL, updated_at = ? "
+                "WHERE id = ? AND lease_owner = ? AND status = ?",
+                (DONE, now, job_id, worker_id, LEASED),
+            ).rowcount
+            if not updated:
+                return 0  # Lease lost; whoever holds it now will queue the companies
+            parent = self.conn.execute("SELECT url FROM jobs WHERE id = ?", (job_id,)).fetchone()[0]
+            before = self.conn.total_changes
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO jobs (kind, url, parent, updated_at) VALUES (?, ?, ?, ?)",
+                [(COMPANY, url, parent, now) for url in company_urls],
+            )
+            return self.conn.total_changes - before
+
+    def complete(self, worker_id, results):
+        """Store [(job_id, company_name, email, status)] in one transaction; returns the jobs finished.
+
+        status is DONE or DEAD; FAILED hands the job back as fail() does.
+        Only jobs still leased to this worker are updated, so a worker whose
+        lease ran out cannot overwrite the result of the one that took over.
+        """
+        now = time.time()
+        rows = [(status, company_name, email, now, job_id, worker_id, LEASED)
+                for job_id, company_name, email, status in results if status != FAILED]
+        with self.lock, self.transaction():
+            before = self.conn.total_changes
+            self.conn.executemany(
+                "UPDATE jobs SET status = ?, company_name = ?, email = ?, lease_owner = NULL, updated_at = ? "
+                "WHERE id = ? AND lease_owner = ? AND status = ?",
+                rows,
+            )
+            finished = self.conn.total_changes - before
+        self.fail(worker_id, [job_id for job_id, _, _, status in results if status == FAILED])
+        return finished
+
+    def fail(self, worker_id, job_ids):
+        """Hand back jobs whose fetch failed: pending again, or failed once leased max_attempts times."""
+        now = time.time()
+        with self.lock, self.transaction():
+            self.conn.executemany(
+                "UPDATE jobs SET status = CASE WHEN attempts >= ? THEN ? ELSE ? END, lease_owner = NULL, "
+                "updated_at = ? WHERE id = ? AND lease_owner = ? AND status = ?",
+                [(self.max_attempts, FAILED, PENDING, now, job_id, worker_id, LEASED) for job_id in job_ids],
+            )
+
+    # Reporting
+
+    def counts(self):
+        """Job count per (kind, status)."""
+        with self.lock:
+            rows = self.conn.execute("SELECT kind, status, COUNT(*) FROM jobs GROUP BY kind, status").fetchall()
+        return {f"{kind}:{status}": count for kind, status, count in rows}
+
+    def export_csv(self, results_file):
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT company_name, email, url FROM jobs WHERE kind = ? AND status IN (?, ?) ORDER BY id",
+                (COMPANY, DONE, DEAD),
+            ).fetchall()
+        with open(results_file, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(["Company Name", "Email", "Source URL"])
+            writer.writerows(rows)
+        return len(rows)
+
+    def close(self):
+        self.conn.close()
+
+
+# Network access
+
+REMOTE_METHODS = ("claim", "extend", "complete_batch", "complete", "fail", "finished", "counts")
+
+
+class QueueServer:
+    """Serves a WorkQueue's worker-side methods as JSON over HTTP from a daemon thread.
+
+    Every call is a POST to /<method> with the keyword arguments as a JSON
+    object; the reply is {"result": ...}. With a token, requests must carry
+    it in the X-Queue-Token header.
+    """
+
+    def __init__(self, queue, host="127.0.0.1", port=SERVER_PORT, token=None):
+        self.queue = queue
+        self.token = token
+        self.server = ThreadingHTTPServer((host, port), _QueueHandler)
+        self.server.queue_server = self
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def call(self, method, kwargs):
+        if method == "info":
+            return {"visibility_timeout": self.queue.visibility_timeout}
+        if method not in REMOTE_METHODS:
+            raise KeyError(method)
+        return getattr(self.queue, method)(**kwargs)
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class _QueueHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        queue_server = self.server.queue_server
+        if queue_server.token is not None and not hmac.compare_digest(
+            self.headers.get(TOKEN_HEADER, ""), queue_server.token
+        ):
+            return self.reply(403, {"error": "bad token"})
+        try:
+            kwargs = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            result = queue_server.call(self.path.strip("/"), kwargs)
+        except KeyError:
+            return self.reply(404, {"error": f"no method {self.path}"})
+        except Exception as e:
+            return self.reply(500, {"error": repr(e)})
+        self.reply(200, {"result": result})
+
+    def reply(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class RemoteQueue:
+    """Worker-side WorkQueue that calls a QueueServer, for workers on other machines."""
+
+    def __init__(self, url, token=None, timeout=REMOTE_TIMEOUT):
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+        self.session = requests.Session()
+        if token is not None:
+            self.session.headers[TOKEN_HEADER] = token
+        self.visibility_timeout = self.call("info")["visibility_timeout"]
+
+    def call(self, method, **kwargs):
+        """POST one call, retrying while the coordinator cannot be reached."""
+        for attempt in range(REMOTE_RETRIES + 1):
+            try:
+                res = self.session.post(f"{self.url}/{method}", json=kwargs, timeout=self.timeout)
+                break
+            except requests.ConnectionError:
+                if attempt == REMOTE_RETRIES:
+                    raise
+                time.sleep(REMOTE_RETRY_DELAY * 2 ** attempt)
+        if res.status_code != 200:
+            raise RuntimeError(f"Queue call {method} failed ({res.status_code}): {res.text}")
+        return res.json()["result"]
+
+    def claim(self, worker_id, limit):
+        return [tuple(job) for job in self.call("claim", worker_id=worker_id, limit=limit)]
+
+    def extend(self, worker_id, job_ids):
+        self.call("extend", worker_id=worker_id, job_ids=list(job_ids))
+
+    def complete_batch(self, worker_id, job_id, company_urls):
+        return self.call("complete_batch", worker_id=worker_id, job_id=job_id, company_urls=list(company_urls))
+
+    def complete(self, worker_id, results):
+        return self.call("complete", worker_id=worker_id, results=[list(result) for result in results])
+
+    def fail(self, worker_id, job_ids):
+        self.call("fail", worker_id=worker_id, job_ids=list(job_ids))
+
+    def finished(self):
+        return self.call("finished")
+
+    def counts(self):
+        return self.call("counts")
+
+    def close(self):
+        self.session.close()
+
+
+def open_queue(location, visibility_timeout=VISIBILITY_TIMEOUT, token=None):
+    """RemoteQueue for an http(s):// URL, otherwise the WorkQueue file at that path."""
+    if location.startswith(("http://", "https://")):
+        return RemoteQueue(location, token)
+    return WorkQueue(location, visibility_timeout)
+
+
+class _Immediate:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute("BEGIN IMMEDIATE")
+
+    def __exit__(self, exc_type, exc, tb):
+        self.conn.execute("ROLLBACK" if exc_type else "COMMIT")